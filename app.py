@@ -4,6 +4,10 @@ from streamlit_option_menu import option_menu
 from pathlib import Path
 import json
 from randomizer import gen_random_df
+from dataset import compact_frame, expand_frame, model_categories
+from pipeline_steps import DropColumns
+from scoring import cvss_score, load_model, score_frame
+from feature_extraction.cache import FeatureCache
 import pickle
 from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
@@ -21,53 +25,14 @@ from streamlit_jupyter import StreamlitPatcher, tqdm
 from settings import (
     BASE_DIR,
     SAMPLES_DIR,
-    DATA_DIR
+    DATA_DIR,
+    CACHE_DIR,
+    MODEL_DIR
 )
 
 # register streamlit with jupyter-compatible wrappers
 
 
-def cvss_score(x: Union[int, float]) -> str:
-    """
-    CVSS v3 severity score based on the risk value predicted by the model.
-
-    :param x: Risk value
-    :type x: Union[int, float]
-    :return: Severity
-    :rtype: str
-    """
-    if x == 0:
-        return 'None'
-    elif x < 40:
-        return 'Low'
-    elif x < 70:
-        return 'Medium'
-    elif x < 90:
-        return 'High'
-    else:
-        return 'Critical'
-
-
-class DropColumns(BaseEstimator, TransformerMixin):
-    """
-    Drop columns from a DataFrame
-
-    :param BaseEstimator: Base class for all estimators in scikit-learn
-    :type BaseEstimator: BaseEstimator
-    :param TransformerMixin: Mixin class for all transformers in scikit-learn
-    :type TransformerMixin: TransformerMixin
-    """
-
-    def __init__(self, columns):
-        self.columns = columns
-
-    def fit(self, X, y=None):
-        return self
-
-    def transform(self, X):
-        return X.drop(columns=self.columns)
-
-
 st.set_page_config(layout="wide",
                    page_title="Credential Risk Assessment Tool",
                    page_icon=":material/password:",
@@ -83,18 +48,36 @@ st.set_page_config(layout="wide",
                    })
 
 
-with open(SAMPLES_DIR / "usernames.json", "r", encoding="utf-8") as users_file, \
-        open(SAMPLES_DIR / "password.json", "r", encoding="utf-8") as diccionario_file, \
-        open(SAMPLES_DIR / "channels.json", "r", encoding="utf-8") as channels_file, \
-        open(SAMPLES_DIR / "file_name.json", "r", encoding="utf-8") as file_name_file, \
-        open(BASE_DIR / "pipeline.pkl", "rb") as model_file:
-    samples_data = {
-        'users': json.load(users_file),
-        'diccionario': json.load(diccionario_file),
-        'channels': json.load(channels_file),
-        'file_name': json.load(file_name_file)
-    }
-    pipeline = pickle.load(model_file)
+@st.cache_resource
+def load_samples() -> dict:
+    """
+    Sample data shared by every session.
+    """
+    with open(SAMPLES_DIR / "usernames.json", "r", encoding="utf-8") as users_file, \
+            open(SAMPLES_DIR / "password.json", "r", encoding="utf-8") as diccionario_file, \
+            open(SAMPLES_DIR / "channels.json", "r", encoding="utf-8") as channels_file, \
+            open(SAMPLES_DIR / "file_name.json", "r", encoding="utf-8") as file_name_file:
+        return {
+            'users': json.load(users_file),
+            'diccionario': json.load(diccionario_file),
+            'channels': json.load(channels_file),
+            'file_name': json.load(file_name_file)
+        }
+
+
+@st.cache_resource
+def get_model(version: int):
+    """
+    Model shared by every session, reloaded when the artifact manifest changes.
+
+    :param version: Modification time of the manifest, part of the cache key.
+    :type version: int
+    """
+    return load_model(MODEL_DIR)
+
+
+samples_data = load_samples()
+pipeline = get_model((MODEL_DIR / "manifest.json").stat().st_mtime_ns)
 
 data_paths = {
     'user': DATA_DIR / "user.json",
@@ -104,6 +87,14 @@ data_paths = {
 }
 
 
+@st.cache_resource
+def get_feature_cache() -> FeatureCache:
+    """
+    Password feature cache shared by every session and reused across restarts.
+    """
+    return FeatureCache(CACHE_DIR / "features.sqlite")
+
+
 def load_home():
     """
     Home page
@@ -163,9 +154,10 @@ def load_generate_random_data():
         "Number of samples", min_value=1, max_value=100, value=50, step=1)
     if st.button("Generate"):
         with st.spinner("Generating random data..."):
-            df = gen_random_df(samples_data, data_paths, n_samples=n_samples)
+            df = gen_random_df(samples_data, data_paths,
+                               n_samples=n_samples, cache=get_feature_cache(), compact=True)
         st.write(df)
-        st.download_button("Download", df.to_json(
+        st.download_button("Download", expand_frame(df).to_json(
             orient="records"), f"random_data_{n_samples}.json", "application/json")
 
 
@@ -176,15 +168,11 @@ def load_try_model():
     st.title("Want to make some predictions?")
     file = st.file_uploader("Upload a file", type=['json'])
     if file:
-        df = pd.read_json(file)
-        predictions = pipeline.predict(df)
-        predictions = predictions * 100
-        predictions = predictions.astype(int)
-        results = pd.concat([df, pd.Series(predictions, name="risk")], axis=1)
-        results['severity'] = results['risk'].apply(cvss_score)
+        df = compact_frame(pd.read_json(file), model_categories(pipeline))
+        results = score_frame(pipeline, df)
         st.write(
             results[['username', 'password', 'channel', 'file', 'risk', 'severity']])
-        st.download_button("Download", results.to_json(
+        st.download_button("Download", expand_frame(results).to_json(
             orient="records"), "predictions.json", "application/json")
 
 
@@ -0,0 +1,305 @@
+"""
+Compact, versioned model artifact.
+
+A fitted scoring pipeline is exported as a directory with a small JSON
+manifest and one ``.npy`` file per fitted array. ``CompactModel`` reads the
+manifest only, memory-maps each array read-only the first time it is needed
+and predicts with NumPy, so loading a model neither unpickles the pipeline
+nor imports scikit-learn. Worker processes that open the same artifact share
+the mapped pages through the OS page cache.
+
+Usage:
+    python artifact.py export pipeline.pkl model/
+    python artifact.py info model/
+"""
+from pathlib import Path
+import argparse
+from datetime import datetime, timezone
+import hashlib
+import json
+import os
+from typing import Union
+import numpy as np
+import pandas as pd
+
+
+FORMAT = "crat-model"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+KERNELS = ("linear", "rbf", "laplacian", "polynomial", "poly")
+
+
+def _fitted_steps(pipeline) -> dict:
+    preprocessor = pipeline.named_steps['preprocessor']
+    transformers = {}
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'remainder':
+            if transformer != 'drop' and len(columns):
+                raise ValueError("El artefacto no admite columnas remainder")
+            continue
+        transformers[name] = (transformer, list(columns))
+    if set(transformers) != {'numerical', 'categorical'}:
+        raise ValueError(f"Transformadores no soportados: {sorted(transformers)}")
+    return transformers
+
+
+def _nystroem(model) -> tuple:
+    # Nystroem + Ridge sin termino independiente: K(x, C) @ N.T @ w == K(x, C) @ (N.T @ w)
+    from sklearn.kernel_approximation import Nystroem
+    steps = [step for _, step in model.steps]
+    if len(steps) != 2 or not isinstance(steps[0], Nystroem) or not hasattr(steps[1], 'coef_'):
+        raise ValueError("Solo se admite la aproximacion Nystroem + modelo lineal "
+                         "(las random Fourier features no se pueden exportar)")
+    feature_map, linear = steps
+    if np.any(np.ravel(linear.intercept_) != 0):
+        raise ValueError("El modelo lineal de la aproximacion Nystroem no puede tener "
+                         "termino independiente")
+    if feature_map.kernel not in KERNELS or feature_map.kernel_params:
+        raise ValueError(f"Kernel no soportado: {feature_map.kernel}")
+    # None toma los valores por defecto de pairwise_kernels, como KernelRidge
+    estimator = {"type": "kernel_ridge", "kernel": feature_map.kernel,
+                 "gamma": feature_map.gamma,
+                 "degree": 3 if feature_map.degree is None else feature_map.degree,
+                 "coef0": 1 if feature_map.coef0 is None else feature_map.coef0,
+                 "approximation": "nystroem"}
+    dual_coef = feature_map.normalization_.T @ np.ravel(linear.coef_)
+    estimator["class"] = f"{type(feature_map).__name__}+{type(linear).__name__}"
+    return (feature_map.components_, dual_coef), estimator
+
+
+def export_artifact(pipeline, directory: Union[str, Path]) -> Path:
+    """
+    Export a fitted scoring pipeline as a compact artifact.
+
+    Supports the layout of pipeline.pkl: DropColumns, a ColumnTransformer with
+    SimpleImputer + MinMaxScaler (numerical) and SimpleImputer + OneHotEncoder
+    (categorical), SelectKBest and either a linear model (``coef_`` and
+    ``intercept_``), KernelRidge (``dual_coef_`` and ``X_fit_``) or the Nyström
+    approximation of ``training.approximate_kernel_ridge``, which is exported
+    as a KernelRidge over the Nyström components.
+
+    :param pipeline: Fitted pipeline.
+    :type pipeline: sklearn.pipeline.Pipeline
+    :param directory: Output directory, created if needed.
+    :type directory: Union[str, Path]
+    :raises ValueError: If the pipeline has steps the artifact cannot represent.
+    :return: Output directory.
+    :rtype: Path
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    transformers = _fitted_steps(pipeline)
+    numerical, numerical_columns = transformers['numerical']
+    categorical, categorical_columns = transformers['categorical']
+    imputer = categorical.named_steps['imputer']
+    onehot = categorical.named_steps['onehot']
+    drop_idx = onehot.drop_idx_ if onehot.drop_idx_ is not None \
+        else [None] * len(onehot.categories_)
+    model = pipeline.steps[-1][1]
+
+    arrays = {
+        'numerical_statistics': numerical.named_steps['imputer'].statistics_,
+        'scale': numerical.named_steps['scaler'].scale_,
+        'min': numerical.named_steps['scaler'].min_,
+        'support': pipeline.named_steps['feature_selection'].get_support(indices=True),
+    }
+    if hasattr(model, 'named_steps'):
+        (arrays['X_fit'], arrays['dual_coef']), estimator = _nystroem(model)
+    elif hasattr(model, 'dual_coef_'):
+        if model.kernel not in KERNELS:
+            raise ValueError(f"Kernel no soportado: {model.kernel}")
+        arrays['dual_coef'] = model.dual_coef_
+        arrays['X_fit'] = model.X_fit_
+        estimator = {"type": "kernel_ridge", "kernel": model.kernel, "gamma": model.gamma,
+                     "degree": model.degree, "coef0": model.coef0}
+    elif hasattr(model, 'coef_'):
+        arrays['coef'] = np.ravel(model.coef_)
+        estimator = {"type": "linear", "intercept": float(np.ravel(model.intercept_)[0])}
+    else:
+        raise ValueError(f"Modelo no soportado: {type(model).__name__}")
+    estimator.setdefault("class", type(model).__name__)
+
+    files = {}
+    digest = hashlib.sha256()
+    for name, value in arrays.items():
+        value = np.ascontiguousarray(value, dtype=np.int64 if name == 'support' else np.float64)
+        np.save(directory / f"{name}.npy", value)
+        data = value.tobytes()
+        files[name] = {"file": f"{name}.npy", "dtype": value.dtype.str,
+                       "shape": list(value.shape),
+                       "sha256": hashlib.sha256(data).hexdigest()}
+        digest.update(name.encode() + data)
+
+    manifest = {
+        "format": FORMAT,
+        "format_version": FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "drop_columns": list(pipeline.named_steps['drop_columns'].columns),
+        "numerical_features": numerical_columns,
+        "categorical_features": categorical_columns,
+        "categorical_statistics": [str(value) for value in imputer.statistics_],
+        "categories": [[str(value) for value in categories] for categories in onehot.categories_],
+        "drop_idx": [None if index is None else int(index) for index in drop_idx],
+        "estimator": estimator,
+        "arrays": files,
+    }
+    digest.update(json.dumps({key: value for key, value in manifest.items()
+                              if key not in ("created", "arrays")}, sort_keys=True).encode())
+    manifest["model_id"] = digest.hexdigest()[:16]
+    # El manifiesto se escribe el ultimo: sin el, el directorio no es un artefacto
+    tmp = directory / f".{MANIFEST}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, directory / MANIFEST)
+    return directory
+
+
+class CompactModel:
+    """
+    Scoring model loaded from a compact artifact.
+
+    Predictions match the exported pipeline up to floating point rounding:
+    NaN numerical and categorical values are imputed like SimpleImputer
+    (``None`` is not a missing value there either) and unknown categories are
+    encoded as all zeros like ``OneHotEncoder(handle_unknown='ignore')``.
+
+    :param directory: Artifact directory.
+    :type directory: Union[str, Path]
+    :raises ValueError: If the directory holds an unknown format or version.
+    """
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        # Se resuelve el enlace de model/ para que los arrays, que se mapean mas
+        # tarde, salgan de la misma version que el manifiesto
+        self.directory = Path(directory).resolve()
+        with open(self.directory / MANIFEST, "r", encoding="utf-8") as manifest_file:
+            self.manifest = json.load(manifest_file)
+        if self.manifest.get("format") != FORMAT:
+            raise ValueError(f"{directory} no es un artefacto {FORMAT}")
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Version de artefacto no soportada: "
+                             f"{self.manifest.get('format_version')}")
+        self.model_id = self.manifest["model_id"]
+        self.numerical_features = self.manifest["numerical_features"]
+        self.categorical_features = self.manifest["categorical_features"]
+        self.estimator = self.manifest["estimator"]
+        self._arrays = {}
+        self._category_codes = None
+
+    def __repr__(self) -> str:
+        return f"CompactModel({str(self.directory)!r}, model_id={self.model_id!r})"
+
+    @property
+    def feature_names_in_(self) -> list:
+        return self.numerical_features + self.categorical_features
+
+    def array(self, name: str) -> np.ndarray:
+        """
+        Memory-mapped, read-only fitted array.
+
+        :param name: Array name in the manifest.
+        :type name: str
+        :return: Array.
+        :rtype: np.ndarray
+        """
+        if name not in self._arrays:
+            entry = self.manifest["arrays"][name]
+            self._arrays[name] = np.load(self.directory / entry["file"], mmap_mode="r")
+        return self._arrays[name]
+
+    def _encode_categorical(self, df: pd.DataFrame) -> np.ndarray:
+        if self._category_codes is None:
+            self._category_codes = [{value: code for code, value in enumerate(categories)}
+                                    for categories in self.manifest["categories"]]
+        blocks = []
+        for column, statistic, codes, drop in zip(self.categorical_features,
+                                                  self.manifest["categorical_statistics"],
+                                                  self._category_codes,
+                                                  self.manifest["drop_idx"]):
+            values = df[column].to_numpy(dtype=object)
+            indices = np.fromiter(
+                (codes.get(statistic if value != value else value, -1) for value in values),
+                dtype=np.int64, count=len(values))
+            block = np.zeros((len(values), len(codes)))
+            known = indices >= 0
+            block[np.flatnonzero(known), indices[known]] = 1.0
+            if drop is not None:
+                block = np.delete(block, drop, axis=1)
+            blocks.append(block)
+        return np.hstack(blocks)
+
+    def transform(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Preprocess and select the features of a batch of credentials.
+
+        :param df: Enriched credentials.
+        :type df: pd.DataFrame
+        :return: Selected features, one row per credential.
+        :rtype: np.ndarray
+        """
+        numerical = df[self.numerical_features].astype('float64').to_numpy()
+        numerical = np.where(np.isnan(numerical), self.array('numerical_statistics'), numerical)
+        numerical = numerical * self.array('scale') + self.array('min')
+        features = np.hstack([numerical, self._encode_categorical(df)])
+        return features[:, self.array('support')]
+
+    def _kernel(self, X: np.ndarray) -> np.ndarray:
+        X_fit = self.array('X_fit')
+        kernel = self.estimator["kernel"]
+        gamma = self.estimator["gamma"]
+        if gamma is None:
+            gamma = 1.0 / X.shape[1]
+        if kernel == "linear":
+            return X @ X_fit.T
+        if kernel in ("polynomial", "poly"):
+            return (gamma * (X @ X_fit.T) + self.estimator["coef0"]) ** self.estimator["degree"]
+        if kernel == "laplacian":
+            distances = np.abs(X[:, None, :] - X_fit[None, :, :]).sum(axis=2)
+        else:
+            distances = ((X ** 2).sum(axis=1)[:, None] - 2 * (X @ X_fit.T)
+                         + (X_fit ** 2).sum(axis=1)[None, :])
+            np.maximum(distances, 0, out=distances)
+        return np.exp(-gamma * distances)
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Predict the risk of enriched credentials.
+
+        :param df: Enriched credentials.
+        :type df: pd.DataFrame
+        :return: Predicted risk in [0, 1].
+        :rtype: np.ndarray
+        """
+        return self.predict_features(self.transform(df))
+
+    def predict_features(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict the risk from a matrix built by :meth:`transform`.
+
+        :param X: Selected features.
+        :type X: np.ndarray
+        :return: Predicted risk in [0, 1].
+        :rtype: np.ndarray
+        """
+        if self.estimator["type"] == "linear":
+            return X @ self.array('coef') + self.estimator["intercept"]
+        return self._kernel(X) @ self.array('dual_coef')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact model artifacts")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export a pickled pipeline")
+    export_parser.add_argument("pipeline", type=Path)
+    export_parser.add_argument("output", type=Path)
+    info_parser = subparsers.add_parser("info", help="Show an artifact manifest")
+    info_parser.add_argument("artifact", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from scoring import load_pipeline
+        output = export_artifact(load_pipeline(args.pipeline), args.output)
+        print(f"{output}: {CompactModel(output).model_id}")
+    elif args.command == "info":
+        model = CompactModel(args.artifact)
+        print(json.dumps({key: model.manifest[key] for key in
+                          ("model_id", "format_version", "created", "estimator")}, indent=2))
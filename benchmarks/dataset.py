@@ -0,0 +1,84 @@
+"""
+Dataset loading: JSON records vs typed Parquet.
+
+data/train.json is resampled to each size and written as JSON records (the
+raw format) and as Parquet through ``dataset.convert``. Every case reports
+the best load time of ``--repeat`` runs and the in-memory size of the
+resulting DataFrame: the full JSON load with ``load_labeled``, the full
+Parquet load, a projection of the model's features, a filtered read
+(``password_strength >= 3``) pushed down to the Parquet reader and the JSON
+load compacted with ``dataset.compact_frame``.
+
+Usage: python -m benchmarks.dataset [--sizes 1000 100000]
+"""
+from pathlib import Path
+import argparse
+import json
+import tempfile
+import time
+import pandas as pd
+from dataset import (CATEGORICAL_FEATURES, NUMERICAL_FEATURES, compact_frame, convert,
+                     load_labeled)
+from settings import DATA_DIR
+
+
+def best_time(load, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = load()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def memory_mb(result) -> float:
+    X, y = result
+    return (X.memory_usage(deep=True).sum() + y.memory_usage(deep=True)) / 2 ** 20
+
+
+def load_compact(path: Path):
+    X, y = load_labeled(path)
+    return compact_frame(X), y
+
+
+def run(sizes: list, repeat: int, seed: int = 0) -> list:
+    raw = pd.read_json(DATA_DIR / "train.json", orient="records")
+    features = NUMERICAL_FEATURES + CATEGORICAL_FEATURES
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            json_path = Path(tmp_dir) / f"train_{size}.json"
+            parquet_path = Path(tmp_dir) / f"train_{size}.parquet"
+            sample = raw.sample(size, replace=True, random_state=seed).reset_index(drop=True)
+            sample.to_json(json_path, orient="records")
+            convert(json_path, parquet_path)
+            cases = {
+                "json": lambda: load_labeled(json_path),
+                "parquet": lambda: load_labeled(parquet_path),
+                "parquet_features": lambda: load_labeled(parquet_path, columns=features),
+                "parquet_filtered": lambda: load_labeled(
+                    parquet_path, filters=[("password_strength", ">=", 3)]),
+                "json_compact": lambda: load_compact(json_path),
+            }
+            baseline = None
+            for name, load in cases.items():
+                seconds, result = best_time(load, repeat)
+                baseline = baseline or (seconds, memory_mb(result))
+                entry = {"rows": size, "case": name, "rows_read": len(result[0]),
+                         "seconds": seconds, "speedup": baseline[0] / seconds,
+                         "memory_mb": memory_mb(result),
+                         "memory_saved": 1 - memory_mb(result) / baseline[1],
+                         "file_mb": (json_path if name.startswith("json") else parquet_path)
+                         .stat().st_size / 2 ** 20}
+                results.append(entry)
+                print(json.dumps(entry))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat, args.seed)
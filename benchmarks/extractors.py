@@ -0,0 +1,100 @@
+"""
+Per-row vs columnar extractor benchmark.
+
+Usage: python -m benchmarks.extractors [--sizes 10000 100000 1000000]
+"""
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import random
+import tempfile
+import time
+import pandas as pd
+import feature_extraction.channel
+import feature_extraction.password
+import feature_extraction.user
+from feature_extraction.pwned_index import build_index
+from randomizer import load_channel_db, load_password_db, load_user_db
+from settings import DATA_DIR, SAMPLES_DIR
+
+
+def timed(func, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def build_sample_index(passwords: list, directory: Path) -> Path:
+    """
+    Local Pwned Passwords index with every sample password, so the benchmark
+    never goes to the network.
+    """
+    ranges = {}
+    for password in set(passwords):
+        digest = hashlib.sha1(password.encode()).hexdigest().upper()
+        ranges.setdefault(digest[:5], []).append(f"{digest[5:]}:1")
+    for prefix, lines in ranges.items():
+        (directory / f"{prefix}.txt").write_text("\n".join(lines))
+    build_index([directory], directory / "pwned.idx")
+    return directory / "pwned.idx"
+
+
+def run(sizes: list, max_rowwise: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    with open(SAMPLES_DIR / "usernames.json", "r", encoding="utf-8") as users_file, \
+            open(SAMPLES_DIR / "psw_dic.json", "r", encoding="utf-8") as diccionario_file, \
+            open(SAMPLES_DIR / "channels.json", "r", encoding="utf-8") as channels_file:
+        users = json.load(users_file)
+        passwords = json.load(diccionario_file)
+        channels = [c["CHANNEL_NAME"] for c in json.load(channels_file)]
+    user_db = load_user_db(DATA_DIR / "user.json")
+    channel_type, channel_priv = load_channel_db(DATA_DIR / "channel.json")
+    password_db = load_password_db(DATA_DIR / "password.json")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = build_sample_index(passwords, Path(tmp_dir))
+        for size in sizes:
+            df = pd.DataFrame({
+                "username": rng.choices(users, k=size),
+                "password": rng.choices(passwords, k=size),
+                "channel": rng.choices(channels, k=size),
+            })
+            cases = {
+                "user": (
+                    lambda: df["username"].apply(feature_extraction.user.get_user, args=user_db),
+                    lambda: feature_extraction.user.get_users(df["username"], *user_db)),
+                "channel": (
+                    lambda: df["channel"].apply(feature_extraction.channel.get_channel,
+                                                args=(channel_priv, channel_type)),
+                    lambda: feature_extraction.channel.get_channels(df["channel"],
+                                                                    channel_priv, channel_type)),
+                "password": (
+                    lambda: df["password"].apply(feature_extraction.password.get_password,
+                                                 args=(password_db, "local", index)),
+                    lambda: feature_extraction.password.get_passwords(df["password"], password_db,
+                                                                      "local", index)),
+            }
+            for name, (rowwise, columnar) in cases.items():
+                rowwise_s = timed(rowwise) if size <= max_rowwise else None
+                columnar_s = timed(columnar)
+                results.append({
+                    "extractor": name,
+                    "rows": size,
+                    "rowwise_s": rowwise_s,
+                    "columnar_s": columnar_s,
+                    "speedup": rowwise_s / columnar_s if rowwise_s else None,
+                })
+                print(results[-1])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--max-rowwise", type=int, default=100_000,
+                        help="Largest size measured with the per-row extractors")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    run(args.sizes, args.max_rowwise, args.seed)
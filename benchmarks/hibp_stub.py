@@ -0,0 +1,98 @@
+"""
+Local stand-in for the HaveIBeenPwned range API.
+
+Serves ``GET /range/<prefix>`` from memory: the suffixes of the given
+passwords with a fixed count, padded with deterministic fake suffixes so
+each response is about as large as a real one (~800 lines). Point the
+extractors at it with the ``HIBP_RANGE_URL`` environment variable.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import hashlib
+import random
+import threading
+from typing import Iterable
+
+
+class HibpStandIn:
+    """
+    In-process HTTP server answering range queries.
+
+    :param passwords: Passwords reported as leaked.
+    :type passwords: Iterable[str]
+    :param padding: Fake suffixes per range, defaults to 800
+    :type padding: int, optional
+    :param seed: Seed of the fake suffixes and counts, defaults to 0
+    :type seed: int, optional
+    :param failing: Prefixes answered with 503, defaults to ()
+    :type failing: Iterable[str], optional
+    """
+
+    def __init__(self, passwords: Iterable[str], padding: int = 800, seed: int = 0,
+                 failing: Iterable[str] = ()) -> None:
+        self.padding = padding
+        self.seed = seed
+        self.failing = {prefix.upper() for prefix in failing}
+        self.leaked = {}
+        rng = random.Random(seed)
+        for password in set(passwords):
+            digest = hashlib.sha1(password.encode()).hexdigest().upper()
+            self.leaked.setdefault(digest[:5], []).append(f"{digest[5:]}:{rng.randint(1, 10**6)}")
+        self.requests = 0
+        self._server = None
+        self._thread = None
+
+    def body(self, prefix: str) -> bytes:
+        rng = random.Random(f"{self.seed}:{prefix}")
+        lines = [f"{rng.getrandbits(140):035X}:{rng.randint(1, 1000)}"
+                 for _ in range(self.padding)]
+        lines += self.leaked.get(prefix, [])
+        return "\r\n".join(sorted(lines)).encode()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/range/"
+
+    def start(self) -> "HibpStandIn":
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                prefix = self.path.rsplit("/", 1)[-1].upper()
+                if not self.path.startswith("/range/") or len(prefix) != 5:
+                    self.send_error(404)
+                    return
+                stand_in.requests += 1
+                if prefix in stand_in.failing:
+                    self.send_error(503)
+                    return
+                payload = stand_in.body(prefix)
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
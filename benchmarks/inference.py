@@ -0,0 +1,80 @@
+"""
+Inference throughput: sklearn pipeline vs compact artifact vs fused NumPy.
+
+The labeled credentials are resampled to each batch size and predicted by
+every model; rows/s is the best of ``--repeat`` runs. With ``--kernel-ridge``
+a KernelRidge pipeline fitted on data/train.json is measured too, since the
+shipped pipeline ends in a linear model.
+
+Usage: python -m benchmarks.inference [--sizes 1 10 100 1000 10000 100000]
+"""
+from pathlib import Path
+import argparse
+import json
+import tempfile
+import time
+import warnings
+import numpy as np
+from artifact import CompactModel, export_artifact
+from dataset import load_labeled
+from inference import FusedModel
+from scoring import load_pipeline
+from settings import BASE_DIR, DATA_DIR
+
+
+def best_time(predict, df, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(df)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def models_for(pipeline, directory: Path) -> dict:
+    export_artifact(pipeline, directory)
+    return {
+        "sklearn": pipeline,
+        "artifact": CompactModel(directory),
+        "fused_float64": FusedModel(directory),
+        "fused_float32": FusedModel(directory, dtype=np.float32),
+    }
+
+
+def run(sizes: list, repeat: int, kernel_ridge: bool, seed: int = 0) -> list:
+    X, y = load_labeled(DATA_DIR / "train.json")
+    pipelines = {"pipeline.pkl": load_pipeline(BASE_DIR / "pipeline.pkl")}
+    if kernel_ridge:
+        from sklearn.kernel_ridge import KernelRidge
+        from training import build_pipeline
+        pipelines["kernel_ridge"] = build_pipeline(KernelRidge(alpha=0.1, kernel="rbf")).fit(X, y)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for pipeline_name, pipeline in pipelines.items():
+            models = models_for(pipeline, Path(tmp_dir) / pipeline_name)
+            expected = pipeline.predict(X)
+            for name, model in models.items():
+                error = float(np.abs(model.predict(X) - expected).max())
+                for size in sizes:
+                    df = X.sample(size, replace=True, random_state=seed).reset_index(drop=True)
+                    seconds = best_time(model.predict, df, repeat)
+                    result = {"pipeline": pipeline_name, "model": name, "rows": size,
+                              "seconds": seconds, "rows_per_s": size / seconds,
+                              "max_abs_error": error}
+                    results.append(result)
+                    print(json.dumps(result))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 10, 100, 1000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--kernel-ridge", action="store_true",
+                        help="Also measure a KernelRidge pipeline fitted on the labeled data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    # OneHotEncoder avisa de categorias desconocidas en cada llamada
+    warnings.simplefilter("ignore", UserWarning)
+    run(args.sizes, args.repeat, args.kernel_ridge, args.seed)
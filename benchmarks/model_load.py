@@ -0,0 +1,66 @@
+"""
+Cold-start benchmark: pickled pipeline vs compact model artifact.
+
+Every sample runs in a fresh interpreter that imports the scoring module,
+loads the model and predicts the test credentials once, reporting the time
+of each phase and the peak RSS of the process.
+
+Usage: python -m benchmarks.model_load [--repeat 5]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from settings import BASE_DIR, DATA_DIR, MODEL_DIR
+
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import pandas as pd
+import scoring
+imported = time.perf_counter()
+model = scoring.load_model(sys.argv[1])
+loaded = time.perf_counter()
+df = pd.read_json(sys.argv[2])
+predict_start = time.perf_counter()
+model.predict(df)
+predicted = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "load_s": loaded - imported,
+    "first_predict_s": predicted - predict_start,
+    "total_s": predicted - start - (predict_start - loaded),
+    "sklearn_imported": "sklearn" in sys.modules,
+    "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+"""
+
+
+def probe(model_path, data_path) -> dict:
+    output = subprocess.run([sys.executable, "-c", PROBE, str(model_path), str(data_path)],
+                            cwd=BASE_DIR, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def run(models: dict, repeat: int) -> list:
+    results = []
+    for name, path in models.items():
+        samples = [probe(path, DATA_DIR / "test.json") for _ in range(repeat)]
+        result = {"model": name, "path": str(path)}
+        for key in ("import_s", "load_s", "first_predict_s", "total_s", "peak_rss_mb"):
+            result[key] = statistics.median(sample[key] for sample in samples)
+        result["sklearn_imported"] = samples[0]["sklearn_imported"]
+        results.append(result)
+        print(json.dumps(result))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pickle", default=BASE_DIR / "pipeline.pkl")
+    parser.add_argument("--artifact", default=MODEL_DIR)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per model")
+    args = parser.parse_args()
+    run({"pickle": args.pickle, "artifact": args.artifact}, args.repeat)
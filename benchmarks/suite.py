@@ -0,0 +1,276 @@
+"""
+Benchmark suite for the enrichment and scoring hot paths.
+
+Every (case, size) runs in a fresh interpreter with seeded synthetic inputs
+built from samples/, so results do not depend on caches warmed by earlier
+cases and peak RSS is measured per case. HaveIBeenPwned requests go to a
+local stand-in (benchmarks.hibp_stub) through ``HIBP_RANGE_URL``.
+
+Usage:
+    python -m benchmarks.suite run -o bench.json
+    python -m benchmarks.suite run --cases get_user predict --baseline bench.json
+    python -m benchmarks.suite compare bench.json new.json --threshold 0.2
+"""
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from typing import Callable, Optional
+import numpy as np
+from benchmarks.hibp_stub import HibpStandIn
+from settings import BASE_DIR, DATA_DIR, MODEL_DIR, SAMPLES_DIR
+
+
+DATA_PATHS = {
+    'user': DATA_DIR / "user.json",
+    'password': DATA_DIR / "password.json",
+    'channel': DATA_DIR / "channel.json",
+    'file': DATA_DIR / "file.json"
+}
+# Tamaños por defecto: los casos con zxcvbn o HIBP son del orden de ms por fila
+DEFAULT_SIZES = {
+    "shannon_entropy": [1000, 10000],
+    "character_statistics": [10000, 1000000],
+    "password_strength": [100, 1000],
+    "get_password": [100, 1000],
+    "get_user": [1000, 10000],
+    "user_index": [10000, 1000000],
+    "get_country_file": [1000, 10000],
+    "gen_random_df": [50, 500],
+    "pipeline_predict": [100, 10000],
+    "model_predict": [100, 10000],
+}
+PACKAGES = ("numpy", "pandas", "sklearn", "zxcvbn", "requests")
+
+
+def load_samples() -> dict:
+    with open(SAMPLES_DIR / "usernames.json", "r", encoding="utf-8") as users_file, \
+            open(SAMPLES_DIR / "psw_dic.json", "r", encoding="utf-8") as diccionario_file, \
+            open(SAMPLES_DIR / "channels.json", "r", encoding="utf-8") as channels_file, \
+            open(SAMPLES_DIR / "file_name.json", "r", encoding="utf-8") as file_name_file:
+        return {
+            'users': json.load(users_file),
+            'diccionario': json.load(diccionario_file),
+            'channels': json.load(channels_file),
+            'file_name': json.load(file_name_file)
+        }
+
+
+def synthetic_passwords(samples: dict, size: int) -> list:
+    from randomizer import password_generator
+    return [password_generator(samples['diccionario']) for _ in range(size)]
+
+
+def prepare(case: str, size: int, seed: int):
+    """
+    Build the seeded inputs of a case.
+
+    :return: ``("item", function, inputs)`` to time every call separately or
+        ``("batch", function, input)`` to time whole calls.
+    :rtype: tuple
+    """
+    random.seed(seed)
+    rng = random.Random(seed)
+    samples = load_samples()
+
+    if case == "shannon_entropy":
+        from feature_extraction.password import shannon_entropy
+        return "item", shannon_entropy, synthetic_passwords(samples, size)
+    if case == "character_statistics":
+        from feature_extraction.charstats import character_statistics
+        return "batch", character_statistics, synthetic_passwords(samples, size)
+    if case == "password_strength":
+        from feature_extraction.password import password_strength
+        return "item", password_strength, synthetic_passwords(samples, size)
+    if case == "get_password":
+        from feature_extraction.password import get_password
+        from randomizer import load_password_db
+        password_types = load_password_db(DATA_PATHS['password'])
+        return "item", lambda password: get_password(password, password_types), \
+            synthetic_passwords(samples, size)
+    if case == "get_user":
+        from feature_extraction.user import get_user
+        from randomizer import load_user_db
+        user_db = load_user_db(DATA_PATHS['user'])
+        return "item", lambda username: get_user(username, *user_db), \
+            rng.choices(samples['users'], k=size)
+    if case == "user_index":
+        import pandas as pd
+        from randomizer import load_user_index
+        user_index = load_user_index(DATA_PATHS['user'])
+        return "batch", user_index.get_users, \
+            pd.Series(rng.choices(samples['users'], k=size), dtype=object)
+    if case == "get_country_file":
+        from feature_extraction.file import get_country_file
+        from randomizer import load_file_db
+        files_data = load_file_db(DATA_PATHS['file'])
+        return "item", lambda file: get_country_file(file, files_data), \
+            rng.choices(samples['file_name'], k=size)
+    if case == "gen_random_df":
+        from randomizer import gen_random_df
+        return "batch", lambda n: gen_random_df(samples, DATA_PATHS, n_samples=n), size
+    if case in ("pipeline_predict", "model_predict"):
+        import warnings
+        from dataset import load_labeled
+        from scoring import load_model
+        warnings.simplefilter("ignore", UserWarning)
+        X, _ = load_labeled(DATA_DIR / "train.json")
+        df = X.sample(size, replace=True, random_state=seed).reset_index(drop=True)
+        model = load_model(BASE_DIR / "pipeline.pkl" if case == "pipeline_predict" else MODEL_DIR)
+        return "batch", model.predict, df
+    raise ValueError(f"Caso desconocido: {case}")
+
+
+def measure(case: str, size: int, seed: int, repeat: int) -> dict:
+    """
+    Run one case in the current process.
+
+    :return: Throughput, latency percentiles and peak RSS.
+    :rtype: dict
+    """
+    kind, function, inputs = prepare(case, size, seed)
+    latencies = []
+    if kind == "item":
+        start = time.perf_counter()
+        for value in inputs:
+            call_start = time.perf_counter()
+            function(value)
+            latencies.append(time.perf_counter() - call_start)
+        seconds = time.perf_counter() - start
+    else:
+        function(inputs)  # calentamiento: carga de bases de datos e imports perezosos
+        for _ in range(repeat):
+            call_start = time.perf_counter()
+            function(inputs)
+            latencies.append(time.perf_counter() - call_start)
+        seconds = float(np.median(latencies))
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        "case": case,
+        "size": size,
+        "kind": kind,
+        "seconds": seconds,
+        "rows_per_s": size / seconds,
+        "latency_ms": {"p50": p50, "p95": p95, "p99": p99,
+                       "mean": float(np.mean(latencies)) * 1000},
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def environment() -> dict:
+    versions = {}
+    for package in PACKAGES:
+        try:
+            module = __import__(package)
+            versions[package] = getattr(module, "__version__", "unknown")
+        except ImportError:
+            versions[package] = None
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "packages": versions}
+
+
+def run(cases: list, sizes: Optional[list], seed: int, repeat: int,
+        log: Callable[[str], None] = print) -> dict:
+    """
+    Run every (case, size) in its own interpreter against the HIBP stand-in.
+
+    :return: Report with the environment and one result per (case, size).
+    :rtype: dict
+    """
+    samples = load_samples()
+    results = []
+    with HibpStandIn(samples['diccionario'], seed=seed) as hibp:
+        env = dict(os.environ, HIBP_RANGE_URL=hibp.url)
+        for case in cases:
+            for size in sizes or DEFAULT_SIZES[case]:
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.suite", "case", case, str(size),
+                     "--seed", str(seed), "--repeat", str(repeat)],
+                    cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results.append(result)
+                log(f"{case:<18} {size:>8} {result['rows_per_s']:>12.0f} rows/s  "
+                    f"p99 {result['latency_ms']['p99']:9.3f} ms  "
+                    f"rss {result['peak_rss_mb']:7.1f} MB")
+    return {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "seed": seed, "environment": environment(), "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float,
+            log: Callable[[str], None] = print) -> list:
+    """
+    Compare two reports.
+
+    A (case, size) regresses when its throughput drops, or its peak RSS
+    grows, by more than ``threshold`` (a fraction) of the baseline.
+
+    :return: Regressions as ``(case, size, metric, baseline, current)``.
+    :rtype: list
+    """
+    previous = {(result["case"], result["size"]): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        key = (result["case"], result["size"])
+        if key not in previous:
+            continue
+        old = previous[key]
+        change = result["rows_per_s"] / old["rows_per_s"] - 1
+        status = "ok"
+        if change < -threshold:
+            regressions.append(key + ("rows_per_s", old["rows_per_s"], result["rows_per_s"]))
+            status = "REGRESSION"
+        if result["peak_rss_mb"] > old["peak_rss_mb"] * (1 + threshold):
+            regressions.append(key + ("peak_rss_mb", old["peak_rss_mb"], result["peak_rss_mb"]))
+            status = "REGRESSION"
+        log(f"{key[0]:<18} {key[1]:>8} {old['rows_per_s']:>12.0f} -> "
+            f"{result['rows_per_s']:>12.0f} rows/s ({change:+.1%})  {status}")
+    return regressions
+
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as report_file:
+        return json.load(report_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--cases", nargs="+", choices=list(DEFAULT_SIZES),
+                            default=list(DEFAULT_SIZES))
+    run_parser.add_argument("--sizes", nargs="+", type=int,
+                            help="Sizes for every case, defaults to DEFAULT_SIZES")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timed calls of batch cases")
+    run_parser.add_argument("-o", "--output", help="JSON report")
+    run_parser.add_argument("--baseline", help="Report to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.2)
+    compare_parser = subparsers.add_parser("compare", help="Compare two reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.2)
+    case_parser = subparsers.add_parser("case", help="Run one case in this process")
+    case_parser.add_argument("case", choices=list(DEFAULT_SIZES))
+    case_parser.add_argument("size", type=int)
+    case_parser.add_argument("--seed", type=int, default=0)
+    case_parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "case":
+        print(json.dumps(measure(args.case, args.size, args.seed, args.repeat)))
+    elif args.command == "run":
+        report = run(args.cases, args.sizes, args.seed, args.repeat)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as report_file:
+                json.dump(report, report_file, indent=2)
+        if args.baseline and compare(load_report(args.baseline), report, args.threshold):
+            sys.exit(1)
+    else:
+        if compare(load_report(args.baseline), load_report(args.current), args.threshold):
+            sys.exit(1)
@@ -0,0 +1,107 @@
+"""
+Local stand-in for the Telemetr.io API.
+
+Serves ``GET /channels/stats?internal_id=<id>`` from memory with
+deterministic statistics per channel, answering a fraction of the requests
+with 429 or 503 to exercise the client's retries, and the ``failing`` ids
+always with 404. Point the client at it
+with ``AsyncTelemetrio(key, base_url=stand_in.url)``.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+from typing import Iterable
+from urllib.parse import parse_qs, urlparse
+
+
+class TelemetrioStandIn:
+    """
+    In-process HTTP server answering channel stats queries.
+
+    :param error_rate: Fraction of requests answered with 429 or 503, defaults to 0.0
+    :type error_rate: float, optional
+    :param seed: Seed of the statistics and the errors, defaults to 0
+    :type seed: int, optional
+    :param failing: Internal ids answered with 404, defaults to ()
+    :type failing: Iterable[str], optional
+    """
+
+    def __init__(self, error_rate: float = 0.0, seed: int = 0,
+                 failing: Iterable[str] = ()) -> None:
+        self.error_rate = error_rate
+        self.seed = seed
+        self.failing = set(failing)
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def stats(self, internal_id: str) -> dict:
+        rng = random.Random(f"{self.seed}:{internal_id}")
+        return {"participants_count": rng.randint(100, 10**6),
+                "err_percent": round(rng.uniform(0, 50), 2),
+                "mentions_count": rng.randint(0, 1000),
+                "posts_per_day": rng.randint(0, 100),
+                "forwards_count": rng.randint(0, 10**4)}
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "TelemetrioStandIn":
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                internal_id = parse_qs(url.query).get("internal_id", [""])[0]
+                if url.path != "/channels/stats" or not internal_id:
+                    self.send_error(404)
+                    return
+                with stand_in._lock:
+                    stand_in.requests += 1
+                    if internal_id in stand_in.failing:
+                        self.send_error(404)
+                        return
+                    failed = stand_in._rng.random() < stand_in.error_rate
+                    stand_in.errors += failed
+                if failed:
+                    self.send_response(stand_in._rng.choice([429, 503]))
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                payload = json.dumps({"response": stand_in.stats(internal_id)}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
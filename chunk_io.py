@@ -0,0 +1,160 @@
+from decimal import Decimal
+from pathlib import Path
+import sys
+from typing import Iterator, Optional, Union
+import numpy as np
+import pandas as pd
+
+
+KEY_COLUMNS = ['username', 'password', 'channel', 'file']
+FORMATS = ("ndjson", "csv", "parquet")
+
+
+def guess_format(path: Union[str, Path], default: str = "ndjson") -> str:
+    """
+    Guess a chunked format from a file extension.
+
+    :param path: File path, "-" for stdin/stdout.
+    :type path: Union[str, Path]
+    :param default: Format when it cannot be guessed, defaults to "ndjson"
+    :type default: str, optional
+    :return: One of FORMATS.
+    :rtype: str
+    """
+    suffix = Path(str(path)).suffix.lower()
+    return {".csv": "csv", ".parquet": "parquet", ".pq": "parquet",
+            ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(suffix, default)
+
+
+def _as_text(value) -> str:
+    # Numeros JSON junto a nulls llegan como float: 123456 -> 123456.0
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def read_chunks(source: Union[str, Path], fmt: Optional[str] = None,
+                chunksize: int = 10000) -> Iterator[pd.DataFrame]:
+    """
+    Read a NDJSON or CSV file in chunks of at most ``chunksize`` rows.
+
+    The credential columns are always read as strings, so passwords such as
+    "123456" or "NA" are not converted to numbers or missing values. Missing
+    values (an empty CSV field or a JSON null) are read as NaN in both formats.
+
+    :param source: File path, "-" for stdin.
+    :type source: Union[str, Path]
+    :param fmt: "ndjson" or "csv", defaults to guessing from the extension
+    :type fmt: str, optional
+    :param chunksize: Rows per chunk, defaults to 10000
+    :type chunksize: int, optional
+    :return: Iterator of DataFrames.
+    :rtype: Iterator[pd.DataFrame]
+    """
+    fmt = fmt or guess_format(source)
+    handle = sys.stdin if str(source) == "-" else open(source, "r", encoding="utf-8")
+    try:
+        if fmt == "csv":
+            reader = pd.read_csv(handle, chunksize=chunksize,
+                                 dtype={column: str for column in KEY_COLUMNS},
+                                 keep_default_na=False, na_values=[""])
+        elif fmt == "ndjson":
+            # object y no str: con str un null se leeria como la cadena "None"
+            reader = pd.read_json(handle, lines=True, chunksize=chunksize,
+                                  dtype={column: object for column in KEY_COLUMNS},
+                                  convert_dates=False)
+        else:
+            raise ValueError(f"Formato de entrada no soportado: {fmt}")
+        with reader:
+            for chunk in reader:
+                if fmt == "ndjson":
+                    for column in chunk.columns.intersection(KEY_COLUMNS):
+                        values = chunk[column].astype(object)
+                        chunk[column] = values.map(_as_text, na_action="ignore") \
+                            .where(values.notna(), np.nan)
+                yield chunk
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+
+def _to_native(df: pd.DataFrame) -> pd.DataFrame:
+    # zxcvbn devuelve Decimal, que ni JSON ni Arrow admiten tal cual
+    for column in df.columns[df.dtypes == object]:
+        first = df[column].first_valid_index()
+        if first is not None and isinstance(df[column][first], Decimal):
+            df[column] = df[column].astype(float)
+    return df
+
+
+class ChunkWriter:
+    """
+    Streaming writer of DataFrame chunks as NDJSON or Parquet.
+
+    Every chunk is written as soon as it arrives, so memory use does not
+    depend on the total number of rows. The Parquet schema is fixed by the
+    first chunk and later chunks are cast to it.
+
+    :param target: File path, "-" for stdout (NDJSON only).
+    :type target: Union[str, Path]
+    :param fmt: "ndjson" or "parquet", defaults to guessing from the extension
+    :type fmt: str, optional
+    """
+
+    def __init__(self, target: Union[str, Path], fmt: Optional[str] = None) -> None:
+        self.fmt = fmt or guess_format(target)
+        if self.fmt not in ("ndjson", "parquet"):
+            raise ValueError(f"Formato de salida no soportado: {self.fmt}")
+        self.target = target
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+        if self.fmt == "ndjson":
+            self._handle = sys.stdout if str(target) == "-" else \
+                open(target, "w", encoding="utf-8")
+        elif str(target) == "-":
+            raise ValueError("Parquet no se puede escribir en stdout")
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Write a chunk.
+
+        :param df: Chunk to write.
+        :type df: pd.DataFrame
+        """
+        df = _to_native(df.copy())
+        if self.fmt == "ndjson":
+            if len(df):
+                text = df.to_json(orient="records", lines=True, force_ascii=False)
+                # pandas >= 1.5 ya termina con salto de linea; uno extra deja lineas vacias
+                self._handle.write(text if text.endswith("\n") else text + "\n")
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                # Las columnas vacias del primer bloque se declaran como texto
+                self._schema = pa.schema([
+                    field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                    for field in table.schema
+                ]).remove_metadata()
+                self._writer = pq.ParquetWriter(self.target, self._schema)
+            self._writer.write_table(table.select(self._schema.names).cast(self._schema))
+        self.rows += len(df)
+
+    def close(self) -> None:
+        """
+        Flush and close the output.
+        """
+        if self._writer is not None:
+            self._writer.close()
+        if self.fmt == "ndjson" and self._handle is not sys.stdout:
+            self._handle.close()
+        elif self.fmt == "ndjson":
+            self._handle.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,649 @@
+"""
+Sharded scoring of large dumps across worker processes or nodes.
+
+The coordinator splits the input into ``--shards`` hash partitions by
+password, so every occurrence of a password lands in the same shard and its
+zxcvbn/HIBP features are computed (and cached, one feature cache per shard)
+by a single worker. Shards are handed out through a file queue in a work
+directory. A worker claims a task by atomically renaming it from
+``queue/pending`` to ``queue/running`` and keeps the claim alive by touching
+it. It writes the scored shard to ``results/`` and reports to
+``queue/done`` or ``queue/failed``. The coordinator requeues failed shards
+and shards whose claim expired, up to ``--retries`` times, restarts local
+workers that died and finally merges the shard results back into the input
+order.
+
+Every run gets a job id that tags its tasks, done reports and results, so
+workers or reports left over from an earlier job are ignored. A work
+directory that already holds a job is refused unless ``--reset`` clears it.
+
+Workers on other nodes only need the work directory on a shared filesystem:
+
+    python coordinator.py run dump.ndjson -o scored.ndjson --shards 64 --workers 4
+    python coordinator.py worker /shared/work --worker-id node7   # on another node
+"""
+from pathlib import Path
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import List, Optional, Union
+import uuid
+import numpy as np
+import pandas as pd
+from chunk_io import ChunkWriter, read_chunks
+from score import DATA_PATHS
+from settings import CACHE_DIR, MODEL_DIR, SAMPLES_DIR
+
+
+ROW_COLUMN = "_row"
+JOB_FILE = "job.json"
+STOP_FILE = "STOP"
+QUEUES = ("pending", "running", "done", "failed")
+DEFAULT_LEASE = 60.0
+DEFAULT_POLL = 0.2
+
+
+def shard_name(shard: int) -> str:
+    return f"shard-{shard:05d}"
+
+
+def _write_json(path: Path, data: dict) -> None:
+    # Escritura atomica: los lectores nunca ven un fichero a medias
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def shard_of(passwords: pd.Series, n_shards: int) -> np.ndarray:
+    """
+    Shard of every password, stable across processes and machines.
+
+    :param passwords: Passwords.
+    :type passwords: pd.Series
+    :param n_shards: Number of shards.
+    :type n_shards: int
+    :return: Shard numbers.
+    :rtype: np.ndarray
+    """
+    hashes = pd.util.hash_pandas_object(passwords.astype(str), index=False).to_numpy()
+    return (hashes % np.uint64(n_shards)).astype(np.int64)
+
+
+def partition(source: Union[str, Path],
+              shards_dir: Path,
+              n_shards: int,
+              fmt: Optional[str] = None,
+              chunksize: int = 10000) -> List[int]:
+    """
+    Split a dump into NDJSON shards by password, tagging every row with its input position.
+
+    :param source: NDJSON or CSV file, "-" for stdin.
+    :type source: Union[str, Path]
+    :param shards_dir: Directory of the shard files.
+    :type shards_dir: Path
+    :param n_shards: Number of shards.
+    :type n_shards: int
+    :param fmt: "ndjson" or "csv", defaults to guessing from the extension
+    :type fmt: str, optional
+    :param chunksize: Rows read at a time, defaults to 10000
+    :type chunksize: int, optional
+    :return: Rows per shard.
+    :rtype: List[int]
+    """
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    writers = [ChunkWriter(shards_dir / f"{shard_name(shard)}.ndjson", "ndjson")
+               for shard in range(n_shards)]
+    offset = 0
+    try:
+        for chunk in read_chunks(source, fmt, chunksize):
+            chunk.insert(0, ROW_COLUMN, np.arange(offset, offset + len(chunk)))
+            offset += len(chunk)
+            for shard, part in chunk.groupby(shard_of(chunk['password'], n_shards)):
+                writers[shard].write(part)
+    finally:
+        for writer in writers:
+            writer.close()
+    return [writer.rows for writer in writers]
+
+
+class FileQueue:
+    """
+    Shard tasks exchanged through a directory.
+
+    :param directory: Work directory, shared by the coordinator and every worker.
+    :type directory: Union[str, Path]
+    """
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+        self.queue_dir = self.directory / "queue"
+        self.shards_dir = self.directory / "shards"
+        self.results_dir = self.directory / "results"
+
+    def path(self, queue: str, name: str) -> Path:
+        return self.queue_dir / queue / f"{name}.json"
+
+    def result_path(self, shard: int, job_id: str) -> Path:
+        return self.results_dir / f"{shard_name(shard)}.{job_id}.ndjson"
+
+    def in_use(self) -> bool:
+        return any((self.directory / name).exists()
+                   for name in (JOB_FILE, STOP_FILE, "queue", "shards", "results"))
+
+    def clear(self) -> None:
+        """
+        Delete the job, queues, shards, results and stop flag of a previous run.
+        """
+        for directory in (self.queue_dir, self.shards_dir, self.results_dir):
+            shutil.rmtree(directory, ignore_errors=True)
+        for name in (JOB_FILE, STOP_FILE):
+            (self.directory / name).unlink(missing_ok=True)
+
+    def create(self, job: dict, reset: bool = False) -> dict:
+        """
+        Create the directories and write the job description under a new job id.
+
+        :param job: Scoring options shared by every worker.
+        :type job: dict
+        :param reset: Clear a previous job in the directory, defaults to False
+        :type reset: bool, optional
+        :raises FileExistsError: If the directory holds a previous job and ``reset`` is False.
+        :return: Job description with its ``id``.
+        :rtype: dict
+        """
+        if self.in_use():
+            if not reset:
+                raise FileExistsError(f"{self.directory} ya contiene un trabajo; "
+                                      f"usa --reset para vaciarlo")
+            self.clear()
+        for queue in QUEUES:
+            (self.queue_dir / queue).mkdir(parents=True, exist_ok=True)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        job = dict(job, id=uuid.uuid4().hex[:12])
+        _write_json(self.directory / JOB_FILE, job)
+        return job
+
+    def job(self) -> dict:
+        return _read_json(self.directory / JOB_FILE)
+
+    def submit(self, shard: int, job_id: str, attempt: int = 0) -> None:
+        _write_json(self.path("pending", shard_name(shard)),
+                    {"shard": shard, "job": job_id, "attempt": attempt})
+
+    def reports(self, queue: str, job_id: str) -> dict:
+        """
+        Reports of a queue that belong to a job; reports of other jobs are deleted.
+
+        :param queue: "done" or "failed".
+        :type queue: str
+        :param job_id: Job id.
+        :type job_id: str
+        :return: Shard name to report.
+        :rtype: dict
+        """
+        reports = {}
+        for name in self.names(queue):
+            report = _read_json(self.path(queue, name))
+            if report is None:
+                continue
+            if report.get("job") != job_id:
+                self.path(queue, name).unlink(missing_ok=True)
+                continue
+            reports[name] = report
+        return reports
+
+    def names(self, queue: str) -> List[str]:
+        return sorted(path.stem for path in (self.queue_dir / queue).glob("shard-*.json"))
+
+    def claim(self, worker_id: str, slot: int = 0, slots: int = 1) -> Optional[dict]:
+        """
+        Claim a pending task, preferring the shards of the worker's slot.
+
+        :param worker_id: Worker identifier.
+        :type worker_id: str
+        :param slot: Slot of the worker, defaults to 0
+        :type slot: int, optional
+        :param slots: Number of slots, defaults to 1
+        :type slots: int, optional
+        :return: Task with the path of its claim, or None if nothing is pending.
+        :rtype: Optional[dict]
+        """
+        # Afinidad: el mismo slot recibe los mismos shards en cada ejecucion
+        pending = sorted(self.names("pending"),
+                         key=lambda name: (int(name.split("-")[1]) % slots != slot, name))
+        for name in pending:
+            # El id del worker en el nombre: un reintento no pisa la reclamacion anterior
+            claim = self.queue_dir / "running" / f"{name}.{worker_id}.json"
+            try:
+                os.rename(self.path("pending", name), claim)
+            except FileNotFoundError:
+                continue
+            task = _read_json(claim) or {"shard": int(name.split("-")[1]), "attempt": 0}
+            task.update(worker=worker_id, claim=str(claim))
+            _write_json(claim, task)
+            return task
+        return None
+
+    def stopped(self) -> bool:
+        return (self.directory / STOP_FILE).exists()
+
+    def stop(self) -> None:
+        (self.directory / STOP_FILE).touch()
+
+
+def _heartbeat(claim: Path, interval: float, finished: threading.Event) -> None:
+    while not finished.wait(interval):
+        try:
+            os.utime(claim)
+        except FileNotFoundError:
+            return
+
+
+def score_shard(queue: FileQueue, shard: int, job: dict, models: dict) -> int:
+    """
+    Score one shard into ``results/``.
+
+    :param queue: File queue.
+    :type queue: FileQueue
+    :param shard: Shard number.
+    :type shard: int
+    :param job: Scoring options, see :func:`run`.
+    :type job: dict
+    :param models: Objects loaded once per worker: pipeline, channel store and plan.
+    :type models: dict
+    :return: Rows scored.
+    :rtype: int
+    """
+    from feature_extraction.cache import FeatureCache
+    from score import score_chunks
+
+    name = shard_name(shard)
+    target = queue.result_path(shard, job["id"])
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    # Una cache por shard: cada contraseña cae siempre en el mismo
+    cache = FeatureCache(Path(job["cache_dir"]) / f"{name}.sqlite") if job["cache_dir"] else None
+    try:
+        with ChunkWriter(tmp, "ndjson") as writer:
+            for chunk in read_chunks(queue.shards_dir / f"{name}.ndjson", "ndjson",
+                                     job["chunksize"]):
+                rows = chunk.pop(ROW_COLUMN).to_numpy()
+                for scored in score_chunks([chunk], models["pipeline"], models["channel_store"],
+                                           data_paths=dict(DATA_PATHS, user=job["users"]),
+                                           cache=cache,
+                                           pwned_backend=job["pwned_backend"],
+                                           pwned_index=job["pwned_index"],
+                                           plan=models["plan"]):
+                    scored.insert(0, ROW_COLUMN, rows)
+                    writer.write(scored)
+        os.replace(tmp, target)
+        return writer.rows
+    finally:
+        tmp.unlink(missing_ok=True)
+        if cache is not None:
+            cache.close()
+
+
+def work(directory: Union[str, Path],
+         worker_id: str,
+         slot: int = 0,
+         slots: int = 1,
+         poll: float = DEFAULT_POLL) -> int:
+    """
+    Worker loop: claim, score and report shards until the coordinator stops the job.
+
+    :param directory: Work directory.
+    :type directory: Union[str, Path]
+    :param worker_id: Worker identifier.
+    :type worker_id: str
+    :param slot: Slot of the worker, defaults to 0
+    :type slot: int, optional
+    :param slots: Number of slots, defaults to 1
+    :type slots: int, optional
+    :param poll: Seconds between queue checks, defaults to DEFAULT_POLL
+    :type poll: float, optional
+    :return: Shards scored.
+    :rtype: int
+    """
+    from feature_extraction.channel_store import load_channel_store
+    from feature_extraction.plan import build_plan
+    from scoring import load_model
+
+    queue = FileQueue(directory)
+    job = queue.job()
+    pipeline = load_model(job["model"])
+    models = {"pipeline": pipeline,
+              "channel_store": load_channel_store(job["channels"]),
+              "plan": build_plan(pipeline, job["extras"])}
+    scored = 0
+    # Un worker de un trabajo anterior termina en cuanto el directorio cambia de trabajo
+    while not queue.stopped() and (queue.job() or {}).get("id") == job["id"]:
+        task = queue.claim(worker_id, slot, slots)
+        if task is None:
+            time.sleep(poll)
+            continue
+        claim = Path(task.pop("claim"))
+        if task.get("job") != job["id"]:
+            os.replace(claim, queue.path("pending", shard_name(task["shard"])))
+            break
+        finished = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat,
+                                     args=(claim, job["lease"] / 3, finished), daemon=True)
+        heartbeat.start()
+        name = shard_name(task["shard"])
+        start = time.perf_counter()
+        try:
+            rows = score_shard(queue, task["shard"], job, models)
+            _write_json(queue.path("done", name),
+                        dict(task, rows=rows, seconds=time.perf_counter() - start))
+            scored += 1
+        except Exception:
+            _write_json(queue.path("failed", name), dict(task, error=traceback.format_exc()))
+        finally:
+            finished.set()
+            heartbeat.join()
+            claim.unlink(missing_ok=True)
+    return scored
+
+
+def merge(paths: List[Path], output: Union[str, Path], fmt: Optional[str] = None,
+          chunksize: int = 10000) -> int:
+    """
+    Merge shard results, each ordered by input position, into one output in input order.
+
+    Rows are emitted a window at a time: every row up to the smallest last
+    position buffered among the shards still being read is already available,
+    so memory stays bounded by about one chunk per shard.
+
+    :param paths: Shard results with a ROW_COLUMN column.
+    :type paths: List[Path]
+    :param output: Output file, "-" for stdout.
+    :type output: Union[str, Path]
+    :param fmt: "ndjson" or "parquet", defaults to guessing from the extension
+    :type fmt: str, optional
+    :param chunksize: Rows read at a time from each shard, defaults to 10000
+    :type chunksize: int, optional
+    :raises RuntimeError: If input positions are missing or repeated.
+    :return: Rows written.
+    :rtype: int
+    """
+    readers = [read_chunks(path, "ndjson", chunksize) for path in paths]
+    buffers = [pd.DataFrame() for _ in paths]
+    active = list(range(len(paths)))
+    expected = 0
+    with ChunkWriter(output, fmt) as writer:
+        while active or any(len(buffer) for buffer in buffers):
+            for index in list(active):
+                if len(buffers[index]) == 0:
+                    chunk = next(readers[index], None)
+                    if chunk is None:
+                        active.remove(index)
+                    else:
+                        buffers[index] = chunk
+            bound = min((buffers[index][ROW_COLUMN].iat[-1] for index in active),
+                        default=None)
+            parts = []
+            for index, buffer in enumerate(buffers):
+                if len(buffer) == 0:
+                    continue
+                ready = buffer[ROW_COLUMN].to_numpy() <= bound if bound is not None \
+                    else np.ones(len(buffer), dtype=bool)
+                parts.append(buffer[ready])
+                buffers[index] = buffer[~ready]
+            parts = [part for part in parts if len(part)]
+            if not parts:
+                continue
+            window = pd.concat(parts, ignore_index=True).sort_values(ROW_COLUMN, kind="stable")
+            rows = window.pop(ROW_COLUMN).to_numpy()
+            if not np.array_equal(rows, np.arange(expected, expected + len(rows))):
+                raise RuntimeError(f"Resultados incompletos a partir de la fila {expected}")
+            expected += len(rows)
+            writer.write(window.reset_index(drop=True))
+        return writer.rows
+
+
+def _spawn(directory: Path, worker_id: str, slot: int, slots: int) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, str(Path(__file__).absolute()), "worker",
+                             str(directory), "--worker-id", worker_id,
+                             "--slot", str(slot), "--slots", str(slots)])
+
+
+def coordinate(queue: FileQueue,
+               n_shards: int,
+               workers: int = 2,
+               retries: int = 2,
+               lease: float = DEFAULT_LEASE,
+               poll: float = DEFAULT_POLL) -> dict:
+    """
+    Run local workers until every shard is done, retrying failed or abandoned shards.
+
+    :param queue: File queue with the shards submitted.
+    :type queue: FileQueue
+    :param n_shards: Number of shards.
+    :type n_shards: int
+    :param workers: Local worker processes, 0 to rely on external workers, defaults to 2
+    :type workers: int, optional
+    :param retries: Retries per shard, defaults to 2
+    :type retries: int, optional
+    :param lease: Seconds without heartbeat before a claimed shard is requeued,
+        defaults to DEFAULT_LEASE
+    :type lease: float, optional
+    :param poll: Seconds between queue checks, defaults to DEFAULT_POLL
+    :type poll: float, optional
+    :raises RuntimeError: If a shard fails more than ``retries`` times or local workers
+        keep dying.
+    :return: ``{"retries": n, "restarts": n, "shards": {name: done report}}``
+    :rtype: dict
+    """
+    job_id = queue.job()["id"]
+    processes = {f"w{slot}": _spawn(queue.directory, f"w{slot}", slot, workers)
+                 for slot in range(workers)}
+    stats = {"retries": 0, "restarts": 0}
+    try:
+        while len(queue.reports("done", job_id)) < n_shards:
+            for name, task in queue.reports("failed", job_id).items():
+                queue.path("failed", name).unlink(missing_ok=True)
+                if task["attempt"] >= retries:
+                    raise RuntimeError(f"{name} fallo {task['attempt'] + 1} veces:\n{task['error']}")
+                queue.submit(task["shard"], job_id, task["attempt"] + 1)
+                stats["retries"] += 1
+
+            for name in queue.names("running"):
+                claim = queue.path("running", name)
+                try:
+                    expired = time.time() - claim.stat().st_mtime > lease
+                except FileNotFoundError:
+                    continue
+                task = _read_json(claim) if expired else None
+                if task is None or queue.path("done", shard_name(task["shard"])).exists():
+                    continue
+                if task.get("job") != job_id:
+                    # Reclamacion caducada de un trabajo anterior
+                    claim.unlink(missing_ok=True)
+                    continue
+                # Sin latido: el worker murio o se colgo; el shard vuelve a la cola
+                claim.unlink(missing_ok=True)
+                if task["attempt"] >= retries:
+                    raise RuntimeError(f"{shard_name(task['shard'])} abandonado "
+                                       f"{task['attempt'] + 1} veces")
+                queue.submit(task["shard"], job_id, task["attempt"] + 1)
+                stats["retries"] += 1
+
+            for slot, (worker_id, process) in enumerate(list(processes.items())):
+                if process.poll() is not None:
+                    # Un worker local caido se sustituye; sus shards vuelven a la cola por lease
+                    if stats["restarts"] >= workers * (retries + 1):
+                        raise RuntimeError(f"Demasiados workers caidos ({stats['restarts']})")
+                    processes[worker_id] = _spawn(queue.directory, worker_id, slot, workers)
+                    stats["restarts"] += 1
+            time.sleep(poll)
+    finally:
+        queue.stop()
+        for process in processes.values():
+            try:
+                process.wait(timeout=max(lease, 10))
+            except subprocess.TimeoutExpired:
+                process.kill()
+    stats["shards"] = queue.reports("done", job_id)
+    return stats
+
+
+def run(source: Union[str, Path],
+        output: Union[str, Path],
+        n_shards: int = 16,
+        workers: int = 2,
+        work_dir: Union[str, Path, None] = None,
+        retries: int = 2,
+        lease: float = DEFAULT_LEASE,
+        input_format: Optional[str] = None,
+        output_format: Optional[str] = None,
+        chunksize: int = 10000,
+        model: Union[str, Path] = MODEL_DIR,
+        channels: Union[str, Path] = SAMPLES_DIR / "channels.json",
+        users: Union[str, Path] = DATA_PATHS['user'],
+        cache_dir: Union[str, Path, None] = CACHE_DIR / "shards",
+        pwned_backend: str = "remote",
+        pwned_index: Optional[str] = None,
+        extras: Optional[list] = None,
+        keep: bool = False,
+        reset: bool = False) -> dict:
+    """
+    Partition, score in parallel and merge a dump.
+
+    :param source: NDJSON or CSV file, "-" for stdin.
+    :type source: Union[str, Path]
+    :param output: Output file, "-" for stdout.
+    :type output: Union[str, Path]
+    :param n_shards: Number of shards, defaults to 16
+    :type n_shards: int, optional
+    :param workers: Local worker processes, defaults to 2
+    :type workers: int, optional
+    :param work_dir: Work directory (shared with remote workers), defaults to a temporary one
+    :type work_dir: Union[str, Path], optional
+    :param retries: Retries per shard, defaults to 2
+    :type retries: int, optional
+    :param lease: Seconds without heartbeat before a shard is requeued, defaults to DEFAULT_LEASE
+    :type lease: float, optional
+    :param input_format: "ndjson" or "csv", defaults to guessing from the extension
+    :type input_format: str, optional
+    :param output_format: "ndjson" or "parquet", defaults to guessing from the extension
+    :type output_format: str, optional
+    :param chunksize: Rows per chunk, defaults to 10000
+    :type chunksize: int, optional
+    :param model: Model artifact directory or pickled pipeline, defaults to MODEL_DIR
+    :type model: Union[str, Path], optional
+    :param channels: Channel statistics used for enrichment, defaults to samples/channels.json
+    :type channels: Union[str, Path], optional
+    :param users: User directory, JSON database or prebuilt index, defaults to data/user.json
+    :type users: Union[str, Path], optional
+    :param cache_dir: Directory of the per-shard feature caches, None to disable,
+        defaults to .cache/shards
+    :type cache_dir: Union[str, Path], optional
+    :param pwned_backend: Backend for the leaked password count, defaults to "remote"
+    :type pwned_backend: str, optional
+    :param pwned_index: Local Pwned Passwords index, defaults to None
+    :type pwned_index: str, optional
+    :param extras: Extra enriched columns, see :func:`feature_extraction.plan.build_plan`
+    :type extras: list, optional
+    :param keep: Keep the work directory, defaults to False
+    :type keep: bool, optional
+    :param reset: Clear a previous job left in ``work_dir``, defaults to False
+    :type reset: bool, optional
+    :raises FileExistsError: If ``work_dir`` holds a previous job and ``reset`` is False.
+    :return: Rows, seconds per phase, retries, restarts and the report of every shard.
+    :rtype: dict
+    """
+    temporary = work_dir is None
+    directory = Path(tempfile.mkdtemp(prefix="crat-shards-") if temporary else work_dir)
+    queue = FileQueue(directory)
+    job = {"model": str(model), "channels": str(channels), "users": str(users),
+           "cache_dir": None if cache_dir is None else str(cache_dir),
+           "pwned_backend": pwned_backend, "pwned_index": pwned_index,
+           "extras": list(extras or []), "chunksize": chunksize, "lease": lease,
+           "n_shards": n_shards}
+    timings = {}
+    try:
+        job = queue.create(job, reset)
+        start = time.perf_counter()
+        rows = partition(source, queue.shards_dir, n_shards, input_format, chunksize)
+        timings["partition"] = time.perf_counter() - start
+        for shard in range(n_shards):
+            queue.submit(shard, job["id"])
+
+        start = time.perf_counter()
+        stats = coordinate(queue, n_shards, workers, retries, lease)
+        timings["score"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        written = merge([queue.result_path(shard, job["id"]) for shard in range(n_shards)],
+                        output, output_format, chunksize)
+        timings["merge"] = time.perf_counter() - start
+    finally:
+        if temporary and not keep:
+            shutil.rmtree(directory, ignore_errors=True)
+    return dict(stats, job=job["id"], rows=written, shard_rows=rows, timings=timings,
+                work_dir=str(directory) if keep or not temporary else None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded scoring of large dumps")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Partition, score and merge a dump")
+    run_parser.add_argument("input", help="NDJSON or CSV file, '-' for stdin")
+    run_parser.add_argument("-o", "--output", default="-", help="Output file, '-' for stdout")
+    run_parser.add_argument("--input-format", choices=["ndjson", "csv"])
+    run_parser.add_argument("--output-format", choices=["ndjson", "parquet"])
+    run_parser.add_argument("--shards", type=int, default=16)
+    run_parser.add_argument("--workers", type=int, default=2,
+                            help="Local worker processes (0: only external workers)")
+    run_parser.add_argument("--work-dir", type=Path,
+                            help="Work directory, on a shared filesystem for remote workers")
+    run_parser.add_argument("--retries", type=int, default=2)
+    run_parser.add_argument("--lease", type=float, default=DEFAULT_LEASE,
+                            help="Seconds without heartbeat before a shard is requeued")
+    run_parser.add_argument("--chunksize", type=int, default=10000)
+    run_parser.add_argument("--model", type=Path, default=MODEL_DIR,
+                            help="Model artifact directory or pickled pipeline")
+    run_parser.add_argument("--channels", type=Path, default=SAMPLES_DIR / "channels.json")
+    run_parser.add_argument("--users", type=Path, default=DATA_PATHS['user'],
+                            help="User directory: JSON database or prebuilt user index")
+    run_parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR / "shards",
+                            help="Directory of the per-shard feature caches")
+    run_parser.add_argument("--no-cache", action="store_true")
+    run_parser.add_argument("--pwned-backend", default="remote",
+                            choices=["remote", "local", "local-then-remote"])
+    run_parser.add_argument("--pwned-index", help="Local Pwned Passwords index")
+    run_parser.add_argument("--extras", nargs="*", default=[])
+    run_parser.add_argument("--keep", action="store_true", help="Keep the work directory")
+    run_parser.add_argument("--reset", action="store_true",
+                            help="Clear a previous job left in --work-dir")
+    worker_parser = subparsers.add_parser("worker", help="Score shards from a work directory")
+    worker_parser.add_argument("work_dir", type=Path)
+    worker_parser.add_argument("--worker-id", default=f"{os.uname().nodename}-{os.getpid()}")
+    worker_parser.add_argument("--slot", type=int, default=0)
+    worker_parser.add_argument("--slots", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        work(args.work_dir, args.worker_id, args.slot, args.slots)
+    else:
+        report = run(args.input, args.output, args.shards, args.workers, args.work_dir,
+                     args.retries, args.lease, args.input_format, args.output_format,
+                     args.chunksize, args.model, args.channels, args.users,
+                     None if args.no_cache else args.cache_dir, args.pwned_backend,
+                     args.pwned_index, args.extras, args.keep, args.reset)
+        report.pop("shards")
+        print(json.dumps(report), file=sys.stderr)
@@ -0,0 +1,374 @@
+"""
+Labeled and enriched datasets.
+
+The JSON and xlsx sources under data/ are normalised to the columns produced
+by ``gen_random_df`` and can be converted once to Parquet with a declared
+schema (SCHEMA): credentials and hashes as strings, categorical features
+dictionary-encoded, counts as int64 and the rest as float64. Parquet files
+are read with column projection and row filters pushed down to the reader.
+
+In memory, enriched frames can be compacted to a declared feature schema
+(``compact_frame``): categorical features as pandas categoricals over the
+OneHotEncoder vocabularies of the model (``model_categories``, read from
+model/manifest.json by default), counts as float32 and the hex
+digests as fixed-size binary. ``expand_frame`` restores the original
+representation for JSON and CSV exports.
+
+Usage:
+    python dataset.py convert data/train.json data/train.parquet
+    python -m benchmarks.dataset
+"""
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import json
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from settings import MODEL_DIR
+
+
+# Columnas en el orden producido por gen_random_df
+COLUMNS = [
+    "username",
+    "password",
+    "channel",
+    "file",
+    "vip_credentials",
+    "vip_group",
+    "user_status",
+    "md5",
+    "sha256",
+    "sha512",
+    "sha1",
+    "password_update",
+    "password_type",
+    "leaked_password",
+    "password_strength",
+    "guesses_discover",
+    "cracking_time",
+    "password_entropy",
+    "chat_type",
+    "channel_privacity",
+    "subscribers",
+    "engagement_rate",
+    "mentions",
+    "posts_day",
+    "reposts",
+    "channel_country",
+    "country_file_name",
+]
+TARGET = "total"
+DROP_COLUMNS = ['username', 'password', 'md5', 'sha256', 'sha512', 'sha1', 'channel', 'file']
+NUMERICAL_FEATURES = ['leaked_password', 'password_strength', 'guesses_discover', 'cracking_time',
+                      'password_entropy', 'subscribers', 'engagement_rate', 'mentions',
+                      'posts_day', 'reposts']
+CATEGORICAL_FEATURES = ['vip_credentials', 'vip_group', 'user_status', 'password_update',
+                        'password_type', 'chat_type', 'channel_privacity', 'channel_country',
+                        'country_file_name']
+LOWERCASE_COLUMNS = ["vip_credentials", "vip_group", "user_status", "password_type", "password_update"]
+INTEGER_FEATURES = ['leaked_password', 'password_strength', 'subscribers', 'mentions',
+                    'posts_day', 'reposts']
+STRING_COLUMNS = [column for column in COLUMNS
+                  if column not in NUMERICAL_FEATURES + CATEGORICAL_FEATURES]
+# Categorias del OneHotEncoder del modelo original, solo si no hay model/manifest.json
+CATEGORIES = {
+    'vip_credentials': ['not vip', 'vip'],
+    'vip_group': ['ceo', 'ciber', 'directiva', 'otros'],
+    'user_status': ['active', 'inactive'],
+    'password_update': ['actual', 'not actual'],
+    'password_type': ['default password', 'password for change', 'personal password'],
+    'chat_type': ['Channel', 'Group'],
+    'channel_privacity': ['Private', 'Public'],
+    'channel_country': ['Other', 'Spain'],
+    'country_file_name': ['Europe', 'Other', 'Spain'],
+}
+# None (entidad no encontrada) no se imputa, NaN si: None se guarda como esta categoria
+UNKNOWN_CATEGORY = "<unknown>"
+DIGEST_SIZES = {'md5': 16, 'sha256': 32, 'sha512': 64, 'sha1': 20}
+
+
+def schema(labeled: bool = True):
+    """
+    Arrow schema of a dataset, in COLUMNS order.
+
+    :param labeled: Include TARGET, defaults to True
+    :type labeled: bool, optional
+    :return: Schema.
+    :rtype: pyarrow.Schema
+    """
+    import pyarrow as pa
+    fields = []
+    for column in COLUMNS + ([TARGET] if labeled else []):
+        if column in CATEGORICAL_FEATURES:
+            field_type = pa.dictionary(pa.int32(), pa.string())
+        elif column in INTEGER_FEATURES:
+            field_type = pa.int64()
+        elif column in STRING_COLUMNS:
+            field_type = pa.string()
+        else:
+            field_type = pa.float64()
+        fields.append(pa.field(column, field_type))
+    return pa.schema(fields)
+
+
+@lru_cache(maxsize=4)
+def _manifest_categories(path: str, mtime_ns: int) -> Dict[str, List[str]]:
+    # mtime_ns en la clave: un artefacto re-exportado se vuelve a leer
+    with open(path, "r", encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    return dict(zip(manifest["categorical_features"], manifest["categories"]))
+
+
+def model_categories(model=None) -> Dict[str, List[str]]:
+    """
+    OneHotEncoder vocabulary of every categorical feature of a model.
+
+    :param model: Pickled pipeline, compact artifact or fused model, defaults to None
+        (the artifact in MODEL_DIR, or CATEGORIES if there is none)
+    :type model: Union[inference.FusedModel, artifact.CompactModel, sklearn.pipeline.Pipeline], optional
+    :return: Feature to categories.
+    :rtype: Dict[str, List[str]]
+    """
+    if model is None:
+        path = MODEL_DIR / "manifest.json"
+        if not path.exists():
+            return dict(CATEGORIES)
+        return dict(_manifest_categories(str(path), path.stat().st_mtime_ns))
+    # FusedModel envuelve un CompactModel
+    manifest = getattr(getattr(model, 'model', model), 'manifest', None)
+    if manifest is not None:
+        return dict(zip(manifest["categorical_features"], manifest["categories"]))
+    categories = {}
+    for name, transformer, columns in model.named_steps['preprocessor'].transformers_:
+        onehot = getattr(transformer, 'named_steps', {}).get('onehot')
+        if onehot is not None:
+            categories.update((column, [str(value) for value in values])
+                              for column, values in zip(columns, onehot.categories_))
+    return categories
+
+
+def _compact_categorical(series: pd.Series, categories: List[str]) -> pd.Categorical:
+    values = series.to_numpy(dtype=object, copy=True)
+    values[[value is None for value in values]] = UNKNOWN_CATEGORY
+    observed = pd.unique(values[pd.notna(values)])
+    # Los valores fuera del vocabulario se conservan como categorias adicionales
+    extras = sorted(set(observed) - set(categories), key=str)
+    return pd.Categorical(values, categories=list(categories) + extras)
+
+
+def _compact_digest(series: pd.Series, size: int) -> pd.Series:
+    import pyarrow as pa
+    array = pa.array([bytes.fromhex(value) if isinstance(value, str) else None
+                      for value in series], type=pa.binary(size))
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=series.index)
+
+
+def _compact_count(series: pd.Series) -> np.ndarray:
+    values = series.astype('float64').to_numpy()
+    narrow = values.astype(np.float32)
+    # float32 solo si es exacto (enteros hasta 2 ** 24): las predicciones no cambian
+    return narrow if np.array_equal(narrow, values, equal_nan=True) else values
+
+
+def compact_frame(df: pd.DataFrame,
+                  categories: Optional[Dict[str, List[str]]] = None) -> pd.DataFrame:
+    """
+    Enriched credentials in the compact feature schema.
+
+    Categorical features become pandas categoricals over ``categories`` (values
+    outside it are kept as extra categories, None as UNKNOWN_CATEGORY so it is
+    still not imputed), counts become float32 when every value is exact in
+    float32, the other numerical features float64 and the hex digests
+    fixed-size binary. The model reads the frame exactly as the original one.
+
+    :param df: Enriched credentials, e.g. from ``enrich_df`` or data/test.json.
+    :type df: pd.DataFrame
+    :param categories: Vocabulary per categorical feature, defaults to
+        ``model_categories()`` (the deployed model)
+    :type categories: Dict[str, List[str]], optional
+    :return: Copy of ``df`` in the compact schema; columns outside the schema are unchanged.
+    :rtype: pd.DataFrame
+    """
+    categories = model_categories() if categories is None else categories
+    df = df.copy()
+    for column in df.columns:
+        if column in CATEGORICAL_FEATURES:
+            df[column] = _compact_categorical(df[column], categories.get(column, []))
+        elif column in DIGEST_SIZES:
+            df[column] = _compact_digest(df[column], DIGEST_SIZES[column])
+        elif column in INTEGER_FEATURES:
+            df[column] = _compact_count(df[column])
+        elif column in NUMERICAL_FEATURES:
+            # cracking_time llega como Decimal
+            df[column] = df[column].astype('float64')
+    return df
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Inverse of :func:`compact_frame`, for JSON and CSV exports.
+
+    :param df: Credentials in the compact schema.
+    :type df: pd.DataFrame
+    :return: Copy with object categories and hex digests, and counts as int64 when complete.
+    :rtype: pd.DataFrame
+    """
+    df = df.copy()
+    for column in df.columns:
+        dtype = df[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            values = df[column].to_numpy(dtype=object, copy=True)
+            values[values == UNKNOWN_CATEGORY] = None
+            df[column] = pd.Series(values, index=df.index, dtype=object)
+        elif column in DIGEST_SIZES and isinstance(dtype, pd.ArrowDtype):
+            df[column] = pd.Series([value.hex() if value is not None else np.nan
+                                    for value in df[column].to_numpy(dtype=object, na_value=None)],
+                                   index=df.index, dtype=object)
+        elif column in INTEGER_FEATURES and dtype == np.float32:
+            values = df[column].astype('float64')
+            df[column] = values if values.isna().any() else values.astype('int64')
+    return df
+
+
+def normalize_labeled(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalise a labeled dataset (train.json or the xlsx export) to the
+    column names and values produced by ``gen_random_df``.
+
+    :param df: Raw labeled dataset.
+    :type df: pd.DataFrame
+    :return: Dataset with COLUMNS plus TARGET.
+    :rtype: pd.DataFrame
+    """
+    df = df.copy()
+    df.columns = df.columns.str.replace(' ', '_')
+    df.columns = df.columns.str.replace('-', '_')
+    df.columns = df.columns.str.lower()
+    df['channel'] = df['channel_name']
+    df['file'] = df['file_name']
+    for column in LOWERCASE_COLUMNS:
+        df[column] = df[column].str.lower()
+    return df[COLUMNS + [TARGET]]
+
+
+def read_source(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Read a JSON records file or xlsx workbook (first sheet) and normalise it.
+
+    Labeled sources (with a total column) go through :func:`normalize_labeled`;
+    enriched ones (such as data/test.json) only get their columns selected.
+
+    :param path: JSON records file or xlsx workbook.
+    :type path: Union[str, Path]
+    :return: Dataset with COLUMNS, plus TARGET when labeled.
+    :rtype: pd.DataFrame
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".xlsx":
+        with pd.ExcelFile(path) as xlsx:
+            df = pd.read_excel(xlsx, xlsx.sheet_names[0])
+    else:
+        df = pd.read_json(path, orient="records")
+    if TARGET in df.columns.str.lower():
+        return normalize_labeled(df)
+    return df[COLUMNS]
+
+
+def to_table(df: pd.DataFrame):
+    """
+    Arrow table of a normalised dataset, cast to :func:`schema`.
+
+    :param df: Dataset with COLUMNS and optionally TARGET.
+    :type df: pd.DataFrame
+    :return: Table.
+    :rtype: pyarrow.Table
+    """
+    import pyarrow as pa
+    df = df.copy()
+    for column in STRING_COLUMNS:
+        # Las contraseñas numericas llegan como int desde el JSON
+        df[column] = df[column].map(lambda value: value if value is None or value != value
+                                    else str(value))
+    return pa.Table.from_pandas(df, schema=schema(TARGET in df.columns), preserve_index=False)
+
+
+def convert(source: Union[str, Path], target: Union[str, Path],
+            row_group_size: int = 100000) -> Path:
+    """
+    Convert a JSON or xlsx dataset to typed Parquet.
+
+    :param source: JSON records file or xlsx workbook.
+    :type source: Union[str, Path]
+    :param target: Parquet file.
+    :type target: Union[str, Path]
+    :param row_group_size: Rows per row group (the unit filters skip), defaults to 100000
+    :type row_group_size: int, optional
+    :return: Parquet file.
+    :rtype: Path
+    """
+    import pyarrow.parquet as pq
+    target = Path(target)
+    pq.write_table(to_table(read_source(source)), target, row_group_size=row_group_size)
+    return target
+
+
+def read_dataset(path: Union[str, Path],
+                 columns: Optional[List[str]] = None,
+                 filters: Optional[list] = None) -> pd.DataFrame:
+    """
+    Read a dataset, from Parquet with projection and filter pushdown or from its JSON/xlsx source.
+
+    :param path: Parquet file, JSON records file or xlsx workbook.
+    :type path: Union[str, Path]
+    :param columns: Columns to read, defaults to all
+    :type columns: List[str], optional
+    :param filters: Row filters in pyarrow DNF form, e.g. ``[("password_strength", ">=", 3)]``,
+        defaults to None
+    :type filters: list, optional
+    :return: Dataset; categorical features come back as pandas categoricals from Parquet.
+    :rtype: pd.DataFrame
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+        return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+    if filters:
+        raise ValueError("Los filtros solo se admiten con Parquet")
+    df = read_source(path)
+    return df if columns is None else df[columns]
+
+
+def load_labeled(path: Union[str, Path],
+                 columns: Optional[List[str]] = None,
+                 filters: Optional[list] = None) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Load a labeled dataset as model inputs and target.
+
+    :param path: Parquet file (see :func:`convert`), JSON records file or xlsx workbook (first sheet).
+    :type path: Union[str, Path]
+    :param columns: Input columns to read, defaults to all
+    :type columns: List[str], optional
+    :param filters: Row filters, Parquet only, see :func:`read_dataset`, defaults to None
+    :type filters: list, optional
+    :return: Features and target scaled to [0, 1].
+    :rtype: Tuple[pd.DataFrame, pd.Series]
+    """
+    df = read_dataset(path, None if columns is None else list(columns) + [TARGET], filters)
+    X = df.drop(columns=[TARGET])
+    y = df[TARGET].astype('float64').apply(lambda x: x / 100)
+    return X, y
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dataset conversion")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert_parser = subparsers.add_parser("convert", help="Convert JSON or xlsx to typed Parquet")
+    convert_parser.add_argument("source", type=Path)
+    convert_parser.add_argument("target", type=Path)
+    convert_parser.add_argument("--row-group-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        output = convert(args.source, args.target, args.row_group_size)
+        print(f"{output}: {output.stat().st_size} bytes")
@@ -0,0 +1,20 @@
+"""
+Vectorised dictionary lookups shared by the user and channel features.
+"""
+import pandas as pd
+
+
+def lookup(values: pd.Series, mapping: dict) -> pd.Series:
+    """
+    Map every value through ``mapping``, like ``mapping.get`` row by row.
+
+    :param values: Keys to look up.
+    :type values: pd.Series
+    :param mapping: Key to value.
+    :type mapping: dict
+    :return: Object Series aligned to ``values``, None for unknown keys.
+    :rtype: pd.Series
+    """
+    # Las claves desconocidas quedan como None, igual que con dict.get
+    found = values.map(mapping).astype(object)
+    return found.where(found.notna(), None)
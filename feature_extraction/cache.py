@@ -0,0 +1,277 @@
+from collections import OrderedDict
+from decimal import Decimal
+from pathlib import Path
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from typing import Iterable, Optional, Tuple, Union
+
+
+SALT_ENV = "CRAT_CACHE_SALT"
+FEATURES_TTL = 30 * 24 * 3600
+PWNED_TTL = 24 * 3600
+# zxcvbn devuelve el tiempo de crackeo como Decimal
+DECIMAL_FEATURES = ("cracking_time",)
+# Hashes sin sal de la contraseña: no se guardan, se recalculan al leer
+HASH_FEATURES = ("md5", "sha256", "sha512", "sha1")
+
+
+def load_salt(path: Optional[Path], salt: Union[str, bytes, None] = None) -> bytes:
+    """
+    Secret salt for keyed hashes of credentials.
+
+    :param path: Database the salt belongs to, defaults to None (random, in-process salt)
+    :type path: Path, optional
+    :param salt: Explicit salt, defaults to $CRAT_CACHE_SALT or a salt file next to ``path``
+    :type salt: Union[str, bytes], optional
+    :return: Salt.
+    :rtype: bytes
+    """
+    salt = salt or os.environ.get(SALT_ENV)
+    if salt:
+        return salt.encode() if isinstance(salt, str) else salt
+    if path is None:
+        return secrets.token_bytes(32)
+    salt_file = path.with_name(path.name + ".salt")
+    if not salt_file.exists():
+        salt_file.parent.mkdir(parents=True, exist_ok=True)
+        salt_file.write_bytes(secrets.token_bytes(32))
+        salt_file.chmod(0o600)
+    return salt_file.read_bytes()
+
+
+class FeatureCache:
+    """
+    Two-tier cache for the password features computed by ``get_password``.
+
+    Entries are keyed by an HMAC-SHA256 of the password with a secret salt,
+    so the plaintext is never stored. The unsalted digests (HASH_FEATURES)
+    would reveal weak passwords, so they are dropped before storing and
+    recomputed from the password on every hit. Lookups go to an in-process LRU first
+    and then to an optional SQLite file, which lets repeated runs and app
+    restarts reuse previous work. The leaked password count is stored apart
+    from the offline features with its own, shorter, TTL.
+
+    :param path: SQLite file for the on-disk tier, defaults to None (memory only)
+    :type path: Union[str, Path], optional
+    :param salt: Secret salt, defaults to $CRAT_CACHE_SALT or a salt file next to the database
+    :type salt: Union[str, bytes], optional
+    :param maxsize: Maximum entries in the in-process tier, defaults to 10000
+    :type maxsize: int, optional
+    :param ttl: Seconds the offline features stay valid, defaults to FEATURES_TTL
+    :type ttl: float, optional
+    :param pwned_ttl: Seconds the leaked password count stays valid, defaults to PWNED_TTL
+    :type pwned_ttl: float, optional
+    """
+
+    def __init__(self,
+                 path: Union[str, Path, None] = None,
+                 salt: Union[str, bytes, None] = None,
+                 maxsize: int = 10000,
+                 ttl: float = FEATURES_TTL,
+                 pwned_ttl: float = PWNED_TTL) -> None:
+        self.path = Path(path) if path else None
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.pwned_ttl = pwned_ttl
+        self._salt = load_salt(self.path, salt)
+        self._lock = threading.Lock()
+        self._memory = {"features": OrderedDict(), "pwned": OrderedDict()}
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                       "pwned_memory_hits": 0, "pwned_disk_hits": 0, "pwned_misses": 0}
+        self._db = None
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS features "
+                             "(key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            self._db.execute("CREATE TABLE IF NOT EXISTS pwned "
+                             "(key TEXT PRIMARY KEY, value TEXT, created REAL)")
+            # Entradas de versiones que guardaban los hashes sin sal
+            self._db.execute("DELETE FROM features WHERE value LIKE '%\"md5\"%'")
+            self._db.commit()
+
+    def key(self, password: str) -> str:
+        """
+        Cache key of a password.
+
+        :param password: Password.
+        :type password: str
+        :return: Salted hash of the password.
+        :rtype: str
+        """
+        return hmac.new(self._salt, password.encode(), hashlib.sha256).hexdigest()
+
+    def _get(self, table: str, password: str, ttl: float) -> Optional[str]:
+        key = self.key(password)
+        now = time.time()
+        prefix = "" if table == "features" else "pwned_"
+        with self._lock:
+            memory = self._memory[table]
+            entry = memory.get(key)
+            if entry is not None and now - entry[1] < ttl:
+                memory.move_to_end(key)
+                self._stats[prefix + "memory_hits"] += 1
+                return entry[0]
+            if self._db is not None:
+                row = self._db.execute(f"SELECT value, created FROM {table} WHERE key = ?",
+                                       (key,)).fetchone()
+                if row is not None and now - row[1] < ttl:
+                    self._remember(memory, key, row)
+                    self._stats[prefix + "disk_hits"] += 1
+                    return row[0]
+            self._stats[prefix + "misses"] += 1
+            return None
+
+    def _set(self, table: str, password: str, value: str) -> None:
+        self._set_many(table, [(password, value)])
+
+    def _set_many(self, table: str, items: Iterable[Tuple[str, str]]) -> int:
+        now = time.time()
+        rows = [(self.key(password), value, now) for password, value in items]
+        with self._lock:
+            memory = self._memory[table]
+            for key, *entry in rows:
+                self._remember(memory, key, tuple(entry))
+            if self._db is not None and rows:
+                # Una sola transaccion (y un solo fsync) para todo el lote
+                with self._db:
+                    self._db.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?)",
+                                         rows)
+        return len(rows)
+
+    def _remember(self, memory: OrderedDict, key: str, entry: tuple) -> None:
+        memory[key] = entry
+        memory.move_to_end(key)
+        while len(memory) > self.maxsize:
+            memory.popitem(last=False)
+
+    def get(self, password: str) -> Optional[dict]:
+        """
+        Get the cached offline features of a password, HASH_FEATURES recomputed.
+
+        :param password: Password.
+        :type password: str
+        :return: Features, or None if missing or expired.
+        :rtype: Optional[dict]
+        """
+        value = self._get("features", password, self.ttl)
+        if value is None:
+            return None
+        features = json.loads(value)
+        for name in DECIMAL_FEATURES:
+            if isinstance(features.get(name), str):
+                features[name] = Decimal(features[name])
+        encoded = password.encode()
+        features.update((name, hashlib.new(name, encoded).hexdigest()) for name in HASH_FEATURES)
+        return features
+
+    @staticmethod
+    def _dumps(features: dict) -> str:
+        return json.dumps({name: value for name, value in features.items()
+                           if name not in HASH_FEATURES}, default=str)
+
+    def set(self, password: str, features: dict) -> None:
+        """
+        Cache the offline features of a password, without the HASH_FEATURES.
+
+        :param password: Password.
+        :type password: str
+        :param features: Features.
+        :type features: dict
+        """
+        self._set("features", password, self._dumps(features))
+
+    def set_many(self, items: Iterable[Tuple[str, dict]]) -> int:
+        """
+        Cache the offline features of many passwords in one transaction.
+
+        :param items: ``(password, features)`` pairs.
+        :type items: Iterable[Tuple[str, dict]]
+        :return: Number of entries written.
+        :rtype: int
+        """
+        return self._set_many("features", ((password, self._dumps(features))
+                                           for password, features in items))
+
+    def get_pwned(self, password: str) -> Optional[int]:
+        """
+        Get the cached leaked password count.
+
+        :param password: Password.
+        :type password: str
+        :return: Count of leaks, or None if missing or expired.
+        :rtype: Optional[int]
+        """
+        value = self._get("pwned", password, self.pwned_ttl)
+        return None if value is None else int(value)
+
+    def set_pwned(self, password: str, count: int) -> None:
+        """
+        Cache the leaked password count.
+
+        :param password: Password.
+        :type password: str
+        :param count: Count of leaks.
+        :type count: int
+        """
+        self._set("pwned", password, str(int(count)))
+
+    def set_pwned_many(self, items: Iterable[Tuple[str, int]]) -> int:
+        """
+        Cache the leaked password counts of many passwords in one transaction.
+
+        :param items: ``(password, count)`` pairs.
+        :type items: Iterable[Tuple[str, int]]
+        :return: Number of entries written.
+        :rtype: int
+        """
+        return self._set_many("pwned", ((password, str(int(count))) for password, count in items))
+
+    def purge(self) -> int:
+        """
+        Delete expired entries from the on-disk tier.
+
+        :return: Number of deleted entries.
+        :rtype: int
+        """
+        if self._db is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM features WHERE created < ?",
+                                       (now - self.ttl,)).rowcount
+            deleted += self._db.execute("DELETE FROM pwned WHERE created < ?",
+                                        (now - self.pwned_ttl,)).rowcount
+            self._db.commit()
+        return deleted
+
+    @property
+    def stats(self) -> dict:
+        """
+        Hit and miss counters of both tiers.
+
+        :return: Counters.
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        for prefix in ("", "pwned_"):
+            lookups = sum(stats[prefix + name] for name in ("memory_hits", "disk_hits", "misses"))
+            hits = stats[prefix + "memory_hits"] + stats[prefix + "disk_hits"]
+            stats[prefix + "hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        """
+        Close the on-disk tier.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
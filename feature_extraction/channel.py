@@ -1,8 +1,18 @@
 from pathlib import Path
+import asyncio
 import json
-from typing import List, Literal
+import random
+import time
+from typing import Dict, Iterable, List, Literal, Optional
 import pandas as pd
 import requests
+from feature_extraction._lookup import lookup
+
+
+TELEMETRIO_URL = "https://api.telemetr.io/v1/"
+TELEMETRIO_KEY_ENV = "TELEMETRIO_API_KEY"
+TELEMETRIO_TIMEOUT = 10
+TELEMETRIO_RETRY_STATUS = (429, 500, 502, 503, 504)
 
 
 class Telemetrio:
@@ -11,11 +21,15 @@ class Telemetrio:
 
     :param api_key: API Key
     :type api_key: str
+    :param timeout: Request timeout in seconds, defaults to TELEMETRIO_TIMEOUT
+    :type timeout: float, optional
     """
 
-    def __init__(self, api_key) -> None:
-        self.base_url = "https://api.telemetr.io/v1/"
+    def __init__(self, api_key, timeout: float = TELEMETRIO_TIMEOUT) -> None:
+        self.base_url = TELEMETRIO_URL
         self._api_key = api_key
+        self.timeout = timeout
+        self._session = requests.Session()
 
     def _build_url(self, endpoint):
         return self.base_url + endpoint
@@ -27,7 +41,7 @@ class Telemetrio:
         }
 
     def _call(self, url, headers, params):
-        response = requests.get(url, headers=headers, params=params)
+        response = self._session.get(url, headers=headers, params=params, timeout=self.timeout)
         response.raise_for_status()
         return response.json()
 
@@ -101,6 +115,175 @@ class Telemetrio:
         return self._call(url, headers, params)
 
 
+class TokenBucket:
+    """
+    Asynchronous token bucket: at most ``rate`` acquisitions per second on
+    average, with bursts of up to ``capacity``.
+
+    :param rate: Tokens added per second.
+    :type rate: float
+    :param capacity: Maximum stored tokens, defaults to ``rate``
+    :type capacity: float, optional
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncTelemetrio:
+    """
+    Asynchronous Telemetr.io API client.
+
+    Requests share one pooled connection, go through a token bucket and are
+    retried with exponential backoff (honouring ``Retry-After``) on
+    connection errors, 429 and 5xx responses.
+
+    :param api_key: API Key
+    :type api_key: str
+    :param rate: Maximum requests per second, defaults to 5
+    :type rate: float, optional
+    :param max_connections: Pooled connections, defaults to 10
+    :type max_connections: int, optional
+    :param retries: Retries per request, defaults to 3
+    :type retries: int, optional
+    :param backoff_factor: Base delay between retries in seconds, defaults to 0.5
+    :type backoff_factor: float, optional
+    :param timeout: Request timeout in seconds, defaults to TELEMETRIO_TIMEOUT
+    :type timeout: float, optional
+    :param base_url: API root, defaults to TELEMETRIO_URL
+    :type base_url: str, optional
+    """
+
+    def __init__(self,
+                 api_key: str,
+                 rate: float = 5,
+                 max_connections: int = 10,
+                 retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 timeout: float = TELEMETRIO_TIMEOUT,
+                 base_url: str = TELEMETRIO_URL) -> None:
+        import httpx
+        self._httpx = httpx
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_connections = max_connections
+        self.bucket = TokenBucket(rate)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"accept": "application/json", "x-api-key": api_key},
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            timeout=timeout)
+
+    async def _call(self, endpoint: str, params: dict) -> dict:
+        for attempt in range(self.retries + 1):
+            await self.bucket.acquire()
+            try:
+                response = await self._client.get(endpoint, params=params)
+            except self._httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff_factor * 2 ** attempt
+            else:
+                if response.status_code not in TELEMETRIO_RETRY_STATUS or attempt == self.retries:
+                    response.raise_for_status()
+                    return response.json()
+                retry_after = response.headers.get("Retry-After", "")
+                delay = float(retry_after) if retry_after.isdigit() \
+                    else self.backoff_factor * 2 ** attempt
+            await asyncio.sleep(delay * (1 + random.random() / 4))
+
+    async def get_channel_info(self, intenal_id: str) -> dict:
+        """
+        Get Channel info by channel internal id
+
+        :param intenal_id: Chat internal id
+        :type intenal_id: str
+        :return: Channel info
+        :rtype: dict
+        """
+        return await self._call("channels/info", {"internal_id": intenal_id})
+
+    async def get_channel_stats(self, intenal_id: str) -> dict:
+        """
+        Get Channel Statistics
+
+        :param intenal_id: Chat internal id
+        :type intenal_id: str
+        :return: Channel statistics
+        :rtype: dict
+        """
+        return await self._call("channels/stats", {"internal_id": intenal_id})
+
+    async def get_channel_stats_bulk(self, internal_ids: Iterable[str],
+                                     concurrency: Optional[int] = None) -> Dict[str, object]:
+        """
+        Get the statistics of many channels concurrently.
+
+        :param internal_ids: Chat internal ids.
+        :type internal_ids: Iterable[str]
+        :param concurrency: Maximum requests in flight, defaults to the pool size
+        :type concurrency: int, optional
+        :return: Statistics per internal id, or the exception raised for it.
+        :rtype: Dict[str, object]
+        """
+        internal_ids = list(dict.fromkeys(internal_ids))
+        semaphore = asyncio.Semaphore(concurrency or self.max_connections)
+
+        async def fetch(intenal_id: str):
+            async with semaphore:
+                return await self.get_channel_stats(intenal_id)
+
+        results = await asyncio.gather(*(fetch(intenal_id) for intenal_id in internal_ids),
+                                       return_exceptions=True)
+        return dict(zip(internal_ids, results))
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+def get_channels(channels: pd.Series, channel_privacities: dict, channel_types: dict) -> pd.DataFrame:
+    """
+    Get channel information for a whole column of channel names.
+
+    :param channels: Channel names to search for.
+    :type channels: pd.Series
+    :param channel_privacities: Channel privacity dictionary.
+    :type channel_privacities: dict
+    :param channel_types: Channel type dictionary.
+    :type channel_types: dict
+    :return: DataFrame with channel information, aligned to the input.
+    :rtype: pd.DataFrame
+    """
+    channels = pd.Series(channels, dtype=object)
+    return pd.DataFrame({
+        "channel_name": channels,
+        "channel_privacity": lookup(channels, channel_privacities),
+        "chat_type": lookup(channels, channel_types),
+    }, index=channels.index)
+
+
 def get_channel(channel: str, channel_privacities: dict, channel_types: dict):
     """
     Get channel information from the channel database.
@@ -0,0 +1,424 @@
+"""
+Local store of channel statistics.
+
+Holds one record per channel (the columns of samples/channels.json) in
+memory, optionally persisted to SQLite, so enrichment looks channels up by
+name instead of merging against the sample file. Every record carries the
+time it was fetched and a per-channel TTL; expired records keep being served
+until ``refresh`` replaces their statistics with fresh ones from
+Telemetr.io. A channel whose refresh fails is retried with exponential
+backoff, so it cannot hold back the other stale channels.
+``ChannelStatsRefresher`` runs that refresh periodically in the background.
+"""
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Union
+import pandas as pd
+from feature_extraction.tracing import tracer
+
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMN = 'CHANNEL_NAME'
+STATS_COLUMNS = ['Subscribers', 'Engagement_rate', 'Mentions', 'Posts_day', 'Reposts']
+# Campo de la respuesta de Telemetr.io -> columna de estadisticas
+API_FIELDS = {
+    'participants_count': 'Subscribers',
+    'err_percent': 'Engagement_rate',
+    'mentions_count': 'Mentions',
+    'posts_per_day': 'Posts_day',
+    'forwards_count': 'Reposts',
+}
+DEFAULT_TTL = 24 * 3600
+# Espera tras el primer fallo de refresco de un canal, doblada en cada fallo seguido
+RETRY_BACKOFF = 60
+
+
+def parse_stats(payload: dict) -> dict:
+    """
+    Statistics columns from a Telemetr.io stats response.
+
+    Accepts the API field names (API_FIELDS) or the column names themselves,
+    optionally wrapped in a ``response`` object.
+
+    :param payload: Stats response.
+    :type payload: dict
+    :return: Column to value, only for the columns present.
+    :rtype: dict
+    """
+    payload = payload.get('response', payload) if isinstance(payload, dict) else {}
+    stats = {}
+    for field, value in payload.items():
+        column = API_FIELDS.get(field, field)
+        if column in STATS_COLUMNS:
+            stats[column] = value
+    return stats
+
+
+class ChannelStatsStore:
+    """
+    Channel statistics with per-channel TTL.
+
+    :param path: SQLite file to persist the records, defaults to None (memory only)
+    :type path: Union[str, Path], optional
+    :param ttl: Default seconds a record stays fresh, defaults to DEFAULT_TTL
+    :type ttl: float, optional
+    """
+
+    def __init__(self, path: Union[str, Path, None] = None, ttl: float = DEFAULT_TTL) -> None:
+        self.ttl = ttl
+        self.columns = [KEY_COLUMN]
+        self._records = {}
+        self._fetched = {}
+        self._ttls = {}
+        # Canal -> (fallos seguidos, hora del ultimo intento)
+        self._failures = {}
+        self._frame = None
+        self._version = None
+        self._lock = threading.Lock()
+        self._db = None
+        if path is not None:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS channels "
+                             "(name TEXT PRIMARY KEY, record TEXT, fetched REAL, ttl REAL)")
+            self._db.commit()
+            for name, record, fetched, channel_ttl in self._db.execute(
+                    "SELECT name, record, fetched, ttl FROM channels"):
+                self._set(name, json.loads(record), fetched, channel_ttl)
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict], **kwargs) -> "ChannelStatsStore":
+        """
+        Store seeded with channel records (e.g. samples/channels.json).
+
+        :param records: Records with a CHANNEL_NAME key.
+        :type records: Iterable[dict]
+        :return: Store.
+        :rtype: ChannelStatsStore
+        """
+        store = cls(**kwargs)
+        store.seed(records)
+        return store
+
+    @classmethod
+    def from_frame(cls, channels_df: pd.DataFrame, **kwargs) -> "ChannelStatsStore":
+        """
+        Store seeded with a channel statistics DataFrame.
+
+        :param channels_df: DataFrame with a CHANNEL_NAME column.
+        :type channels_df: pd.DataFrame
+        :return: Store.
+        :rtype: ChannelStatsStore
+        """
+        return cls.from_records(channels_df.to_dict('records'), **kwargs)
+
+    def _set(self, name: str, record: dict, fetched: float, channel_ttl: Optional[float]) -> None:
+        for column in record:
+            if column not in self.columns:
+                self.columns.append(column)
+        self._records[name] = record
+        self._fetched[name] = fetched
+        self._failures.pop(name, None)
+        if channel_ttl is not None:
+            self._ttls[name] = channel_ttl
+        self._frame = None
+
+    def _persist(self, names: List[str]) -> None:
+        if self._db is None:
+            return
+        self._db.executemany("INSERT OR REPLACE INTO channels VALUES (?, ?, ?, ?)",
+                             [(name, json.dumps(self._records[name]), self._fetched[name],
+                               self._ttls.get(name)) for name in names])
+        self._db.commit()
+
+    def seed(self, records: Iterable[dict], fetched: float = 0.0) -> int:
+        """
+        Add the channels not in the store yet. Seeded records count as expired
+        unless ``fetched`` says otherwise.
+
+        :param records: Records with a CHANNEL_NAME key.
+        :type records: Iterable[dict]
+        :param fetched: Fetch time of the records, defaults to 0.0
+        :type fetched: float, optional
+        :return: Number of channels added.
+        :rtype: int
+        """
+        added = []
+        with self._lock:
+            for record in records:
+                name = record[KEY_COLUMN]
+                if name not in self._records:
+                    self._set(name, dict(record), fetched, None)
+                    added.append(name)
+            self._persist(added)
+        return len(added)
+
+    def update(self, name: str, stats: dict, fetched: Optional[float] = None) -> None:
+        """
+        Replace the statistics of a channel and mark it fresh.
+
+        :param name: Channel name.
+        :type name: str
+        :param stats: Column to value, see :func:`parse_stats`.
+        :type stats: dict
+        :param fetched: Fetch time, defaults to now
+        :type fetched: float, optional
+        """
+        with self._lock:
+            record = dict(self._records.get(name, {KEY_COLUMN: name}))
+            record.update(stats)
+            self._set(name, record, time.time() if fetched is None else fetched, None)
+            self._persist([name])
+
+    def mark_failed(self, name: str, attempted: Optional[float] = None) -> None:
+        """
+        Record a failed refresh of a channel, postponing its next attempt.
+
+        The channel is not stale again until ``RETRY_BACKOFF`` seconds, doubled
+        on every consecutive failure and capped at its TTL, have passed.
+
+        :param name: Channel name.
+        :type name: str
+        :param attempted: Time of the attempt, defaults to now
+        :type attempted: float, optional
+        """
+        with self._lock:
+            failures, _ = self._failures.get(name, (0, None))
+            self._failures[name] = (failures + 1, time.time() if attempted is None else attempted)
+
+    def _retry_at(self, name: str) -> float:
+        failures, attempted = self._failures[name]
+        ttl = self._ttls.get(name, self.ttl)
+        return attempted + min(RETRY_BACKOFF * 2 ** (failures - 1), ttl)
+
+    def set_ttl(self, name: str, ttl: float) -> None:
+        """
+        Override the TTL of one channel.
+
+        :param name: Channel name.
+        :type name: str
+        :param ttl: Seconds the channel stays fresh.
+        :type ttl: float
+        """
+        with self._lock:
+            self._ttls[name] = ttl
+            if name in self._records:
+                self._persist([name])
+
+    def get(self, name: str) -> Optional[dict]:
+        """
+        Record of a channel, fresh or not.
+
+        :param name: Channel name.
+        :type name: str
+        :return: Record, or None if the channel is unknown.
+        :rtype: Optional[dict]
+        """
+        return self._records.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def stale(self, now: Optional[float] = None) -> List[str]:
+        """
+        Channels whose TTL expired, least recently attempted first.
+
+        Channels whose last refresh failed are left out until their backoff
+        ends (see :meth:`mark_failed`) and then ordered by that attempt.
+
+        :param now: Reference time, defaults to now
+        :type now: float, optional
+        :return: Channel names.
+        :rtype: List[str]
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [name for name, fetched in self._fetched.items()
+                       if fetched + self._ttls.get(name, self.ttl) <= now
+                       and (name not in self._failures or self._retry_at(name) <= now)]
+            attempted = {name: self._failures[name][1] if name in self._failures
+                         else self._fetched[name] for name in expired}
+            return sorted(expired, key=attempted.get)
+
+    def frame(self) -> pd.DataFrame:
+        """
+        Current records as a DataFrame indexed by channel name.
+
+        :return: One row per channel, columns as in the seeded records.
+        :rtype: pd.DataFrame
+        """
+        frame = self._frame
+        if frame is None:
+            with self._lock:
+                frame = pd.DataFrame(list(self._records.values()), columns=self.columns)
+                frame.index = frame[KEY_COLUMN].to_numpy()
+                self._frame = frame
+                self._version = None
+        return frame
+
+    def lookup(self, channels: pd.Series) -> pd.DataFrame:
+        """
+        Records of many channels, one row per value, all NaN for unknown channels.
+
+        Equivalent to a left merge of ``channels`` with the seeded records.
+
+        :param channels: Channel names.
+        :type channels: pd.Series
+        :return: Records aligned to ``channels`` with a fresh RangeIndex.
+        :rtype: pd.DataFrame
+        """
+        tracer.count("channel_store.lookups", len(channels))
+        return self.frame().reindex(channels.to_numpy()).reset_index(drop=True)
+
+    @property
+    def version(self) -> str:
+        """
+        Short digest of the current records, stable across processes.
+
+        :return: Version.
+        :rtype: str
+        """
+        frame = self.frame()
+        if self._version is None:
+            digest = pd.util.hash_pandas_object(frame.astype(str), index=False).to_numpy()
+            self._version = hashlib.sha256(digest.tobytes()).hexdigest()[:12]
+        return self._version
+
+    async def refresh(self,
+                      client, names: Optional[Iterable[str]] = None,
+                      internal_ids: Optional[Dict[str, str]] = None,
+                      concurrency: Optional[int] = None) -> dict:
+        """
+        Fetch fresh statistics for channels.
+
+        :param client: Telemetr.io client.
+        :type client: feature_extraction.channel.AsyncTelemetrio
+        :param names: Channels to refresh, defaults to the stale ones
+        :type names: Iterable[str], optional
+        :param internal_ids: Channel name to Telemetr.io internal id, defaults to the name itself
+        :type internal_ids: Dict[str, str], optional
+        :param concurrency: Maximum requests in flight, defaults to the client pool size
+        :type concurrency: int, optional
+        :return: ``{"refreshed": n, "failed": n}``
+        :rtype: dict
+        """
+        names = self.stale() if names is None else list(names)
+        internal_ids = internal_ids or {}
+        ids = {internal_ids.get(name, name): name for name in names}
+        with tracer.span("channel_store.refresh", rows=len(ids)):
+            results = await client.get_channel_stats_bulk(ids, concurrency=concurrency)
+        counts = {"refreshed": 0, "failed": 0}
+        for internal_id, result in results.items():
+            stats = None if isinstance(result, BaseException) else parse_stats(result)
+            if not stats:
+                logger.warning("No se pudieron refrescar las estadisticas de %s: %r",
+                               ids[internal_id], result)
+                self.mark_failed(ids[internal_id])
+                counts["failed"] += 1
+                continue
+            self.update(ids[internal_id], stats)
+            counts["refreshed"] += 1
+        tracer.count("channel_store.refreshed", counts["refreshed"])
+        tracer.count("channel_store.refresh_errors", counts["failed"])
+        return counts
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def load_channel_store(channels_path: Union[str, Path],
+                       store_path: Union[str, Path, None] = None,
+                       ttl: float = DEFAULT_TTL) -> ChannelStatsStore:
+    """
+    Store persisted at ``store_path`` (if any), seeded with the channels of a
+    JSON file (e.g. samples/channels.json) it does not hold yet.
+
+    :param channels_path: JSON file with a list of channel records.
+    :type channels_path: Union[str, Path]
+    :param store_path: SQLite file of the store, defaults to None (memory only)
+    :type store_path: Union[str, Path], optional
+    :param ttl: Default seconds a record stays fresh, defaults to DEFAULT_TTL
+    :type ttl: float, optional
+    :return: Store.
+    :rtype: ChannelStatsStore
+    """
+    store = ChannelStatsStore(store_path, ttl=ttl)
+    with open(channels_path, "r", encoding="utf-8") as channels_file:
+        store.seed(json.load(channels_file))
+    return store
+
+
+class ChannelStatsRefresher:
+    """
+    Background task refreshing the stale channels of a store.
+
+    Each check refreshes at most ``batch_size`` channels; failed ones back off
+    (see :meth:`ChannelStatsStore.mark_failed`), so the next check moves on
+    to other stale channels.
+
+    :param store: Channel statistics store.
+    :type store: ChannelStatsStore
+    :param client: Telemetr.io client.
+    :type client: feature_extraction.channel.AsyncTelemetrio
+    :param interval: Seconds between checks for stale channels, defaults to 60
+    :type interval: float, optional
+    :param batch_size: Maximum channels refreshed per check, defaults to 500
+    :type batch_size: int, optional
+    """
+
+    def __init__(self, store: ChannelStatsStore, client,
+                 interval: float = 60, batch_size: int = 500) -> None:
+        self.store = store
+        self.client = client
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task = None
+
+    async def run(self) -> None:
+        while True:
+            stale = self.store.stale()[:self.batch_size]
+            if stale:
+                try:
+                    counts = await self.store.refresh(self.client, stale)
+                    logger.info("Estadisticas de canales refrescadas: %s", counts)
+                except Exception:
+                    logger.exception("Error refrescando las estadisticas de canales")
+                    for name in stale:
+                        self.store.mark_failed(name)
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> asyncio.Task:
+        """
+        Schedule the refresh loop on the running event loop.
+
+        :return: Refresh task.
+        :rtype: asyncio.Task
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
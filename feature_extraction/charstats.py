@@ -0,0 +1,164 @@
+"""
+Vectorised character statistics of password columns.
+
+Passwords are encoded, a block of rows at a time, into a padded matrix of
+Unicode code points (NumPy's UCS-4 ``'U'`` layout viewed as ``uint32``).
+Sorting every row yields its character histogram, from which the Shannon
+entropy, the number of distinct characters and the character class counts
+are computed for the whole block at once.
+
+The entropy is bit-for-bit equal to :func:`feature_extraction.password.shannon_entropy`:
+the ``p * log2(p)`` terms use ``math.log2`` (through a table of the distinct
+probabilities), are added in the order of each character's first
+occurrence like the scalar ``Counter``, and with the same summation as the
+builtin ``sum`` of this interpreter (compensated from Python 3.12 on).
+"""
+import math
+import sys
+from typing import Iterable
+import numpy as np
+import pandas as pd
+
+
+CHARSTATS_COLUMNS = ["password_length",
+                     "password_unique_chars",
+                     "password_lowercase",
+                     "password_uppercase",
+                     "password_digits",
+                     "password_symbols",
+                     "password_non_ascii",
+                     "password_entropy"]
+# Filas por bloque: acota la matriz de code points (filas x longitud maxima del bloque)
+BLOCK_ROWS = 65536
+# Valor de relleno, mayor que cualquier code point (U+10FFFF)
+_PADDING = np.uint32(0x110000)
+# Tamaño maximo de la tabla directa de log2 por (frecuencia, longitud)
+_MAX_LOG2_TABLE = 1 << 22
+# sum() de floats usa la suma compensada de Neumaier desde Python 3.12
+_COMPENSATED_SUM = sys.version_info >= (3, 12)
+
+
+def _log2_terms(counts: np.ndarray, lengths: np.ndarray, width: int) -> np.ndarray:
+    # p * math.log2(p), con math.log2 evaluado una vez por par (frecuencia, longitud) distinto
+    keys = counts * (width + 1) + lengths
+    if (width + 1) ** 2 <= _MAX_LOG2_TABLE:
+        present = np.zeros((width + 1) ** 2, dtype=bool)
+        present[keys] = True
+        distinct = np.flatnonzero(present)
+        positions = np.zeros(present.size, dtype=np.int64)
+        positions[distinct] = np.arange(len(distinct))
+        inverse = positions[keys]
+    else:
+        distinct, inverse = np.unique(keys, return_inverse=True)
+    log2 = np.array([math.log2(p) for p in
+                     (distinct // (width + 1) / (distinct % (width + 1))).tolist()])
+    return counts / lengths * log2[inverse]
+
+
+def _row_sums(terms: np.ndarray) -> np.ndarray:
+    # Suma por filas de izquierda a derecha, como sum() sobre los terminos
+    total = np.zeros(terms.shape[0])
+    if not _COMPENSATED_SUM:
+        for column in terms.T:
+            total += column
+        return total
+    compensation = np.zeros(terms.shape[0])
+    for column in terms.T:
+        partial = total + column
+        compensation += np.where(np.abs(total) >= np.abs(column),
+                                 (total - partial) + column,
+                                 (column - partial) + total)
+        total = partial
+    return np.where((compensation != 0) & np.isfinite(compensation),
+                    total + compensation, total)
+
+
+def _block_statistics(passwords: list, lengths: np.ndarray) -> dict:
+    n = len(passwords)
+    width = int(lengths.max()) if n else 0
+    statistics = {"password_length": lengths}
+    if width == 0:
+        for name in CHARSTATS_COLUMNS[1:]:
+            statistics[name] = np.zeros(n, dtype=np.float64 if name == "password_entropy"
+                                        else np.int64)
+        return statistics
+
+    # 'U' descarta los NUL finales; la longitud real sale de len() y el relleno es U+0000
+    codes = np.array(passwords, dtype=f"U{width}").view(np.uint32).reshape(n, width)
+    positions = np.arange(width)
+    valid = positions < lengths[:, None]
+    codes = np.where(valid, codes, _PADDING)
+
+    statistics["password_lowercase"] = ((codes >= 97) & (codes <= 122)).sum(axis=1)
+    statistics["password_uppercase"] = ((codes >= 65) & (codes <= 90)).sum(axis=1)
+    statistics["password_digits"] = ((codes >= 48) & (codes <= 57)).sum(axis=1)
+    statistics["password_non_ascii"] = ((codes >= 128) & valid).sum(axis=1)
+    statistics["password_symbols"] = (lengths - statistics["password_lowercase"]
+                                      - statistics["password_uppercase"]
+                                      - statistics["password_digits"]
+                                      - statistics["password_non_ascii"])
+
+    # Histograma por fila: cada racha de valores iguales tras ordenar es un caracter distinto
+    order = np.argsort(codes, axis=1, kind="stable")
+    ordered = np.take_along_axis(codes, order, axis=1).ravel()
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    starts[::width] = True
+    run_starts = np.flatnonzero(starts)
+    run_counts = np.diff(np.append(run_starts, ordered.size))
+    characters = ordered[run_starts] != _PADDING
+    run_starts, run_counts = run_starts[characters], run_counts[characters]
+    rows = run_starts // width
+    statistics["password_unique_chars"] = np.bincount(rows, minlength=n)
+
+    # Cada termino se coloca en la posicion de la primera aparicion de su caracter
+    # (el orden estable la deja al principio de la racha), que es el orden del Counter
+    first_positions = order.ravel()[run_starts]
+    terms = np.zeros((n, width))
+    terms[rows, first_positions] = _log2_terms(run_counts, lengths[rows], width)
+    # shannon_entropy devuelve 0 (no -0.0) para la contraseña vacia
+    statistics["password_entropy"] = np.where(lengths > 0, -_row_sums(terms), 0.0)
+    return statistics
+
+
+def character_statistics(passwords: Iterable[str], block_rows: int = BLOCK_ROWS) -> pd.DataFrame:
+    """
+    Length, distinct characters, character class counts and Shannon entropy of many passwords.
+
+    Classes are ASCII lowercase, uppercase and digits, other ASCII characters
+    (symbols) and non-ASCII characters. Passwords are processed in blocks of
+    similar length, so a few very long ones do not widen every block.
+
+    :param passwords: Passwords to analyze.
+    :type passwords: Iterable[str]
+    :param block_rows: Rows encoded at a time, defaults to BLOCK_ROWS
+    :type block_rows: int, optional
+    :return: DataFrame with CHARSTATS_COLUMNS, aligned to the input.
+    :rtype: pd.DataFrame
+    """
+    index = passwords.index if isinstance(passwords, pd.Series) else None
+    passwords = list(passwords)
+    lengths = np.fromiter(map(len, passwords), dtype=np.int64, count=len(passwords))
+    order = np.argsort(lengths, kind="stable")
+    columns = {name: np.zeros(len(passwords), dtype=np.float64 if name == "password_entropy"
+                              else np.int64) for name in CHARSTATS_COLUMNS}
+    for start in range(0, len(passwords), block_rows):
+        rows = order[start:start + block_rows]
+        block = _block_statistics([passwords[row] for row in rows], lengths[rows])
+        for name in CHARSTATS_COLUMNS:
+            columns[name][rows] = block[name]
+    return pd.DataFrame(columns, index=index)
+
+
+def password_entropies(passwords: Iterable[str], block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """
+    Shannon entropy of many passwords, equal to ``shannon_entropy`` on each one.
+
+    :param passwords: Passwords to analyze.
+    :type passwords: Iterable[str]
+    :param block_rows: Rows encoded at a time, defaults to BLOCK_ROWS
+    :type block_rows: int, optional
+    :return: Entropies, aligned to the input.
+    :rtype: np.ndarray
+    """
+    return character_statistics(passwords, block_rows)["password_entropy"].to_numpy()
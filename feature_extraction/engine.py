@@ -0,0 +1,71 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import os
+from typing import AbstractSet, Iterable, Optional, Union
+import pandas as pd
+from feature_extraction.cache import FeatureCache
+from feature_extraction.password import (
+    HIBP_MAX_WORKERS,
+    PwnedIndex,
+    get_passwords,
+)
+
+
+def extract_passwords(passwords: Iterable[str],
+                      password_types: dict,
+                      workers: Optional[int] = None,
+                      chunksize: int = 256,
+                      pwned_backend: str = "remote",
+                      pwned_index: Union[PwnedIndex, str, None] = None,
+                      cache: Optional[FeatureCache] = None,
+                      hibp_workers: int = HIBP_MAX_WORKERS,
+                      stages: Optional[AbstractSet[str]] = None) -> pd.DataFrame:
+    """
+    Extract the password features of a whole column in parallel.
+
+    Unique passwords are split in chunks and sharded across a process pool
+    for the CPU-bound work (zxcvbn and entropy). At the same time, the
+    leaked password counts are fetched on a separate thread with
+    ``check_pwned_bulk``, so network round trips never wait for a free CPU
+    worker and vice versa. Chunks are gathered in submission order, which
+    makes the output independent of the number of workers; with
+    ``workers=1`` everything runs sequentially in the calling process.
+    Workers are spawned, not forked: the HIBP thread (and its connection
+    pool locks) may already be running when the first chunk is submitted.
+
+    :param passwords: Passwords to analyze.
+    :type passwords: Iterable[str]
+    :param password_types: Dictionary with password types.
+    :type password_types: dict
+    :param workers: Number of worker processes, defaults to the number of CPUs
+    :type workers: int, optional
+    :param chunksize: Unique passwords per task, defaults to 256
+    :type chunksize: int, optional
+    :param pwned_backend: Backend for the leaked password count, defaults to "remote"
+    :type pwned_backend: str, optional
+    :param pwned_index: Local Pwned Passwords index or path to it, defaults to None
+    :type pwned_index: Union[PwnedIndex, str, None], optional
+    :param cache: Cache for the computed features, defaults to None
+    :type cache: FeatureCache, optional
+    :param hibp_workers: Maximum concurrent HIBP range requests, defaults to HIBP_MAX_WORKERS
+    :type hibp_workers: int, optional
+    :param stages: Password stages to run, see ``get_passwords``, defaults to all of them
+    :type stages: AbstractSet[str], optional
+    :return: Password information, one row per input password.
+    :rtype: pd.DataFrame
+    """
+    passwords = pd.Series(passwords, dtype=object)
+    workers = workers or os.cpu_count() or 1
+    kwargs = dict(pwned_backend=pwned_backend,
+                  pwned_index=pwned_index,
+                  cache=cache,
+                  chunksize=chunksize,
+                  hibp_workers=hibp_workers,
+                  stages=stages)
+    n_chunks = -(-passwords.nunique() // chunksize)
+    # Sin zxcvbn no hay trabajo de CPU que repartir entre procesos
+    if workers == 1 or n_chunks <= 1 or (stages is not None and "strength" not in stages):
+        return get_passwords(passwords, password_types, **kwargs)
+    with ProcessPoolExecutor(max_workers=min(workers, n_chunks),
+                             mp_context=get_context("spawn")) as executor:
+        return get_passwords(passwords, password_types, executor=executor, **kwargs)
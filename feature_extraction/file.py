@@ -1,25 +1,119 @@
+from functools import lru_cache
 from pathlib import Path
 import json
+import re
+from typing import Union
+import numpy as np
 import pandas as pd
 
 
+class CountryMatcher:
+    """
+    Compiled matcher of file names against the country tokens of the file database.
+
+    Tokens are lowercased once and every country is compiled into a single
+    alternation regex. Countries keep the priority of the JSON order: a file
+    name gets the first country with any token contained in it.
+
+    :param files_data: Dictionary with file data.
+    :type files_data: dict
+    :param maxsize: Size of the LRU of matched file names, defaults to 4096
+    :type maxsize: int, optional
+    """
+
+    def __init__(self, files_data: dict, maxsize: int = 4096) -> None:
+        self.patterns = [
+            (file_country, re.compile("|".join(re.escape(token.lower()) for token in tokens)))
+            for file_country, tokens in files_data.items() if tokens
+        ]
+        self.match = lru_cache(maxsize=maxsize)(self._match)
+
+    def _match(self, file: str) -> str:
+        file = file.lower()  # discriminar mayus/minus
+        for file_country, pattern in self.patterns:
+            if pattern.search(file):
+                return file_country
+        return "Other"
+
+    def match_series(self, files: pd.Series) -> pd.Series:
+        """
+        Match a whole column of file names.
+
+        :param files: File names.
+        :type files: pd.Series
+        :return: Country name per file name, aligned to the input; NaN for missing names.
+        :rtype: pd.Series
+        """
+        files = pd.Series(files, dtype=object)
+        codes, uniques = pd.factorize(files)
+        lowered = pd.Series(uniques, dtype=object).str.lower()
+        countries = pd.Series("Other", index=lowered.index, dtype=object)
+        pending = pd.Series(True, index=lowered.index)
+        for file_country, pattern in self.patterns:
+            found = pending & lowered.str.contains(pattern, regex=True)
+            countries[found] = file_country
+            pending &= ~found
+        matched = countries.to_numpy().take(codes)
+        # factorize da -1 a los nombres ausentes: take(-1) copiaria el ultimo pais
+        matched[codes == -1] = np.nan
+        return pd.Series(matched, index=files.index, dtype=object)
+
+
+# id(files_data) -> (files_data, matcher); la referencia evita que el id se reutilice
+_matchers = {}
+_MAX_MATCHERS = 16
+
+
+def get_matcher(files_data: Union[dict, CountryMatcher]) -> CountryMatcher:
+    """
+    Get the compiled matcher of a file database, compiling it on first use.
+
+    Matchers are cached by the identity of ``files_data``, so a per-row call
+    costs a dictionary lookup; the database must not be modified in place
+    after its first use (reloads build a new dictionary).
+
+    :param files_data: Dictionary with file data, or an already compiled matcher.
+    :type files_data: Union[dict, CountryMatcher]
+    :return: Compiled matcher.
+    :rtype: CountryMatcher
+    """
+    if isinstance(files_data, CountryMatcher):
+        return files_data
+    entry = _matchers.get(id(files_data))
+    if entry is None:
+        if len(_matchers) >= _MAX_MATCHERS:
+            _matchers.pop(next(iter(_matchers)))
+        entry = _matchers[id(files_data)] = (files_data, CountryMatcher(files_data))
+    return entry[1]
+
+
 # Función para obtener el nombre del país según el archivo y los datos del JSON
-def get_country_file(file: str, files_data: dict) -> str:
+def get_country_file(file: str, files_data: Union[dict, CountryMatcher]) -> str:
     """
     Get the country name based on the file name and the JSON data.
 
     :param file: File name.
     :type file: str
-    :param files_data: Dictionary with file data.
-    :type files_data: dict
+    :param files_data: Dictionary with file data, or a compiled matcher.
+    :type files_data: Union[dict, CountryMatcher]
     :return: Country name.
     :rtype: str
     """
-    for file_country, tokens in files_data.items():
-        for token in tokens:
-            if token.lower() in file.lower():  # discriminar mayus/minus
-                return file_country
-    return "Other"
+    return get_matcher(files_data).match(file)
+
+
+def get_country_files(files: pd.Series, files_data: Union[dict, CountryMatcher]) -> pd.Series:
+    """
+    Get the country name of a whole column of file names.
+
+    :param files: File names.
+    :type files: pd.Series
+    :param files_data: Dictionary with file data, or a compiled matcher.
+    :type files_data: Union[dict, CountryMatcher]
+    :return: Country name per file name, aligned to the input; NaN for missing names.
+    :rtype: pd.Series
+    """
+    return get_matcher(files_data).match_series(files)
 
 
 if __name__ == "__main__":
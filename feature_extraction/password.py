@@ -1,10 +1,120 @@
 from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+import logging
 import math
-from typing import List, Tuple, Union
+import os
+from typing import AbstractSet, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
 import pandas as pd
 import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import zxcvbn
+from feature_extraction.cache import FeatureCache
+from feature_extraction.charstats import password_entropies
+from feature_extraction.pwned_index import PwnedIndex, open_index
+from feature_extraction.tracing import tracer
+
+
+PWNED_BACKENDS = ("remote", "local", "local-then-remote")
+# Se puede apuntar a un espejo local o de pruebas con la variable de entorno
+HIBP_RANGE_URL = os.environ.get("HIBP_RANGE_URL", "https://api.pwnedpasswords.com/range/")
+HIBP_TIMEOUT = 10
+HIBP_MAX_WORKERS = 8
+
+logger = logging.getLogger(__name__)
+_session = None
+
+
+def build_session(pool_size: int = HIBP_MAX_WORKERS,
+                  retries: int = 3,
+                  backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Build a keep-alive HTTP session for the HaveIBeenPwned range API.
+
+    The connection pool is sized for ``pool_size`` concurrent requests and
+    failed requests (connection errors, 429 and 5xx responses) are retried
+    with exponential backoff.
+
+    :param pool_size: Maximum number of pooled connections, defaults to HIBP_MAX_WORKERS
+    :type pool_size: int, optional
+    :param retries: Number of retries per request, defaults to 3
+    :type retries: int, optional
+    :param backoff_factor: Backoff factor between retries, defaults to 0.5
+    :type backoff_factor: float, optional
+    :return: Configured session.
+    :rtype: requests.Session
+    """
+    retry = Retry(total=retries,
+                  backoff_factor=backoff_factor,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET",))
+    adapter = HTTPAdapter(pool_connections=pool_size,
+                          pool_maxsize=pool_size,
+                          max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Get the process-wide HaveIBeenPwned session, creating it on first use.
+
+    :return: Shared session.
+    :rtype: requests.Session
+    """
+    global _session
+    if _session is None:
+        _session = build_session()
+    return _session
+
+
+def sha1_prefix_suffix(password: str) -> Tuple[str, str]:
+    """
+    Split the uppercase SHA-1 hex digest of a password into the 5-char
+    k-anonymity prefix sent to the API and the 35-char suffix kept locally.
+
+    :param password: Password to hash.
+    :type password: str
+    :return: Prefix and suffix of the hash.
+    :rtype: Tuple[str, str]
+    """
+    hashed_passphrase = hashlib.sha1(password.encode()).hexdigest().upper()
+    return hashed_passphrase[:5], hashed_passphrase[5:]
+
+
+def fetch_range(prefix: str,
+                session: Optional[requests.Session] = None,
+                base_url: str = HIBP_RANGE_URL,
+                timeout: float = HIBP_TIMEOUT) -> Dict[str, int]:
+    """
+    Fetch every leaked hash suffix for a 5-char SHA-1 prefix.
+
+    :param prefix: SHA-1 prefix.
+    :type prefix: str
+    :param session: Session to use, defaults to the shared session
+    :type session: requests.Session, optional
+    :param base_url: Range endpoint, defaults to HIBP_RANGE_URL
+    :type base_url: str, optional
+    :param timeout: Request timeout in seconds, defaults to HIBP_TIMEOUT
+    :type timeout: float, optional
+    :raises requests.RequestException: If the range cannot be fetched.
+    :return: Dictionary with suffix and count of leaks.
+    :rtype: Dict[str, int]
+    """
+    session = session or get_session()
+    tracer.count("hibp.requests")
+    response = session.get(base_url + prefix, timeout=timeout)
+    response.raise_for_status()
+    counts = {}
+    for line in response.text.splitlines():
+        suffix, _, count = line.partition(':')
+        if count:
+            counts[suffix] = int(count)
+    return counts
 
 
 def shannon_entropy(password: str) -> float:
@@ -51,15 +161,35 @@ def password_strength(password: str) -> dict:
     return filtered_result
 
 
-def check_pwned(passwords: Union[str, List[str]]) -> List[Tuple[str, int]]:
+def _resolve_index(backend: str, index: Union[PwnedIndex, str, None]) -> Optional[PwnedIndex]:
+    if backend not in PWNED_BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend}. Opciones: {PWNED_BACKENDS}")
+    if backend == "remote":
+        return None
+    if index is None:
+        raise ValueError(f"El backend '{backend}' necesita un indice local")
+    if isinstance(index, PwnedIndex):
+        return index
+    return open_index(index)
+
+
+def check_pwned(passwords: Union[str, List[str]],
+                backend: str = "remote",
+                index: Union[PwnedIndex, str, None] = None) -> List[Tuple[str, Optional[int]]]:
     """
-    Check if a password has been leaked in a data breach using the HaveIBeenPwned Public API.
+    Check if a password has been leaked in a data breach using the HaveIBeenPwned Public API
+    or a local Pwned Passwords index. The count is None when the API cannot be reached.
 
     :param passwords: Passwords to check.
     :type passwords: Union[str, List[str]]
-    :raises ValueError: If passwords is empty.
-    :return: List of tuples with password and count of leaks.
-    :rtype: List[Tuple[str, int]]
+    :param backend: One of PWNED_BACKENDS, defaults to "remote"
+    :type backend: str, optional
+    :param index: Local index or path to it, required by the local backends, defaults to None
+    :type index: Union[PwnedIndex, str, None], optional
+    :raises ValueError: If passwords is empty or the backend is not valid.
+    :raises LookupError: If the local backend does not cover a password's range.
+    :return: List of tuples with password and count of leaks (None if unknown).
+    :rtype: List[Tuple[str, Optional[int]]]
     """
     if not passwords:
         raise ValueError("Los valores no se pueden dejar vacios")
@@ -67,37 +197,336 @@ def check_pwned(passwords: Union[str, List[str]]) -> List[Tuple[str, int]]:
     if not isinstance(passwords, list):
         passwords = [passwords]
 
+    index = _resolve_index(backend, index)
     results = []
     for passphrase in passwords:
+        if index is not None:
+            count = index.lookup(passphrase)
+            if count is not None:
+                results.append((passphrase, count))
+                continue
+            if backend == "local":
+                raise LookupError(
+                    f"El rango {sha1_prefix_suffix(passphrase)[0]} no esta en el indice local")
+
         # Envio de contraseñas hasheadas y no texto plano
-        hashed_passphrase = hashlib.sha1(
-            passphrase.encode()).hexdigest().upper()
-        prefix, suffix = hashed_passphrase[:5], hashed_passphrase[5:]
+        prefix, suffix = sha1_prefix_suffix(passphrase)
         # Requests a la api
-        url = f'https://api.pwnedpasswords.com/range/{prefix}'
         try:
-            response = requests.get(url)
-            response.raise_for_status()  # Raise exception for non-200 status codes
-        except requests.HTTPError as e:
-            print(f"Error al consultar la API: {e}")
-            results.append((passphrase, 0))
+            counts = fetch_range(prefix, base_url=HIBP_RANGE_URL)
+        except requests.RequestException as e:
+            # Sin respuesta no se sabe si esta filtrada: None, no 0
+            logger.warning("Error al consultar la API de HIBP para %s: %r", prefix, e)
+            tracer.count("hibp.errors")
+            results.append((passphrase, None))
             continue
 
-        # Check if passphrase hash suffix exists in response
-        for line in response.text.splitlines():
-            suffix_, count = line.split(':')
-            if suffix_ == suffix:
-                results.append((passphrase, count))
-                break
-
         # If suffix not found, add 0 count
-        else:
-            results.append((passphrase, 0))
+        results.append((passphrase, counts.get(suffix, 0)))
 
     return results
 
 
-def get_password(password: str, password_types: dict) -> pd.Series:
+def check_pwned_bulk(passwords: Iterable[str],
+                     session: Optional[requests.Session] = None,
+                     max_workers: int = HIBP_MAX_WORKERS,
+                     base_url: str = HIBP_RANGE_URL,
+                     timeout: float = HIBP_TIMEOUT,
+                     backend: str = "remote",
+                     index: Union[PwnedIndex, str, None] = None) -> pd.Series:
+    """
+    Check many passwords against the HaveIBeenPwned Public API or a local
+    Pwned Passwords index at once.
+
+    Passwords are deduplicated and grouped by SHA-1 prefix, so each range is
+    requested once no matter how many passwords share it. Ranges are fetched
+    concurrently over a pooled session with at most ``max_workers`` requests
+    in flight.
+
+    :param passwords: Passwords to check.
+    :type passwords: Iterable[str]
+    :param session: Session to use, defaults to the shared session
+    :type session: requests.Session, optional
+    :param max_workers: Maximum concurrent range requests, defaults to HIBP_MAX_WORKERS
+    :type max_workers: int, optional
+    :param base_url: Range endpoint, defaults to HIBP_RANGE_URL
+    :type base_url: str, optional
+    :param timeout: Request timeout in seconds, defaults to HIBP_TIMEOUT
+    :type timeout: float, optional
+    :param backend: One of PWNED_BACKENDS, defaults to "remote"
+    :type backend: str, optional
+    :param index: Local index or path to it, required by the local backends, defaults to None
+    :type index: Union[PwnedIndex, str, None], optional
+    :raises LookupError: If the local backend does not cover a password's range.
+    :return: Count of leaks per password, aligned to the input. int64, or float64 with
+        NaN for the passwords whose range could not be fetched.
+    :rtype: pd.Series
+    """
+    passwords = pd.Series(passwords, dtype=object)
+    index = _resolve_index(backend, index)
+    if index is not None:
+        leaks = index.lookup_many(passwords)
+        missing = leaks.isna()
+        if missing.any() and backend == "local":
+            raise LookupError(f"{missing.sum()} contraseñas fuera del indice local")
+        if missing.any():
+            leaks[missing] = check_pwned_bulk(
+                passwords[missing], session, max_workers, base_url, timeout)
+        return leaks if leaks.isna().any() else leaks.astype("int64")
+
+    session = session or get_session()
+
+    # Agrupar las contraseñas unicas por prefijo
+    suffixes = {}
+    for passphrase in passwords.unique():
+        prefix, suffix = sha1_prefix_suffix(passphrase)
+        suffixes.setdefault(prefix, []).append((passphrase, suffix))
+
+    def lookup(prefix: str) -> List[Tuple[str, float]]:
+        try:
+            counts = fetch_range(prefix, session, base_url, timeout)
+        except requests.RequestException as e:
+            # Un rango fallido no aborta el lote: sus contraseñas quedan en NaN
+            logger.warning("Error al consultar la API de HIBP para %s: %r", prefix, e)
+            tracer.count("hibp.errors")
+            return [(passphrase, np.nan) for passphrase, _ in suffixes[prefix]]
+        return [(passphrase, counts.get(suffix, 0))
+                for passphrase, suffix in suffixes[prefix]]
+
+    leaks = {}
+    with tracer.span("hibp.fetch", rows=len(suffixes)), \
+            ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for found in executor.map(lookup, suffixes):
+            leaks.update(found)
+
+    leaks = passwords.map(leaks).astype("float64")
+    return leaks if leaks.isna().any() else leaks.astype("int64")
+
+
+PASSWORD_COLUMNS = ["md5",
+                    "sha256",
+                    "sha512",
+                    "sha1",
+                    "password_update",
+                    "password_type",
+                    "leaked_password",
+                    "password_strength",
+                    "guesses_discover",
+                    "cracking_time",
+                    "password_entropy"]
+HASH_COLUMNS = ["md5", "sha256", "sha512", "sha1"]
+STRENGTH_COLUMNS = ["password_strength", "guesses_discover", "cracking_time", "password_entropy"]
+
+
+def password_hashes(passwords: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Compute the MD5, SHA-256, SHA-512 and SHA-1 hex digests of many passwords.
+
+    :param passwords: Passwords to hash.
+    :type passwords: Sequence[str]
+    :return: Dictionary with one array of digests per algorithm.
+    :rtype: Dict[str, np.ndarray]
+    """
+    n = len(passwords)
+    md5, sha256, sha512, sha1 = (np.empty(n, dtype=object) for _ in HASH_COLUMNS)
+    for i, password in enumerate(passwords):
+        encoded = password.encode()
+        md5[i] = hashlib.md5(encoded).hexdigest()
+        sha256[i] = hashlib.sha256(encoded).hexdigest()
+        sha512[i] = hashlib.sha512(encoded).hexdigest()
+        sha1[i] = hashlib.sha1(encoded).hexdigest()
+    return {"md5": md5, "sha256": sha256, "sha512": sha512, "sha1": sha1}
+
+
+def strength_features(passwords: List[str]) -> List[tuple]:
+    """
+    Compute the zxcvbn score, guesses, cracking time and entropy of many passwords.
+
+    :param passwords: Passwords to analyze.
+    :type passwords: List[str]
+    :return: One tuple per password, in STRENGTH_COLUMNS order.
+    :rtype: List[tuple]
+    """
+    results = []
+    # Entropia de todo el lote a la vez, identica a shannon_entropy
+    for password, entropy in zip(passwords, password_entropies(passwords).tolist()):
+        strength_result = password_strength(password)
+        results.append((strength_result['score'],
+                        strength_result['guesses_log10'],
+                        strength_result['online_no_throttling_10_per_second_seconds'],
+                        entropy))
+    return results
+
+
+def password_features(password: str) -> dict:
+    """
+    Compute the password features that do not depend on external services:
+    hashes, zxcvbn strength, guesses, cracking time and entropy.
+
+    :param password: Password to analyze.
+    :type password: str
+    :return: Password features.
+    :rtype: dict
+    """
+    features = {name: values[0] for name, values in password_hashes([password]).items()}
+    features.update(zip(STRENGTH_COLUMNS, strength_features([password])[0]))
+    return features
+
+
+def get_passwords(passwords: pd.Series,
+                  password_types: dict,
+                  pwned_backend: str = "remote",
+                  pwned_index: Union[PwnedIndex, str, None] = None,
+                  cache: Optional[FeatureCache] = None,
+                  executor: Optional[Executor] = None,
+                  chunksize: int = 256,
+                  hibp_workers: int = HIBP_MAX_WORKERS,
+                  stages: Optional[AbstractSet[str]] = None) -> pd.DataFrame:
+    """
+    Get password information for a whole column of passwords.
+
+    Expensive features are computed once per unique password and gathered
+    back to the rows by position. The leaked password counts are fetched
+    on a separate thread while the zxcvbn features are computed, either in
+    the calling process or, chunk by chunk, on ``executor``.
+
+    :param passwords: Passwords to analyze.
+    :type passwords: pd.Series
+    :param password_types: Dictionary with password types.
+    :type password_types: dict
+    :param pwned_backend: Backend for the leaked password count, one of PWNED_BACKENDS, defaults to "remote"
+    :type pwned_backend: str, optional
+    :param pwned_index: Local Pwned Passwords index or path to it, defaults to None
+    :type pwned_index: Union[PwnedIndex, str, None], optional
+    :param cache: Cache for the computed features, defaults to None
+    :type cache: FeatureCache, optional
+    :param executor: Executor for the zxcvbn features, defaults to None (in process)
+    :type executor: Executor, optional
+    :param chunksize: Unique passwords per executor task, defaults to 256
+    :type chunksize: int, optional
+    :param hibp_workers: Maximum concurrent HIBP range requests, defaults to HIBP_MAX_WORKERS
+    :type hibp_workers: int, optional
+    :param stages: Stages of feature_extraction.plan.STAGES to run ("hashes", "hibp",
+        "strength", "entropy"); the columns of the others are NaN. Defaults to all of them.
+    :type stages: AbstractSet[str], optional
+    :return: DataFrame with password information, aligned to the input.
+    :rtype: pd.DataFrame
+    """
+    passwords = pd.Series(passwords, dtype=object)
+    stages = {"hashes", "hibp", "strength", "entropy"} if stages is None else stages
+    run_hashes, run_hibp = "hashes" in stages, "hibp" in stages
+    run_strength, run_entropy = "strength" in stages, "entropy" in stages
+    codes, uniques = pd.factorize(passwords)
+    uniques = list(uniques)
+    n = len(uniques)
+
+    columns = {name: np.empty(n, dtype=object) if run_hashes else np.full(n, np.nan, dtype=object)
+               for name in HASH_COLUMNS}
+    columns["leaked_password"] = np.zeros(n, dtype=np.int64) if run_hibp else np.full(n, np.nan)
+    columns["password_strength"] = np.zeros(n, dtype=np.int64) if run_strength \
+        else np.full(n, np.nan)
+    columns["guesses_discover"] = np.zeros(n, dtype=np.float64) if run_strength \
+        else np.full(n, np.nan)
+    columns["cracking_time"] = np.empty(n, dtype=object) if run_strength \
+        else np.full(n, np.nan, dtype=object)
+    columns["password_entropy"] = np.zeros(n, dtype=np.float64) if run_strength or run_entropy \
+        else np.full(n, np.nan)
+
+    planned = (HASH_COLUMNS if run_hashes else []) + \
+        (STRENGTH_COLUMNS if run_strength else ["password_entropy"] if run_entropy else [])
+    pending, pending_pwned = [], []
+    for i, password in enumerate(uniques):
+        features = cache.get(password) if cache and planned else None
+        if features is None:
+            if planned:
+                pending.append(i)
+        else:
+            for name in planned:
+                columns[name][i] = features[name]
+        pwned_count = cache.get_pwned(password) if cache and run_hibp else None
+        if pwned_count is None:
+            if run_hibp:
+                pending_pwned.append(i)
+        else:
+            columns["leaked_password"][i] = pwned_count
+    tracer.count("password.unique", n)
+    if cache and planned:
+        tracer.count("password.cache_hits", n - len(pending))
+        tracer.count("password.cache_misses", len(pending))
+    if cache and run_hibp:
+        tracer.count("password.pwned_cache_hits", n - len(pending_pwned))
+        tracer.count("password.pwned_cache_misses", len(pending_pwned))
+
+    with ThreadPoolExecutor(max_workers=1) as io_executor:
+        # Resultado de Leaked_password
+        pwned_future = io_executor.submit(check_pwned_bulk,
+                                          [uniques[i] for i in pending_pwned],
+                                          max_workers=hibp_workers,
+                                          backend=pwned_backend,
+                                          index=pwned_index) if pending_pwned else None
+
+        # Resultado de Password_strength, Guesses_discover, Cracking_time, Password_entropy y hashes
+        pending_passwords = [uniques[i] for i in pending]
+        if run_hashes:
+            with tracer.span("password.hashes", rows=len(pending)):
+                for name, values in password_hashes(pending_passwords).items():
+                    columns[name][pending] = values
+        if run_strength:
+            chunks = [pending_passwords[i:i + chunksize]
+                      for i in range(0, len(pending_passwords), chunksize)]
+            with tracer.span("password.strength", rows=len(pending)):
+                results = (executor.map if executor else map)(strength_features, chunks)
+                position = 0
+                for chunk in results:
+                    for strength in chunk:
+                        for name, value in zip(STRENGTH_COLUMNS, strength):
+                            columns[name][pending[position]] = value
+                        position += 1
+        elif run_entropy:
+            with tracer.span("password.entropy", rows=len(pending)):
+                columns["password_entropy"][pending] = password_entropies(pending_passwords)
+
+        if pwned_future is not None:
+            # Solo el tiempo que la consulta a HIBP no se solapa con zxcvbn
+            with tracer.span("password.hibp_wait", rows=len(pending_pwned)):
+                leaks = pwned_future.result().to_numpy()
+                if np.isnan(leaks.astype(np.float64)).any():
+                    columns["leaked_password"] = columns["leaked_password"].astype(np.float64)
+                columns["leaked_password"][pending_pwned] = leaks
+
+    if cache:
+        # Solo se guardan registros completos: hashes, zxcvbn y entropia
+        cache.set_many((uniques[i], {name: columns[name][i]
+                                     for name in HASH_COLUMNS + STRENGTH_COLUMNS})
+                       for i in (pending if run_hashes and run_strength else []))
+        # Los fallos de HIBP no se cachean
+        cache.set_pwned_many((uniques[i], columns["leaked_password"][i]) for i in pending_pwned
+                             if columns["leaked_password"][i] == columns["leaked_password"][i])
+
+    # Resultado de Password_update y Password_type
+    actual = passwords.str.contains("2024|2023", regex=True, na=False).to_numpy(dtype=bool)
+    columns["password_update"] = np.where(actual, "actual", "not actual").astype(object)
+    columns["password_type"] = passwords.map(password_types).fillna(
+        "personal password").to_numpy(dtype=object)
+
+    # factorize da -1 a las contraseñas ausentes: take(-1) copiaria la ultima
+    missing = codes == -1
+    frame = {}
+    for name in PASSWORD_COLUMNS:
+        values = columns[name] if name in ("password_update", "password_type") \
+            else columns[name].take(codes)
+        if missing.any():
+            values = values.astype(object if values.dtype == object else np.float64)
+            values[missing] = np.nan
+        frame[name] = values
+    return pd.DataFrame(frame, index=passwords.index)
+
+
+def get_password(password: str,
+                 password_types: dict,
+                 pwned_backend: str = "remote",
+                 pwned_index: Union[PwnedIndex, str, None] = None,
+                 cache: Optional[FeatureCache] = None) -> pd.Series:
     """
     Get password information.
 
@@ -105,6 +534,12 @@ def get_password(password: str, password_types: dict) -> pd.Series:
     :type password: str
     :param password_types: Dictionary with password types.
     :type password_types: dict
+    :param pwned_backend: Backend for the leaked password count, one of PWNED_BACKENDS, defaults to "remote"
+    :type pwned_backend: str, optional
+    :param pwned_index: Local Pwned Passwords index or path to it, defaults to None
+    :type pwned_index: Union[PwnedIndex, str, None], optional
+    :param cache: Cache for the computed features, defaults to None
+    :type cache: FeatureCache, optional
     :return: Password information.
     :rtype: pd.Series
     """
@@ -118,45 +553,26 @@ def get_password(password: str, password_types: dict) -> pd.Series:
     passwordtype = password_types.get(password, "personal password")
 
     # Resultado de Leaked_password
-    pwned_results = check_pwned(password)
-    pwned_count = pwned_results[0][1]  # Dato de Leaked passwords
-
-    # Resultado de Password_strength, Guesses_discover, Cracking_time, Password_entropy
-    strength_result = password_strength(password)
-    entropy_estimate = shannon_entropy(password)
+    pwned_count = cache.get_pwned(password) if cache else None
+    if pwned_count is None:
+        pwned_results = check_pwned(password, pwned_backend, pwned_index)
+        pwned_count = pwned_results[0][1]  # Dato de Leaked passwords
+        if pwned_count is None:
+            pwned_count = np.nan
+        elif cache:
+            cache.set_pwned(password, pwned_count)
 
-    # Resultado de hashes
+    # Resultado de Password_strength, Guesses_discover, Cracking_time, Password_entropy y hashes
     if password is None:  # Asegura manejar NoneTypes también.
         return [''] * 4
-    md5 = hashlib.md5(password.encode()).hexdigest()
-    sha256 = hashlib.sha256(password.encode()).hexdigest()
-    sha512 = hashlib.sha512(password.encode()).hexdigest()
-    sha1 = hashlib.sha1(password.encode()).hexdigest()
-
-    data = [md5,
-            sha256,
-            sha512,
-            sha1,
-            actual,
-            passwordtype,
-            pwned_count,
-            strength_result['score'],
-            strength_result['guesses_log10'],
-            strength_result['online_no_throttling_10_per_second_seconds'],
-            entropy_estimate]
-
-    index = ["md5",
-             "sha256",
-             "sha512",
-             "sha1",
-             "password_update",
-             "password_type",
-             "leaked_password",
-             "password_strength",
-             "guesses_discover",
-             "cracking_time",
-             "password_entropy"]
-
-    results = pd.Series(data=data,
-                        index=index)
-    return results
+    features = cache.get(password) if cache else None
+    if features is None:
+        features = password_features(password)
+        if cache:
+            cache.set(password, features)
+
+    features.update(password_update=actual,
+                    password_type=passwordtype,
+                    leaked_password=pwned_count)
+    return pd.Series(data=[features[name] for name in PASSWORD_COLUMNS],
+                     index=PASSWORD_COLUMNS)
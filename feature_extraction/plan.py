@@ -0,0 +1,195 @@
+"""
+Feature plans: enrich only what the scoring model consumes.
+
+``DropColumns`` discards the hashes, SelectKBest discards more columns after
+preprocessing, and every enriched column is produced by one enrichment
+stage (the zxcvbn features, the HIBP lookup, the channel lookup...). A
+``FeaturePlan`` is built by introspecting the loaded model: a stage runs
+only when one of its columns reaches the model's output, or was requested
+as an extra. The columns of skipped stages are filled with NaN, which the
+model either never reads or imputes into a feature SelectKBest discards, so
+predictions are unchanged (``verify_plan`` checks it).
+
+Usage:
+    python -m feature_extraction.plan --model model/
+"""
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+
+# Etapa de enriquecimiento -> columnas que produce
+STAGES = {
+    'user': ('vip_credentials', 'vip_group', 'user_status'),
+    'hashes': ('md5', 'sha256', 'sha512', 'sha1'),
+    'password_type': ('password_update', 'password_type'),
+    'hibp': ('leaked_password',),
+    'strength': ('password_strength', 'guesses_discover', 'cracking_time'),
+    'entropy': ('password_entropy',),
+    'channel': ('chat_type', 'channel_privacity', 'subscribers', 'engagement_rate', 'mentions',
+                'posts_day', 'reposts', 'channel_country'),
+    'file': ('country_file_name',),
+}
+ALL_STAGES = frozenset(STAGES)
+
+
+def consumed_columns(model) -> List[str]:
+    """
+    Input columns that reach the model's output after feature selection.
+
+    :param model: Pickled pipeline, compact artifact or fused model.
+    :type model: Union[inference.FusedModel, artifact.CompactModel, sklearn.pipeline.Pipeline]
+    :return: Column names.
+    :rtype: List[str]
+    """
+    if hasattr(model, 'required_columns'):
+        return list(model.required_columns)
+    if not hasattr(model, 'named_steps'):
+        from inference import FusedModel
+        return list(FusedModel(model).required_columns)
+
+    # Columna de entrada de cada columna de salida del ColumnTransformer
+    sources = []
+    for name, transformer, columns in model.named_steps['preprocessor'].transformers_:
+        if name == 'remainder' or transformer == 'drop':
+            continue
+        steps = getattr(transformer, 'named_steps', {})
+        onehot = steps.get('onehot')
+        if onehot is None:
+            sources += list(columns)
+            continue
+        drop_idx = onehot.drop_idx_ if onehot.drop_idx_ is not None \
+            else [None] * len(onehot.categories_)
+        for column, categories, drop in zip(columns, onehot.categories_, drop_idx):
+            sources += [column] * (len(categories) - (drop is not None))
+    selection = model.named_steps.get('feature_selection')
+    support = selection.get_support(indices=True) if selection is not None \
+        else range(len(sources))
+    return list(dict.fromkeys(sources[index] for index in support))
+
+
+@dataclass(frozen=True)
+class FeaturePlan:
+    """
+    Enrichment stages to run for a model.
+
+    :param required: Columns the model's predictions depend on.
+    :param extras: Columns requested for display although the model ignores them.
+    :param stages: Stages that run.
+    """
+    required: Tuple[str, ...]
+    extras: Tuple[str, ...]
+    stages: FrozenSet[str]
+
+    @property
+    def skipped_stages(self) -> List[str]:
+        return [stage for stage in STAGES if stage not in self.stages]
+
+    @property
+    def skipped_columns(self) -> List[str]:
+        return [column for stage in self.skipped_stages for column in STAGES[stage]]
+
+    def report(self) -> Dict[str, list]:
+        """
+        What the plan computes and skips.
+
+        :return: ``required``, ``extras``, ``stages``, ``skipped_stages`` and ``skipped_columns``.
+        :rtype: Dict[str, list]
+        """
+        return {"required": list(self.required),
+                "extras": list(self.extras),
+                "stages": [stage for stage in STAGES if stage in self.stages],
+                "skipped_stages": self.skipped_stages,
+                "skipped_columns": self.skipped_columns}
+
+
+def build_plan(model, extras: Iterable[str] = ()) -> FeaturePlan:
+    """
+    Plan that runs only the stages producing columns the model consumes, plus ``extras``.
+
+    :param model: Pickled pipeline, compact artifact or fused model.
+    :type model: Union[inference.FusedModel, artifact.CompactModel, sklearn.pipeline.Pipeline]
+    :param extras: Additional columns to compute, or ["all"] for every stage, defaults to ()
+    :type extras: Iterable[str], optional
+    :raises ValueError: If an extra is not an enriched column.
+    :return: Feature plan.
+    :rtype: FeaturePlan
+    """
+    extras = tuple(extras)
+    if "all" in extras:
+        extras = tuple(column for columns in STAGES.values() for column in columns)
+    known = {column for columns in STAGES.values() for column in columns}
+    unknown = sorted(set(extras) - known)
+    if unknown:
+        raise ValueError(f"Columnas desconocidas: {unknown}")
+    required = tuple(consumed_columns(model))
+    wanted = set(required) | set(extras)
+    stages = frozenset(stage for stage, columns in STAGES.items() if wanted & set(columns))
+    return FeaturePlan(required=required, extras=extras, stages=stages)
+
+
+def apply_plan(df: pd.DataFrame, plan: Optional[FeaturePlan]) -> pd.DataFrame:
+    """
+    Copy of enriched credentials with the columns skipped by ``plan`` set to NaN.
+
+    :param df: Fully enriched credentials.
+    :type df: pd.DataFrame
+    :param plan: Feature plan, None keeps every column.
+    :type plan: FeaturePlan, optional
+    :return: Credentials as ``enrich_df`` would produce them under ``plan``.
+    :rtype: pd.DataFrame
+    """
+    df = df.copy()
+    if plan is not None:
+        for column in plan.skipped_columns:
+            if column in df.columns:
+                df[column] = np.nan
+    return df
+
+
+def verify_plan(model, df: pd.DataFrame, plan: FeaturePlan) -> int:
+    """
+    Check that the skipped columns do not change any prediction.
+
+    :param model: Scoring model the plan was built for.
+    :type model: Union[inference.FusedModel, sklearn.pipeline.Pipeline]
+    :param df: Fully enriched credentials.
+    :type df: pd.DataFrame
+    :param plan: Feature plan.
+    :type plan: FeaturePlan
+    :raises AssertionError: If any prediction differs.
+    :return: Number of rows checked.
+    :rtype: int
+    """
+    expected = model.predict(df)
+    predicted = model.predict(apply_plan(df, plan))
+    if not np.array_equal(expected, predicted):
+        raise AssertionError(f"El plan cambia {int((expected != predicted).sum())} predicciones")
+    return len(df)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import warnings
+    from pathlib import Path
+    from dataset import load_labeled
+    from scoring import load_model
+    from settings import DATA_DIR, MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="Enrichment stages needed by a scoring model")
+    parser.add_argument("--model", type=Path, default=MODEL_DIR,
+                        help="Model artifact directory or pickled pipeline")
+    parser.add_argument("--extras", nargs="*", default=[], help="Extra columns, or 'all'")
+    parser.add_argument("--verify", type=Path, default=DATA_DIR / "train.json",
+                        help="Labeled dataset to check the predictions on")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore", UserWarning)
+    model = load_model(args.model)
+    plan = build_plan(model, args.extras)
+    report = plan.report()
+    X, _ = load_labeled(args.verify)
+    report["verified_rows"] = verify_plan(model, X, plan)
+    print(json.dumps(report, indent=2))
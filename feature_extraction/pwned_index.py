@@ -0,0 +1,263 @@
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import hashlib
+import os
+import re
+import struct
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+
+MAGIC = b"PWNIDX01"
+HEADER = struct.Struct("<8sQ")
+PREFIX_BITS = 20  # 5 caracteres hexadecimales
+N_PREFIXES = 1 << PREFIX_BITS
+HASH_SIZE = 20
+RANGE_FILE = re.compile(r"^[0-9A-Fa-f]{5}$")
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _layout(n_hashes: int) -> Tuple[int, int, int, int]:
+    """
+    Byte offsets of the offsets table, coverage bitmap, hashes and counts.
+    """
+    offsets_at = HEADER.size
+    bitmap_at = offsets_at + 8 * (N_PREFIXES + 1)
+    hashes_at = bitmap_at + N_PREFIXES // 8
+    counts_at = _align(hashes_at + HASH_SIZE * n_hashes)
+    return offsets_at, bitmap_at, hashes_at, counts_at
+
+
+def _parse_lines(lines: Iterable[str], prefix: str = "") -> Tuple[List[bytes], List[int]]:
+    hashes, counts = [], []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        suffix, _, count = line.partition(":")
+        hashes.append(bytes.fromhex(prefix + suffix))
+        counts.append(int(count or 0))
+    return hashes, counts
+
+
+def _iter_sources(sources: Iterable[Union[str, Path]]) -> Iterator[Tuple[int, List[bytes], List[int]]]:
+    """
+    Yield ``(prefix, hashes, counts)`` groups in ascending prefix order.
+
+    Sources are either range files named after their 5-char prefix (as
+    written by the Pwned Passwords downloader, one ``SUFFIX:COUNT`` per line)
+    or files of full ``SHA1:COUNT`` lines ordered by hash.
+    """
+    files = []
+    for source in sources:
+        source = Path(source)
+        if source.is_dir():
+            files.extend(p for p in source.iterdir() if p.is_file())
+        else:
+            files.append(source)
+
+    range_files = sorted((f for f in files if RANGE_FILE.match(f.stem)),
+                         key=lambda f: f.stem.upper())
+    full_files = [f for f in files if not RANGE_FILE.match(f.stem)]
+    if range_files and full_files:
+        raise ValueError("No se pueden mezclar ficheros de rango y ficheros completos")
+
+    for range_file in range_files:
+        with open(range_file, "r", encoding="utf-8") as range_f:
+            hashes, counts = _parse_lines(range_f, range_file.stem.upper())
+        yield int(range_file.stem, 16), hashes, counts
+
+    for full_file in full_files:
+        current, hashes, counts = None, [], []
+        with open(full_file, "r", encoding="utf-8") as full_f:
+            for line in full_f:
+                found_hashes, found_counts = _parse_lines([line])
+                if not found_hashes:
+                    continue
+                prefix = int.from_bytes(found_hashes[0][:3], "big") >> 4
+                if prefix != current:
+                    if current is not None:
+                        yield current, hashes, counts
+                    current, hashes, counts = prefix, [], []
+                hashes.extend(found_hashes)
+                counts.extend(found_counts)
+        if current is not None:
+            yield current, hashes, counts
+
+
+def build_index(sources: Iterable[Union[str, Path]], output: Union[str, Path]) -> int:
+    """
+    Build a compact Pwned Passwords index from the downloadable range files.
+
+    The index stores every hash as 20 raw bytes sorted ascending, a parallel
+    array of uint32 counts, a jump table with the first row of every 5-char
+    prefix and a bitmap of the prefixes that were ingested. Ranges are
+    streamed to disk one at a time, so memory use does not grow with the
+    size of the dataset.
+
+    :param sources: Range files, directories of range files or files of full hashes ordered by hash.
+    :type sources: Iterable[Union[str, Path]]
+    :param output: Path of the index to write.
+    :type output: Union[str, Path]
+    :raises ValueError: If the sources are not in ascending hash order.
+    :return: Number of hashes in the index.
+    :rtype: int
+    """
+    offsets = np.zeros(N_PREFIXES + 1, dtype="<u8")
+    covered = np.zeros(N_PREFIXES, dtype=bool)
+    n_hashes = 0
+    last_prefix = -1
+    output = Path(output)
+
+    with tempfile.TemporaryFile(dir=output.parent) as hashes_f, \
+            tempfile.TemporaryFile(dir=output.parent) as counts_f:
+        for prefix, hashes, counts in _iter_sources(sources):
+            if prefix <= last_prefix:
+                raise ValueError(f"Los rangos no estan ordenados: {prefix:05X}")
+            order = np.argsort(np.array(hashes, dtype=f"S{HASH_SIZE}"), kind="stable")
+            hashes_f.write(b"".join(hashes[i] for i in order))
+            counts_f.write(np.asarray(counts, dtype="<u4")[order].tobytes())
+            offsets[last_prefix + 1:prefix + 1] = n_hashes
+            covered[prefix] = True
+            n_hashes += len(hashes)
+            last_prefix = prefix
+        offsets[last_prefix + 1:] = n_hashes
+
+        offsets_at, bitmap_at, hashes_at, counts_at = _layout(n_hashes)
+        tmp_output = output.with_name(output.name + ".tmp")
+        with open(tmp_output, "wb") as index_f:
+            index_f.write(HEADER.pack(MAGIC, n_hashes))
+            index_f.write(offsets.tobytes())
+            index_f.write(np.packbits(covered).tobytes())
+            for f in (hashes_f, counts_f):
+                f.seek(0)
+                if f is counts_f:
+                    index_f.write(b"\0" * (counts_at - index_f.tell()))
+                while chunk := f.read(1 << 20):
+                    index_f.write(chunk)
+        os.replace(tmp_output, output)
+    return n_hashes
+
+
+class PwnedIndex:
+    """
+    Memory-mapped Pwned Passwords index built with :func:`build_index`.
+
+    :param path: Path to the index file.
+    :type path: Union[str, Path]
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as index_f:
+            magic, n_hashes = HEADER.unpack(index_f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} no es un indice de Pwned Passwords")
+        offsets_at, bitmap_at, hashes_at, counts_at = _layout(n_hashes)
+        self._offsets = np.memmap(self.path, dtype="<u8", mode="r",
+                                  offset=offsets_at, shape=(N_PREFIXES + 1,))
+        self._covered = np.memmap(self.path, dtype=np.uint8, mode="r",
+                                  offset=bitmap_at, shape=(N_PREFIXES // 8,))
+        self._hashes = np.memmap(self.path, dtype=f"S{HASH_SIZE}", mode="r",
+                                 offset=hashes_at, shape=(n_hashes,)) \
+            if n_hashes else np.empty(0, dtype=f"S{HASH_SIZE}")
+        self._counts = np.memmap(self.path, dtype="<u4", mode="r",
+                                 offset=counts_at, shape=(n_hashes,)) \
+            if n_hashes else np.empty(0, dtype="<u4")
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def covers(self, prefix: int) -> bool:
+        """
+        Check whether the range of a prefix was ingested.
+
+        :param prefix: 20-bit SHA-1 prefix.
+        :type prefix: int
+        :return: True if the range is in the index.
+        :rtype: bool
+        """
+        return bool(self._covered[prefix >> 3] & (0x80 >> (prefix & 7)))
+
+    def lookup(self, password: str) -> Optional[int]:
+        """
+        Count of leaks of a password.
+
+        :param password: Password to look up.
+        :type password: str
+        :return: Count of leaks, or None if its range is not in the index.
+        :rtype: Optional[int]
+        """
+        digest = hashlib.sha1(password.encode()).digest()
+        prefix = int.from_bytes(digest[:3], "big") >> 4
+        if not self.covers(prefix):
+            return None
+        start, end = int(self._offsets[prefix]), int(self._offsets[prefix + 1])
+        position = start + int(np.searchsorted(self._hashes[start:end], digest))
+        # Comparacion de bytes: los escalares S20 pierden los NUL finales
+        if position < end and self._hashes[position:position + 1].tobytes() == digest:
+            return int(self._counts[position])
+        return 0
+
+    def lookup_many(self, passwords: Iterable[str]) -> pd.Series:
+        """
+        Count of leaks of many passwords.
+
+        :param passwords: Passwords to look up.
+        :type passwords: Iterable[str]
+        :return: Count of leaks per password, aligned to the input. Passwords
+            whose range is not in the index are NA.
+        :rtype: pd.Series
+        """
+        passwords = pd.Series(passwords, dtype=object)
+        digests = np.array([hashlib.sha1(p.encode()).digest() for p in passwords],
+                           dtype=f"S{HASH_SIZE}")
+        raw = digests.view(np.uint8).reshape(-1, HASH_SIZE).astype(np.int64)
+        prefixes = (raw[:, 0] << 12) | (raw[:, 1] << 4) | (raw[:, 2] >> 4)
+        covered = np.unpackbits(np.asarray(self._covered))[prefixes].astype(bool)
+
+        counts = np.zeros(len(digests), dtype=np.int64)
+        if len(self):
+            positions = np.searchsorted(self._hashes, digests)
+            clipped = np.minimum(positions, len(self) - 1)
+            found = (positions < len(self)) & (self._hashes[clipped] == digests)
+            counts[found] = self._counts[clipped[found]]
+        return pd.Series(counts, index=passwords.index, dtype="Int64").where(covered)
+
+
+@lru_cache(maxsize=None)
+def open_index(path: Union[str, Path]) -> PwnedIndex:
+    """
+    Open a Pwned Passwords index once per process.
+
+    :param path: Path to the index file.
+    :type path: Union[str, Path]
+    :return: Shared index.
+    :rtype: PwnedIndex
+    """
+    return PwnedIndex(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pwned Passwords local index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Build an index from range files")
+    build_parser.add_argument("sources", nargs="+", type=Path)
+    build_parser.add_argument("-o", "--output", type=Path, required=True)
+    query_parser = subparsers.add_parser("query", help="Look up passwords in an index")
+    query_parser.add_argument("index", type=Path)
+    query_parser.add_argument("passwords", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"{build_index(args.sources, args.output)} hashes -> {args.output}")
+    else:
+        index = PwnedIndex(args.index)
+        for password in args.passwords:
+            print(f"{password}: {index.lookup(password)}")
@@ -0,0 +1,161 @@
+"""
+Per-stage timing and counters for enrichment and scoring.
+
+Stages are timed with ``tracer.span(name, rows=n)`` and events counted with
+``tracer.count(name, n)``. Tracing is off unless ``CRAT_TRACE`` is set or
+``tracer.enable()`` is called; while off, ``span`` returns a shared no-op
+context manager and ``count`` returns immediately, so instrumented code
+pays one attribute lookup per call.
+
+The aggregated figures are available as a dict (``report``), as Prometheus
+text exposition (``to_prometheus``) and, when enabled with ``log=True``, as
+one JSON log record per finished span on the ``crat.trace`` logger.
+"""
+from contextlib import contextmanager
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+
+logger = logging.getLogger("crat.trace")
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Aggregate wall time, calls and rows per stage plus free-form counters.
+
+    :param enabled: Record spans and counters, defaults to False
+    :type enabled: bool, optional
+    :param log: Log every finished span as JSON, defaults to False
+    :type log: bool, optional
+    """
+
+    def __init__(self, enabled: bool = False, log: bool = False) -> None:
+        self.enabled = enabled
+        self.log = log
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def enable(self, log: bool = False) -> None:
+        self.enabled = True
+        self.log = log
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def span(self, name: str, rows: Optional[int] = None):
+        """
+        Time a stage.
+
+        :param name: Stage name, dotted by component (e.g. "enrich.password").
+        :type name: str
+        :param rows: Rows processed by the stage, defaults to None
+        :type rows: int, optional
+        :return: Context manager.
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return self._span(name, rows)
+
+    @contextmanager
+    def _span(self, name: str, rows: Optional[int]):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                stage = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0,
+                                                      "max_seconds": 0.0, "rows": 0})
+                stage["calls"] += 1
+                stage["seconds"] += seconds
+                stage["max_seconds"] = max(stage["max_seconds"], seconds)
+                stage["rows"] += rows or 0
+            if self.log:
+                logger.info(json.dumps({"span": name, "parent": parent,
+                                        "seconds": round(seconds, 6), "rows": rows}))
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        Add to a counter.
+
+        :param name: Counter name (e.g. "password.cache_hits").
+        :type name: str
+        :param value: Increment, defaults to 1
+        :type value: int, optional
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self) -> dict:
+        """
+        Snapshot of the stages and counters.
+
+        :return: ``{"stages": {name: {calls, seconds, max_seconds, rows}}, "counters": {...}}``
+        :rtype: dict
+        """
+        with self._lock:
+            return {"stages": {name: dict(stage) for name, stage in self.stages.items()},
+                    "counters": dict(self.counters)}
+
+    def to_prometheus(self, prefix: str = "crat") -> str:
+        """
+        Prometheus text exposition of the snapshot.
+
+        :param prefix: Metric name prefix, defaults to "crat"
+        :type prefix: str, optional
+        :return: Metrics text.
+        :rtype: str
+        """
+        report = self.report()
+        lines = []
+        for metric, field, kind in (("stage_seconds_total", "seconds", "counter"),
+                                    ("stage_max_seconds", "max_seconds", "gauge"),
+                                    ("stage_calls_total", "calls", "counter"),
+                                    ("stage_rows_total", "rows", "counter")):
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for name, stage in sorted(report["stages"].items()):
+                lines.append(f'{prefix}_{metric}{{stage="{name}"}} {stage[field]}')
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def log_report(self) -> None:
+        """
+        Log the snapshot as one JSON record.
+        """
+        logger.info(json.dumps(self.report()))
+
+
+tracer = Tracer(enabled=bool(os.environ.get("CRAT_TRACE")))
@@ -1,6 +1,30 @@
 from pathlib import Path
 import json
 import pandas as pd
+from feature_extraction._lookup import lookup
+
+
+def get_users(usernames: pd.Series, vip_users: dict, user_groups: dict, user_status: dict) -> pd.DataFrame:
+    """
+    Get user information for a whole column of usernames.
+
+    :param usernames: User names to search for.
+    :type usernames: pd.Series
+    :param vip_users: Dictionary with VIP users.
+    :type vip_users: dict
+    :param user_groups: Dictionary with user groups.
+    :type user_groups: dict
+    :param user_status: Dictionary with user status.
+    :type user_status: dict
+    :return: DataFrame with user information, aligned to the input.
+    :rtype: pd.DataFrame
+    """
+    usernames = pd.Series(usernames, dtype=object)
+    return pd.DataFrame({
+        "vip_credentials": lookup(usernames, vip_users),
+        "vip_group": lookup(usernames, user_groups),
+        "user_status": lookup(usernames, user_status)
+    }, index=usernames.index)
 
 
 def get_user(username: str, vip_users: dict, user_groups: dict, user_status: dict):
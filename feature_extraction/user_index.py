@@ -0,0 +1,253 @@
+"""
+Memory-mapped user directory index.
+
+The nested ``vip -> group -> status -> [users]`` directory is flattened once
+into a single binary file. Usernames are normalised (surrounding whitespace
+stripped, lowercased) and stored as sorted fixed-width UTF-8 keys. The vip,
+group and status of each user are stored as uint8 codes into a small
+vocabulary kept in the header. ``UserIndex`` memory-maps the file and
+resolves usernames by binary search, so loading it costs a header read and
+every worker process opening the same file shares its pages through the OS
+page cache.
+
+Usage:
+    python -m feature_extraction.user_index build data/user.json -o users.idx
+    python -m feature_extraction.user_index query users.idx albertoestirado@telebot.com
+"""
+from functools import lru_cache
+from pathlib import Path
+import argparse
+import json
+import os
+import struct
+import tempfile
+from typing import Iterable, Iterator, Tuple, Union
+import numpy as np
+import pandas as pd
+
+
+MAGIC = b"USRIDX01"
+HEADER = struct.Struct("<8sQII")
+USER_COLUMNS = ("vip_credentials", "vip_group", "user_status")
+MAX_CODES = 255
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _layout(n_users: int, width: int, vocab_size: int) -> Tuple[int, int, int]:
+    """
+    Byte offsets of the vocabulary, keys and codes.
+    """
+    vocab_at = HEADER.size
+    keys_at = _align(vocab_at + vocab_size)
+    codes_at = keys_at + n_users * width
+    return vocab_at, keys_at, codes_at
+
+
+def normalize_username(username: str) -> str:
+    """
+    Key of a username in the index.
+
+    :param username: User name.
+    :type username: str
+    :return: Stripped, lowercased user name.
+    :rtype: str
+    """
+    return username.strip().lower()
+
+
+def _iter_users(users_data: dict) -> Iterator[Tuple[str, str, str, str]]:
+    # Mismo recorrido que load_user_db: ante duplicados gana la ultima aparicion
+    for category, groups in users_data.items():
+        for group_name, status in groups.items():
+            for status_type, users in status.items():
+                for user in users:
+                    yield user, category, group_name, status_type
+
+
+def build_user_index(source: Union[str, Path, dict], output: Union[str, Path]) -> int:
+    """
+    Build a user directory index from the nested user database.
+
+    :param source: JSON file like data/user.json, or its parsed content.
+    :type source: Union[str, Path, dict]
+    :param output: Path of the index to write.
+    :type output: Union[str, Path]
+    :raises ValueError: If a column has more than MAX_CODES distinct values.
+    :return: Number of users in the index.
+    :rtype: int
+    """
+    if not isinstance(source, dict):
+        with open(source, "r", encoding="utf-8") as users_f:
+            source = json.load(users_f)
+
+    vocab = {column: {} for column in USER_COLUMNS}
+    users = {}
+    for user, *values in _iter_users(source):
+        key = normalize_username(user).encode("utf-8")
+        if not key:
+            continue
+        codes = []
+        for column, value in zip(USER_COLUMNS, values):
+            codes.append(vocab[column].setdefault(value, len(vocab[column])))
+            if len(vocab[column]) > MAX_CODES:
+                raise ValueError(f"Demasiados valores distintos en {column}")
+        users[key] = codes
+
+    width = max(map(len, users), default=1)
+    keys = np.array(list(users), dtype=f"S{width}")
+    codes = np.array(list(users.values()), dtype=np.uint8).reshape(-1, len(USER_COLUMNS))
+    order = np.argsort(keys, kind="stable")
+    vocab_bytes = json.dumps({column: list(values) for column, values in vocab.items()},
+                             ensure_ascii=False).encode("utf-8")
+    vocab_at, keys_at, codes_at = _layout(len(keys), width, len(vocab_bytes))
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=output.parent, prefix=f".{output.name}.",
+                                     delete=False) as index_f:
+        index_f.write(HEADER.pack(MAGIC, len(keys), width, len(vocab_bytes)))
+        index_f.write(vocab_bytes)
+        index_f.write(b"\0" * (keys_at - index_f.tell()))
+        index_f.write(keys[order].tobytes())
+        # Una columna contigua de codigos por campo
+        index_f.write(np.ascontiguousarray(codes[order].T).tobytes())
+    os.replace(index_f.name, output)
+    return len(keys)
+
+
+def is_user_index(path: Union[str, Path]) -> bool:
+    """
+    Check whether a file is a user directory index.
+
+    :param path: Path to the file.
+    :type path: Union[str, Path]
+    :return: True if the file starts with the index magic.
+    :rtype: bool
+    """
+    with open(path, "rb") as index_f:
+        return index_f.read(len(MAGIC)) == MAGIC
+
+
+class UserIndex:
+    """
+    Memory-mapped user directory index built with :func:`build_user_index`.
+
+    :param path: Path to the index file.
+    :type path: Union[str, Path]
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as index_f:
+            magic, n_users, width, vocab_size = HEADER.unpack(index_f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} no es un indice de usuarios")
+            vocab = json.loads(index_f.read(vocab_size).decode("utf-8"))
+        self.width = width
+        vocab_at, keys_at, codes_at = _layout(n_users, width, vocab_size)
+        # El ultimo valor de cada vocabulario (None) es el de los usuarios desconocidos
+        self._values = [np.array(vocab[column] + [None], dtype=object) for column in USER_COLUMNS]
+        self._keys = np.memmap(self.path, dtype=f"S{width}", mode="r",
+                               offset=keys_at, shape=(n_users,)) \
+            if n_users else np.empty(0, dtype=f"S{width}")
+        self._codes = np.memmap(self.path, dtype=np.uint8, mode="r",
+                                offset=codes_at, shape=(len(USER_COLUMNS), n_users)) \
+            if n_users else np.empty((len(USER_COLUMNS), 0), dtype=np.uint8)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @property
+    def vocabulary(self) -> dict:
+        """
+        Distinct values of every column.
+
+        :return: Column to list of values.
+        :rtype: dict
+        """
+        return {column: list(values[:-1]) for column, values in zip(USER_COLUMNS, self._values)}
+
+    def _positions(self, keys: np.ndarray) -> np.ndarray:
+        # Posicion de cada clave en el indice, -1 si no esta
+        if not len(self):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.searchsorted(self._keys, keys)
+        clipped = np.minimum(positions, len(self) - 1)
+        return np.where(self._keys[clipped] == keys, clipped, -1)
+
+    def get_user(self, username: str) -> pd.Series:
+        """
+        Get user information from the index.
+
+        :param username: User name to search for.
+        :type username: str
+        :return: Series with user information, None for unknown users.
+        :rtype: pd.Series
+        """
+        key = normalize_username(username).encode("utf-8") if isinstance(username, str) else b""
+        position = -1
+        if key and len(key) <= self.width:
+            position = int(self._positions(np.array([key], dtype=f"S{self.width}"))[0])
+        return pd.Series({column: values[self._codes[i, position]] if position >= 0 else None
+                          for i, (column, values) in enumerate(zip(USER_COLUMNS, self._values))})
+
+    def get_users(self, usernames: Iterable[str]) -> pd.DataFrame:
+        """
+        Get user information for a whole column of usernames.
+
+        :param usernames: User names to search for.
+        :type usernames: Iterable[str]
+        :return: DataFrame with user information, aligned to the input. Unknown
+            users are None.
+        :rtype: pd.DataFrame
+        """
+        usernames = pd.Series(usernames, dtype=object)
+        keys = usernames.map(lambda username: normalize_username(username).encode("utf-8")
+                             if isinstance(username, str) else b"")
+        # Una clave mas larga que las del indice no puede estar y se truncaria al convertirla
+        fits = (keys.str.len() <= self.width).to_numpy()
+        keys = np.array(keys.where(fits, b"").tolist(), dtype=f"S{self.width}")
+        positions = self._positions(keys)
+        positions[(keys == b"") | ~fits] = -1
+        found = positions >= 0
+        columns = {}
+        for i, (column, values) in enumerate(zip(USER_COLUMNS, self._values)):
+            codes = np.full(len(keys), len(values) - 1, dtype=np.int64)
+            codes[found] = self._codes[i, positions[found]]
+            columns[column] = values[codes]
+        return pd.DataFrame(columns, index=usernames.index)
+
+
+@lru_cache(maxsize=None)
+def open_user_index(path: Union[str, Path]) -> UserIndex:
+    """
+    Open a user directory index once per process.
+
+    :param path: Path to the index file.
+    :type path: Union[str, Path]
+    :return: Shared index.
+    :rtype: UserIndex
+    """
+    return UserIndex(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="User directory index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Build an index from a user database")
+    build_parser.add_argument("source", type=Path)
+    build_parser.add_argument("-o", "--output", type=Path, required=True)
+    query_parser = subparsers.add_parser("query", help="Look up usernames in an index")
+    query_parser.add_argument("index", type=Path)
+    query_parser.add_argument("usernames", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"{build_user_index(args.source, args.output)} users -> {args.output}")
+    else:
+        index = UserIndex(args.index)
+        print(index.get_users(args.usernames).assign(username=args.usernames)
+              .set_index("username").to_string())
@@ -0,0 +1,194 @@
+"""
+Fused NumPy inference for compact model artifacts.
+
+``FusedModel`` compiles an artifact into a plan for the selected features
+only: every SelectKBest column is either a scaled numerical feature or one
+one-hot category, so imputation, scaling and encoding are written in place
+into one preallocated ``(rows, k)`` matrix without building the full
+ColumnTransformer output. KernelRidge kernels are then evaluated against the
+training matrix in blocks of rows sized to stay in cache.
+
+Tolerance against ``pipeline.predict`` (checked on data/test.json and
+data/train.json): float64 predictions differ by less than 1e-12; float32
+predictions by less than 1e-5, which can move ``risk = int(pred * 100)``
+by one point when a prediction sits on an integer boundary.
+
+Benchmark: python -m benchmarks.inference
+"""
+from pathlib import Path
+from typing import Union
+import numpy as np
+import pandas as pd
+from artifact import CompactModel
+
+
+TOLERANCE = {np.dtype(np.float64): 1e-12, np.dtype(np.float32): 1e-5}
+BLOCK_BYTES = 256 * 1024
+
+
+class FusedModel:
+    """
+    Single-pass NumPy scorer compiled from a compact artifact.
+
+    :param model: Artifact or artifact directory.
+    :type model: Union[CompactModel, str, Path]
+    :param dtype: Precision of the feature matrix and kernel, defaults to np.float64
+    :type dtype: np.dtype, optional
+    :param block_bytes: Size of a block of kernel rows, defaults to BLOCK_BYTES
+    :type block_bytes: int, optional
+    """
+
+    def __init__(self, model: Union[CompactModel, str, Path],
+                 dtype=np.float64, block_bytes: int = BLOCK_BYTES) -> None:
+        if not isinstance(model, CompactModel):
+            model = CompactModel(model)
+        self.model = model
+        self.model_id = model.model_id
+        self.dtype = np.dtype(dtype)
+        self.tolerance = TOLERANCE[self.dtype]
+        self.estimator = model.estimator
+        self._compile()
+        if self.estimator["type"] == "kernel_ridge":
+            self.block_rows = max(1, block_bytes // (self.dtype.itemsize * len(self.X_fit)))
+
+    def __repr__(self) -> str:
+        return f"FusedModel({self.model!r}, dtype={self.dtype.name})"
+
+    @property
+    def feature_names_in_(self) -> list:
+        return self.model.feature_names_in_
+
+    def _compile(self) -> None:
+        model = self.model
+        manifest = model.manifest
+        n_numerical = len(model.numerical_features)
+        # Columnas de salida del ColumnTransformer: (variable categorica, categoria)
+        onehot_columns = []
+        for feature, (categories, drop) in enumerate(zip(manifest["categories"],
+                                                         manifest["drop_idx"])):
+            onehot_columns += [(feature, code) for code in range(len(categories)) if code != drop]
+
+        numerical, categorical = [], {}
+        for position, column in enumerate(model.array('support')):
+            if column < n_numerical:
+                numerical.append((position, int(column)))
+            else:
+                feature, code = onehot_columns[column - n_numerical]
+                categorical.setdefault(feature, []).append((position, code))
+
+        self.required_columns = [model.numerical_features[column] for _, column in numerical] + \
+            [model.categorical_features[feature] for feature in categorical]
+        # support esta ordenado, asi que las numericas ocupan las primeras posiciones
+        numerical_columns = [column for _, column in numerical]
+        self._numerical_names = [model.numerical_features[column] for column in numerical_columns]
+        self._statistics = np.asarray(model.array('numerical_statistics'))[numerical_columns]
+        self._scale = np.asarray(model.array('scale'))[numerical_columns]
+        self._min = np.asarray(model.array('min'))[numerical_columns]
+        self._categorical = [
+            (model.categorical_features[feature],
+             pd.Index(manifest["categories"][feature]),
+             {value: code for code, value in enumerate(manifest["categories"][feature])},
+             manifest["categories"][feature].index(manifest["categorical_statistics"][feature])
+             if manifest["categorical_statistics"][feature] in manifest["categories"][feature]
+             else -1,
+             np.array([position for position, _ in columns], dtype=np.intp),
+             np.array([code for _, code in columns]))
+            for feature, columns in categorical.items()
+        ]
+        self.n_features = len(model.array('support'))
+
+        if self.estimator["type"] == "linear":
+            self.coef = np.asarray(model.array('coef'), dtype=self.dtype)
+            self.intercept = self.dtype.type(self.estimator["intercept"])
+        else:
+            self.X_fit = np.asarray(model.array('X_fit'), dtype=self.dtype)
+            self.dual_coef = np.asarray(model.array('dual_coef'), dtype=self.dtype)
+            self.X_fit_norms = np.einsum('ij,ij->i', self.X_fit, self.X_fit)
+            gamma = self.estimator["gamma"]
+            self.gamma = self.dtype.type(1.0 / self.n_features if gamma is None else gamma)
+
+    def transform(self, df: pd.DataFrame, out: np.ndarray = None) -> np.ndarray:
+        """
+        Selected features of a batch of credentials.
+
+        :param df: Enriched credentials.
+        :type df: pd.DataFrame
+        :param out: Preallocated ``(len(df), k)`` matrix to fill, defaults to None
+        :type out: np.ndarray, optional
+        :return: Feature matrix.
+        :rtype: np.ndarray
+        """
+        if out is None:
+            out = np.empty((len(df), self.n_features), dtype=self.dtype)
+        for position, name in enumerate(self._numerical_names):
+            series = df[name]
+            values = series.to_numpy()
+            if values.dtype == object:
+                # cracking_time llega como Decimal
+                values = series.astype('float64').to_numpy()
+            if values.dtype.kind == 'f':
+                missing = np.isnan(values)
+                if missing.any():
+                    values = np.where(missing, self._statistics[position], values)
+            out[:, position] = values * self._scale[position] + self._min[position]
+        for column, categories, lookup, statistic, positions, codes in self._categorical:
+            values = df[column].to_numpy(dtype=object)
+            if len(values) < 1000:
+                indices = np.fromiter((lookup.get(value, -1) for value in values),
+                                      dtype=np.intp, count=len(values))
+            else:
+                indices = categories.get_indexer(values)
+            # SimpleImputer solo imputa NaN; None queda como categoria desconocida
+            missing = values != values
+            if missing.any():
+                indices[missing] = statistic
+            out[:, positions] = indices[:, None] == codes[None, :]
+        return out
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Predict the risk of enriched credentials.
+
+        :param df: Enriched credentials.
+        :type df: pd.DataFrame
+        :return: Predicted risk in [0, 1], as float64.
+        :rtype: np.ndarray
+        """
+        return self.predict_features(self.transform(df))
+
+    def predict_features(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict the risk from a matrix built by :meth:`transform`.
+
+        :param X: Selected features.
+        :type X: np.ndarray
+        :return: Predicted risk in [0, 1], as float64.
+        :rtype: np.ndarray
+        """
+        if self.estimator["type"] == "linear":
+            return (X @ self.coef + self.intercept).astype(np.float64)
+        predictions = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.block_rows):
+            block = X[start:start + self.block_rows]
+            predictions[start:start + len(block)] = self._kernel(block) @ self.dual_coef
+        return predictions
+
+    def _kernel(self, X: np.ndarray) -> np.ndarray:
+        kernel = self.estimator["kernel"]
+        if kernel == "linear":
+            return X @ self.X_fit.T
+        if kernel in ("polynomial", "poly"):
+            K = X @ self.X_fit.T
+            K *= self.gamma
+            K += self.estimator["coef0"]
+            return K ** self.estimator["degree"]
+        if kernel == "laplacian":
+            K = np.abs(X[:, None, :] - self.X_fit[None, :, :]).sum(axis=2)
+        else:
+            K = X @ self.X_fit.T
+            K *= -2
+            K += np.einsum('ij,ij->i', X, X)[:, None]
+            K += self.X_fit_norms[None, :]
+            np.maximum(K, 0, out=K)
+        K *= -self.gamma
+        return np.exp(K, out=K)
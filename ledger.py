@@ -0,0 +1,308 @@
+"""
+Incremental scoring ledger.
+
+Stores the risk and severity of every scored (username, password, channel,
+file) tuple in SQLite, keyed by a salted fingerprint of the tuple plus a
+scoring context (model, reference data, channel statistics and Pwned
+Passwords backend versions). Reposted combolists are then answered from the
+ledger and only novel tuples go through enrichment and prediction. A new
+model, reference or index version changes the context, so old entries stop
+matching and can be compacted away. HIBP counts also change without any
+local version, so entries older than a TTL (24 hours by default) are scored
+again.
+
+Usage:
+    python score.py dump.ndjson --ledger .cache/ledger.sqlite -o scored.ndjson
+    python ledger.py stats .cache/ledger.sqlite
+    python ledger.py compact .cache/ledger.sqlite --keep-context <context>
+"""
+from pathlib import Path
+import hashlib
+import hmac
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+from chunk_io import KEY_COLUMNS
+from feature_extraction.cache import load_salt
+from feature_extraction.channel_store import ChannelStatsStore
+from feature_extraction.plan import FeaturePlan
+from feature_extraction.tracing import tracer
+from reference import get_reference
+from scoring import model_version
+
+
+LOOKUP_BATCH = 500
+# Antiguedad maxima de una puntuacion, por la frescura de HIBP
+LEDGER_TTL = 24 * 3600
+
+
+def pwned_version(pwned_backend: str = "remote", pwned_index=None) -> str:
+    """
+    Version of the Pwned Passwords backend: its name plus the identity of the local index.
+
+    :param pwned_backend: "remote", "local" or "local-then-remote", defaults to "remote"
+    :type pwned_backend: str, optional
+    :param pwned_index: Local index or its path, defaults to None
+    :type pwned_index: Union[str, Path, PwnedIndex], optional
+    :return: Backend version, e.g. "local-<digest>".
+    :rtype: str
+    """
+    if pwned_backend == "remote" or pwned_index is None:
+        return pwned_backend
+    path = Path(getattr(pwned_index, 'path', pwned_index)).resolve()
+    stat = path.stat()
+    identity = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{pwned_backend}-{hashlib.sha256(identity.encode()).hexdigest()[:12]}"
+
+
+def scoring_context(model, data_paths: dict,
+                    channels_df: Union[pd.DataFrame, ChannelStatsStore, None] = None,
+                    pwned_backend: str = "remote", pwned_index=None,
+                    plan: Optional[FeaturePlan] = None) -> str:
+    """
+    Version of everything a stored score depends on besides the tuple itself.
+
+    :param model: Scoring model.
+    :type model: Union[inference.FusedModel, sklearn.pipeline.Pipeline]
+    :param data_paths: Paths to the reference files.
+    :type data_paths: dict
+    :param channels_df: Channel statistics used for enrichment, defaults to None
+    :type channels_df: Union[pd.DataFrame, ChannelStatsStore], optional
+    :param pwned_backend: Pwned Passwords backend, defaults to "remote"
+    :type pwned_backend: str, optional
+    :param pwned_index: Local Pwned Passwords index or its path, defaults to None
+    :type pwned_index: Union[str, Path, PwnedIndex], optional
+    :param plan: Feature plan; the backend is left out when it skips ``leaked_password``,
+        defaults to None (HIBP used)
+    :type plan: FeaturePlan, optional
+    :return: Context string, e.g. "<model>:<reference>:<channels>:<hibp>".
+    :rtype: str
+    """
+    parts = [model_version(model), get_reference(data_paths).version]
+    if isinstance(channels_df, ChannelStatsStore):
+        parts.append(channels_df.version)
+    elif channels_df is not None:
+        digest = pd.util.hash_pandas_object(channels_df.astype(str), index=False).to_numpy()
+        parts.append(hashlib.sha256(digest.tobytes()).hexdigest()[:12])
+    if plan is not None and 'leaked_password' not in plan.required:
+        parts.append("hibp-unused")
+    else:
+        parts.append("hibp-" + pwned_version(pwned_backend, pwned_index))
+    return ":".join(parts)
+
+
+def _encode(value) -> str:
+    # Longitud como prefijo: NaN no colisiona con "nan" ni un separador con otra columna
+    if pd.isna(value):
+        return "n"
+    value = str(value)
+    return f"s{len(value)}:{value}"
+
+
+class ScoringLedger:
+    """
+    Persistent store of scored credential tuples.
+
+    Tuples are fingerprinted with an HMAC-SHA256 under a secret salt (the
+    same salt handling as FeatureCache), so credentials are never stored.
+    Entries older than ``ttl`` are not served and get scored again.
+
+    :param path: SQLite file.
+    :type path: Union[str, Path]
+    :param salt: Secret salt, defaults to $CRAT_CACHE_SALT or a salt file next to the database
+    :type salt: Union[str, bytes], optional
+    :param ttl: Maximum age of a served score in seconds, defaults to LEDGER_TTL (None: no limit)
+    :type ttl: float, optional
+    """
+
+    def __init__(self, path: Union[str, Path], salt: Union[str, bytes, None] = None,
+                 ttl: Optional[float] = LEDGER_TTL) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._salt = load_salt(self.path, salt)
+        self._lock = threading.Lock()
+        self._stats = {"rows": 0, "ledger_rows": 0, "duplicate_rows": 0, "scored_rows": 0}
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS scores "
+                         "(fingerprint TEXT PRIMARY KEY, context TEXT, risk INTEGER, "
+                         "severity TEXT, created REAL) WITHOUT ROWID")
+        self._db.commit()
+
+    def fingerprints(self, df: pd.DataFrame, context: str) -> pd.Series:
+        """
+        Fingerprint of every credential tuple under a scoring context.
+
+        :param df: Credentials with KEY_COLUMNS.
+        :type df: pd.DataFrame
+        :param context: Scoring context, see :func:`scoring_context`.
+        :type context: str
+        :return: Hex fingerprints aligned to ``df``.
+        :rtype: pd.Series
+        """
+        prefix = hmac.new(self._salt, context.encode(), hashlib.sha256)
+        values = []
+        for row in zip(*(df[column] for column in KEY_COLUMNS)):
+            digest = prefix.copy()
+            digest.update("".join(map(_encode, row)).encode())
+            values.append(digest.hexdigest()[:32])
+        return pd.Series(values, index=df.index, dtype=object)
+
+    def lookup(self, fingerprints) -> Dict[str, Tuple[int, str]]:
+        """
+        Stored scores of many fingerprints, leaving out entries older than the TTL.
+
+        :param fingerprints: Fingerprints to look up.
+        :type fingerprints: Iterable[str]
+        :return: Fingerprint to ``(risk, severity)`` for the known ones.
+        :rtype: Dict[str, Tuple[int, str]]
+        """
+        unique = list(dict.fromkeys(fingerprints))
+        found = {}
+        oldest = time.time() - self.ttl if self.ttl is not None else float("-inf")
+        with self._lock:
+            for start in range(0, len(unique), LOOKUP_BATCH):
+                batch = unique[start:start + LOOKUP_BATCH]
+                rows = self._db.execute(
+                    "SELECT fingerprint, risk, severity FROM scores WHERE created >= ? "
+                    f"AND fingerprint IN ({','.join('?' * len(batch))})", [oldest] + batch)
+                found.update((fingerprint, (risk, severity)) for fingerprint, risk, severity in rows)
+        return found
+
+    def store(self, fingerprints, risks, severities, context: str) -> None:
+        """
+        Store the scores of many fingerprints.
+
+        :param fingerprints: Fingerprints.
+        :type fingerprints: Iterable[str]
+        :param risks: Risk of each fingerprint.
+        :type risks: Iterable[int]
+        :param severities: Severity of each fingerprint.
+        :type severities: Iterable[str]
+        :param context: Scoring context of the fingerprints.
+        :type context: str
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?)",
+                                 [(fingerprint, context, int(risk), severity, now)
+                                  for fingerprint, risk, severity
+                                  in zip(fingerprints, risks, severities)])
+            self._db.commit()
+
+    def score(self, df: pd.DataFrame, context: str,
+              score: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Score credentials, running ``score`` only on tuples not in the ledger.
+
+        Tuples repeated within ``df`` are scored once as well.
+
+        :param df: Credentials with KEY_COLUMNS.
+        :type df: pd.DataFrame
+        :param context: Scoring context, see :func:`scoring_context`.
+        :type context: str
+        :param score: Function enriching and scoring raw credentials into a
+            DataFrame with ``risk`` and ``severity``, one row per input row.
+        :type score: Callable[[pd.DataFrame], pd.DataFrame]
+        :return: KEY_COLUMNS plus ``risk`` and ``severity``, one row per input row.
+        :rtype: pd.DataFrame
+        """
+        results = df[KEY_COLUMNS].reset_index(drop=True)
+        with tracer.span("ledger.lookup", rows=len(results)):
+            fingerprints = self.fingerprints(results, context)
+            known = self.lookup(fingerprints)
+        from_ledger = fingerprints.isin(known.keys())
+        novel = ~from_ledger & ~fingerprints.duplicated()
+        if novel.any():
+            scored = score(results[novel.to_numpy()])
+            with tracer.span("ledger.store", rows=int(novel.sum())):
+                self.store(fingerprints[novel], scored['risk'], scored['severity'], context)
+            known.update(zip(fingerprints[novel], zip(scored['risk'], scored['severity'])))
+        stored = fingerprints.map(known)
+        results['risk'] = np.fromiter((risk for risk, _ in stored), dtype=int, count=len(stored))
+        results['severity'] = [severity for _, severity in stored]
+
+        ledger_rows = int(from_ledger.sum())
+        with self._lock:
+            self._stats["rows"] += len(results)
+            self._stats["ledger_rows"] += ledger_rows
+            self._stats["scored_rows"] += int(novel.sum())
+            self._stats["duplicate_rows"] += len(results) - ledger_rows - int(novel.sum())
+        tracer.count("ledger.hits", ledger_rows)
+        tracer.count("ledger.misses", len(results) - ledger_rows)
+        return results
+
+    def compact(self, keep_context: Optional[str] = None, max_age: Optional[float] = None) -> int:
+        """
+        Delete entries of other scoring contexts and/or older than ``max_age``, then reclaim space.
+
+        :param keep_context: Context whose entries are kept, defaults to None (keep every context)
+        :type keep_context: str, optional
+        :param max_age: Maximum age in seconds, defaults to None (no limit)
+        :type max_age: float, optional
+        :return: Number of deleted entries.
+        :rtype: int
+        """
+        deleted = 0
+        with self._lock:
+            if keep_context is not None:
+                deleted += self._db.execute("DELETE FROM scores WHERE context != ?",
+                                            (keep_context,)).rowcount
+            if max_age is not None:
+                deleted += self._db.execute("DELETE FROM scores WHERE created < ?",
+                                            (time.time() - max_age,)).rowcount
+            self._db.commit()
+            self._db.execute("VACUUM")
+        return deleted
+
+    @property
+    def stats(self) -> dict:
+        """
+        Rows served from the ledger since it was opened and entries per context.
+
+        ``ledger_rows`` were answered from stored scores, ``scored_rows`` went
+        through enrichment and prediction and ``duplicate_rows`` repeated a
+        tuple scored in the same call.
+
+        :return: Counters, ``ledger_fraction`` and ``entries`` per context.
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = dict(self._db.execute(
+                "SELECT context, COUNT(*) FROM scores GROUP BY context").fetchall())
+        stats["ledger_fraction"] = stats["ledger_rows"] / stats["rows"] if stats["rows"] else 0.0
+        return stats
+
+    def close(self) -> None:
+        """
+        Close the database.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Scoring ledger maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    stats_parser = subparsers.add_parser("stats", help="Entries per scoring context")
+    stats_parser.add_argument("ledger", type=Path)
+    compact_parser = subparsers.add_parser("compact", help="Delete stale entries and vacuum")
+    compact_parser.add_argument("ledger", type=Path)
+    compact_parser.add_argument("--keep-context", help="Only keep entries of this context")
+    compact_parser.add_argument("--max-age-days", type=float)
+    args = parser.parse_args()
+
+    ledger = ScoringLedger(args.ledger)
+    if args.command == "compact":
+        max_age = args.max_age_days * 24 * 3600 if args.max_age_days else None
+        print(f"{ledger.compact(args.keep_context, max_age)} entries deleted")
+    print(json.dumps(ledger.stats["entries"], indent=2))
+    ledger.close()
@@ -0,0 +1,21 @@
+from sklearn.base import BaseEstimator, TransformerMixin
+
+
+class DropColumns(BaseEstimator, TransformerMixin):
+    """
+    Drop columns from a DataFrame
+
+    :param BaseEstimator: Base class for all estimators in scikit-learn
+    :type BaseEstimator: BaseEstimator
+    :param TransformerMixin: Mixin class for all transformers in scikit-learn
+    :type TransformerMixin: TransformerMixin
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return X.drop(columns=self.columns)
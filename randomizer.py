@@ -3,11 +3,78 @@ import random
 import string
 from pathlib import Path
 import csv
+from typing import Dict, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
+from dataset import compact_frame
+from feature_extraction.cache import FeatureCache
+from feature_extraction.channel_store import ChannelStatsStore
 import feature_extraction.user
 import feature_extraction.file
 import feature_extraction.channel
 import feature_extraction.password
+from feature_extraction.engine import extract_passwords
+from feature_extraction.plan import ALL_STAGES, STAGES, FeaturePlan
+from feature_extraction.tracing import tracer
+# Cargadores de las bases de referencia, reexportados desde reference
+from reference import (get_reference, load_channel_db, load_file_db, load_password_db,
+                       load_user_db, load_user_index)
+
+
+# Entidad -> columna de credenciales que la identifica
+ENTITY_COLUMNS = {'user': 'username', 'password': 'password', 'channel': 'channel', 'file': 'file'}
+
+
+def factorize_entities(df: pd.DataFrame) -> Dict[str, Tuple[np.ndarray, pd.Series]]:
+    """
+    Integer codes and distinct values of every entity column.
+
+    Missing values are a distinct value of their own, so every entity is
+    enriched exactly as its rows would be.
+
+    :param df: DataFrame with the username, password, channel and file columns.
+    :type df: pd.DataFrame
+    :return: Entity to ``(codes, uniques)``, with ``uniques[codes]`` equal to the column.
+    :rtype: Dict[str, Tuple[np.ndarray, pd.Series]]
+    """
+    entities = {}
+    for entity, column in ENTITY_COLUMNS.items():
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        entities[entity] = (codes, pd.Series(uniques, dtype=object))
+    return entities
+
+
+def entity_savings(entities: Dict[str, Tuple[np.ndarray, pd.Series]]) -> dict:
+    """
+    Lookups saved by enriching distinct entities instead of rows.
+
+    :param entities: Output of :func:`factorize_entities`.
+    :type entities: Dict[str, Tuple[np.ndarray, pd.Series]]
+    :return: Entity to ``{"rows", "unique", "saved"}``, ``saved`` as a fraction of the rows.
+    :rtype: dict
+    """
+    return {entity: {"rows": len(codes), "unique": len(uniques),
+                     "saved": 1 - len(uniques) / len(codes) if len(codes) else 0.0}
+            for entity, (codes, uniques) in entities.items()}
+
+
+def gather(features: pd.DataFrame, codes: np.ndarray) -> pd.DataFrame:
+    """
+    Per-entity features repeated for every row, by code.
+
+    :param features: One row per distinct entity.
+    :type features: pd.DataFrame
+    :param codes: Entity code of every row.
+    :type codes: np.ndarray
+    :return: One row per code, with a fresh RangeIndex and the dtypes of ``features``.
+    :rtype: pd.DataFrame
+    """
+    columns = {}
+    for column in features.columns:
+        values = features[column]
+        columns[column] = np.take(values.to_numpy(), codes) \
+            if isinstance(values.dtype, np.dtype) else values.array.take(codes)
+    return pd.DataFrame(columns, columns=features.columns)
 
 
 def password_generator(diccionario: dict) -> str:
@@ -45,89 +112,12 @@ def password_generator(diccionario: dict) -> str:
     return ''.join(contrasena)
 
 
-def load_channel_db(file_path: Path) -> dict:
-    """
-    Loads the channel database from a JSON file.
-
-    :param file_path: Path to the JSON file with the channel database.
-    :type file_path: Path
-    :return: Dictionary with the channels and their type and privacy.
-    :rtype: dict
-    """
-    channel_data = {}
-    with open(file_path, "r", encoding="utf-8") as channel_f:
-        channel_data = json.load(channel_f)
-    channel_type = {}
-    channel_priv = {}
-
-    for chat_type, type in channel_data.items():
-        for privacity_type, channels in type.items():
-            for channel in channels:
-                channel_type[channel] = chat_type
-                channel_priv[channel] = privacity_type
-    return channel_type, channel_priv
-
-
-def load_file_db(file_path: Path):
-    """
-    Loads the file database from a JSON file.
-
-    :param file_path: Path to the JSON file with the file database.
-    :type file_path: Path
-    :return: Dictionary with the files and their country.
-    :rtype: dict
-    """
-    with open(file_path, "r") as files_f:
-        files_data = json.load(files_f)
-    return files_data
-
-
-def load_user_db(file_path: Path) -> dict:
-    """
-    Loads the user database from a JSON file.
-
-    :param file_path: Path to the JSON file with the user database.
-    :type file_path: Path
-    :return: Dictionary with the users and their group.
-    :rtype: dict
-    """
-    with open(file_path, "r") as users_f:
-        users_data = json.load(users_f)
-
-    # Diccionario de búsqueda (user--> group; a@telebot.com=CEO)
-    users_group = {}
-    vip_users = {}
-    users_status = {}
-    for category, groups in users_data.items():
-        for group_name, status in groups.items():
-            for status_type, users in status.items():
-                for user in users:
-                    users_group[user] = group_name
-                    vip_users[user] = category
-                    users_status[user] = status_type
-    return vip_users, users_group, users_status
-
-
-def load_password_db(file_path: Path) -> dict:
-    """
-    Loads the password database from a JSON file.
-
-    :param file_path: Path to the JSON file with the password database.
-    :type file_path: Path
-    :return: Dictionary with the passwords and their type.
-    :rtype: dict
-    """
-    with open(file_path, "r") as pswd_f:
-        pswd_data = json.load(pswd_f)
-    pswd_type = {}
-    for password_type, pswds in pswd_data.items():
-        for pswd in pswds:
-            pswd_type[pswd] = password_type
-
-    return pswd_type
-
-
-def gen_random_df(sample_data: dict, data_paths: dict, n_samples: int = 50) -> pd.DataFrame:
+def gen_random_df(sample_data: dict,
+                  data_paths: dict,
+                  n_samples: int = 50,
+                  cache: Optional[FeatureCache] = None,
+                  workers: int = 1,
+                  compact: bool = False) -> pd.DataFrame:
     """
     Generates a DataFrame with random data.
 
@@ -137,12 +127,19 @@ def gen_random_df(sample_data: dict, data_paths: dict, n_samples: int = 50) -> p
     :type data_paths: dict
     :param n_samples: Number of samples to generate, defaults to 50
     :type n_samples: int, optional
+    :param cache: Cache for the password features, defaults to None
+    :type cache: FeatureCache, optional
+    :param workers: Worker processes for the password features, defaults to 1 (sequential)
+    :type workers: int, optional
+    :param compact: Return the compact feature schema (see :func:`dataset.compact_frame`),
+        defaults to False
+    :type compact: bool, optional
     :return: DataFrame with random data.
     :rtype: pd.DataFrame
     """
     data = []
-    sample_channel_df = pd.DataFrame(sample_data['channels'])
-    sample_channel_names = sample_channel_df['CHANNEL_NAME'].tolist()
+    channel_store = ChannelStatsStore.from_records(sample_data['channels'])
+    sample_channel_names = [channel['CHANNEL_NAME'] for channel in sample_data['channels']]
     for _ in range(n_samples):
         username = random.choice(sample_data['users'])
         password = password_generator(sample_data['diccionario'])
@@ -152,27 +149,110 @@ def gen_random_df(sample_data: dict, data_paths: dict, n_samples: int = 50) -> p
     df = pd.DataFrame(
         data, columns=['username', 'password', 'channel', 'file'])
 
-    user_db = load_user_db(data_paths['user'])
-    user_df = df['username'].apply(
-        feature_extraction.user.get_user, args=(*user_db,))
-
-    pwd_db = load_password_db(data_paths['password'])
-    pwd_df = df['password'].apply(
-        feature_extraction.password.get_password, args=(pwd_db,))
-
-    files_data = load_file_db(data_paths['file'])
-
-    df = pd.concat([df, user_df, pwd_df], axis=1)
-    df = pd.merge(df, sample_channel_df, left_on='channel',
-                  right_on='CHANNEL_NAME', how='left')
-    df = df.drop_duplicates(
-        subset=['username', 'password', 'channel', 'file']).reset_index(drop=True)
-    df['country_file_name'] = df['file'].apply(
-        lambda x: feature_extraction.file.get_country_file(x, files_data))
-    df['leaked_password'] = df['leaked_password'].astype(int)
+    # Las filas repetidas se descartan antes de enriquecer, no despues
+    with tracer.span("dedup", rows=len(df)):
+        df = df.drop_duplicates(
+            subset=['username', 'password', 'channel', 'file']).reset_index(drop=True)
+    tracer.count("dedup.rows_dropped", n_samples - len(df))
+    return enrich_df(df, channel_store, data_paths, cache=cache, workers=workers,
+                     compact=compact)
+
+
+def enrich_df(df: pd.DataFrame,
+              channels_df: Union[pd.DataFrame, ChannelStatsStore],
+              data_paths: dict,
+              cache: Optional[FeatureCache] = None,
+              workers: int = 1,
+              pwned_backend: str = "remote",
+              pwned_index: Optional[str] = None,
+              plan: Optional[FeaturePlan] = None,
+              compact: bool = False) -> pd.DataFrame:
+    """
+    Enriches raw credentials with the user, password, channel and file features
+    expected by the model. Every entity column is factorised first: each
+    distinct user, password, channel and file is enriched once and its
+    features are gathered back to the rows by code (see ``entity_savings``).
+    The reference databases come from the process-wide registry (see
+    :mod:`reference`), so they are only read again when they change. With a
+    feature plan, the stages the model does not need are skipped and their
+    columns left as NaN. With ``compact`` the result uses the compact feature
+    schema of :func:`dataset.compact_frame`, which scores identically.
+
+    :param df: DataFrame with the username, password, channel and file columns.
+    :type df: pd.DataFrame
+    :param channels_df: Channel statistics store, or a DataFrame with the channel
+        statistics (wrapped in a store on every call).
+    :type channels_df: Union[pd.DataFrame, ChannelStatsStore]
+    :param data_paths: Dictionary with the paths to the data files.
+    :type data_paths: dict
+    :param cache: Cache for the password features, defaults to None
+    :type cache: FeatureCache, optional
+    :param workers: Worker processes for the password features, defaults to 1 (sequential)
+    :type workers: int, optional
+    :param pwned_backend: Backend for the leaked password count, defaults to "remote"
+    :type pwned_backend: str, optional
+    :param pwned_index: Path to the local Pwned Passwords index, defaults to None
+    :type pwned_index: str, optional
+    :param plan: Feature plan of the scoring model, defaults to None (every stage)
+    :type plan: FeaturePlan, optional
+    :param compact: Categorical, float32 and binary columns, defaults to False
+    :type compact: bool, optional
+    :return: DataFrame with one enriched row per input row.
+    :rtype: pd.DataFrame
+    """
+    df = df[['username', 'password', 'channel', 'file']].reset_index(drop=True)
+    rows = len(df)
+    reference = get_reference(data_paths)
+    stages = plan.stages if plan is not None else ALL_STAGES
+
+    def skipped(columns: list) -> pd.DataFrame:
+        return pd.DataFrame(np.nan, index=df.index, columns=columns, dtype=object)
+
+    with tracer.span("enrich.factorize", rows=rows):
+        entities = factorize_entities(df)
+    for entity, savings in entity_savings(entities).items():
+        tracer.count(f"enrich.{entity}.unique", savings["unique"])
+        tracer.count(f"enrich.{entity}.saved", savings["rows"] - savings["unique"])
+
+    with tracer.span("enrich.user", rows=rows):
+        if 'user' in stages:
+            codes, users = entities['user']
+            user_df = gather(reference.user_index.get_users(users), codes)
+        else:
+            user_df = skipped(list(STAGES['user']))
+
+    with tracer.span("enrich.password", rows=rows):
+        # get_passwords ya trabaja por contraseña distinta
+        pwd_df = extract_passwords(df['password'], reference.password_types, workers=workers,
+                                   cache=cache, pwned_backend=pwned_backend,
+                                   pwned_index=pwned_index, stages=stages)
+
+    with tracer.span("enrich.channel", rows=rows):
+        if 'channel' in stages:
+            if not isinstance(channels_df, ChannelStatsStore):
+                channels_df = ChannelStatsStore.from_frame(channels_df)
+            codes, channels = entities['channel']
+            channel_df = gather(channels_df.lookup(channels), codes)
+        else:
+            channel_df = skipped(['channel_name'] + list(STAGES['channel']))
+    with tracer.span("enrich.file", rows=rows):
+        if 'file' in stages:
+            codes, files = entities['file']
+            countries = feature_extraction.file.get_country_files(files, reference.files_data)
+            file_df = pd.DataFrame({'country_file_name': np.take(countries.to_numpy(), codes)})
+        else:
+            file_df = skipped(['country_file_name'])
+    with tracer.span("enrich.concat", rows=rows):
+        df = pd.concat([df, user_df, pwd_df, channel_df, file_df], axis=1)
+    if 'hibp' in stages and not df['leaked_password'].isna().any():
+        # Con fallos de HIBP la columna queda float con NaN y el modelo la imputa
+        df['leaked_password'] = df['leaked_password'].astype(int)
     df.columns = df.columns.str.replace(' ', '_')
     df.columns = df.columns.str.replace('-', '_')
     df.columns = df.columns.str.lower()
+    if compact:
+        with tracer.span("enrich.compact", rows=rows):
+            df = compact_frame(df)
     return df
 
 
@@ -180,6 +260,7 @@ if __name__ == "__main__":
     BASE_DIR = Path(__file__).resolve().parent
     DATA_DIR = BASE_DIR / "data"
     SAMPLES_DIR = BASE_DIR / "samples"
+    CACHE_DIR = BASE_DIR / ".cache"
 
     with open(SAMPLES_DIR / "usernames.json", "r", encoding="utf-8") as users_file, \
             open(SAMPLES_DIR / "psw_dic.json", "r", encoding="utf-8") as diccionario_file, \
@@ -198,5 +279,7 @@ if __name__ == "__main__":
         'channel': DATA_DIR / "channel.json",
         'file': DATA_DIR / "file.json"
     }
-    df = gen_random_df(samples_data, data_paths, n_samples=50)
+    cache = FeatureCache(CACHE_DIR / "features.sqlite")
+    df = gen_random_df(samples_data, data_paths, n_samples=50, cache=cache)
+    print(cache.stats)
     df.to_csv("output.csv", index=False)
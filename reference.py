@@ -0,0 +1,279 @@
+"""
+Process-wide registry of the reference data under data/.
+
+The user, password, channel and file databases are flattened into lookup
+structures once per process (the user directory into a memory-mapped index,
+see :mod:`feature_extraction.user_index`) and shared by every caller
+(Streamlit sessions, service requests, CLI chunks). Each ``get()`` checks the files'
+mtime and size, at most every ``check_interval`` seconds; when one changed,
+its content checksum is compared and only the changed databases are
+re-flattened into a new ``ReferenceData`` that replaces the current one in
+a single assignment. Callers keep the snapshot they got, so in-flight
+scoring never sees a half-loaded index. A file that is missing or cannot be
+loaded during a reload (e.g. mid-deploy) keeps its previous version and is
+retried at the next check.
+
+The loaders of the reference files live here too (re-exported by
+:mod:`randomizer`), so this module does not depend on the enrichment code.
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from feature_extraction.tracing import tracer
+from feature_extraction.user_index import UserIndex, build_user_index, is_user_index
+from settings import CACHE_DIR
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ReferenceData:
+    """
+    Immutable snapshot of the flattened reference databases.
+
+    :param user_index: User directory index, as returned by load_user_index.
+    :param password_types: Password to password type, as returned by load_password_db.
+    :param channel_db: ``(channel_type, channel_priv)`` as returned by load_channel_db.
+    :param files_data: File database, as returned by load_file_db.
+    :param checksums: SHA-256 of every loaded file.
+    :param version: Short identifier of this combination of files.
+    """
+    user_index: Optional[UserIndex] = None
+    password_types: Optional[dict] = None
+    channel_db: Optional[tuple] = None
+    files_data: Optional[dict] = None
+    checksums: Dict[str, str] = field(default_factory=dict)
+    version: str = ""
+
+
+def load_channel_db(file_path: Path) -> dict:
+    """
+    Loads the channel database from a JSON file.
+
+    :param file_path: Path to the JSON file with the channel database.
+    :type file_path: Path
+    :return: Dictionary with the channels and their type and privacy.
+    :rtype: dict
+    """
+    channel_data = {}
+    with open(file_path, "r", encoding="utf-8") as channel_f:
+        channel_data = json.load(channel_f)
+    channel_type = {}
+    channel_priv = {}
+
+    for chat_type, type in channel_data.items():
+        for privacity_type, channels in type.items():
+            for channel in channels:
+                channel_type[channel] = chat_type
+                channel_priv[channel] = privacity_type
+    return channel_type, channel_priv
+
+
+def load_file_db(file_path: Path):
+    """
+    Loads the file database from a JSON file.
+
+    :param file_path: Path to the JSON file with the file database.
+    :type file_path: Path
+    :return: Dictionary with the files and their country.
+    :rtype: dict
+    """
+    with open(file_path, "r") as files_f:
+        files_data = json.load(files_f)
+    return files_data
+
+
+def load_user_db(file_path: Path) -> dict:
+    """
+    Loads the user database from a JSON file.
+
+    :param file_path: Path to the JSON file with the user database.
+    :type file_path: Path
+    :return: Dictionary with the users and their group.
+    :rtype: dict
+    """
+    with open(file_path, "r") as users_f:
+        users_data = json.load(users_f)
+
+    # Diccionario de búsqueda (user--> group; a@telebot.com=CEO)
+    users_group = {}
+    vip_users = {}
+    users_status = {}
+    for category, groups in users_data.items():
+        for group_name, status in groups.items():
+            for status_type, users in status.items():
+                for user in users:
+                    users_group[user] = group_name
+                    vip_users[user] = category
+                    users_status[user] = status_type
+    return vip_users, users_group, users_status
+
+
+def load_user_index(file_path: Path) -> UserIndex:
+    """
+    Loads the user directory index.
+
+    A prebuilt index (see :mod:`feature_extraction.user_index`) is opened as
+    is. A JSON user database is indexed once into the cache directory, keyed
+    by its checksum, and the index is reused by every later process.
+
+    :param file_path: Path to the index or to the JSON file with the user database.
+    :type file_path: Path
+    :return: Memory-mapped user index.
+    :rtype: UserIndex
+    """
+    if is_user_index(file_path):
+        return UserIndex(file_path)
+    digest = hashlib.sha256(Path(file_path).read_bytes()).hexdigest()[:16]
+    index_path = CACHE_DIR / "user_index" / f"{digest}.idx"
+    if not index_path.exists():
+        build_user_index(file_path, index_path)
+    return UserIndex(index_path)
+
+
+def load_password_db(file_path: Path) -> dict:
+    """
+    Loads the password database from a JSON file.
+
+    :param file_path: Path to the JSON file with the password database.
+    :type file_path: Path
+    :return: Dictionary with the passwords and their type.
+    :rtype: dict
+    """
+    with open(file_path, "r") as pswd_f:
+        pswd_data = json.load(pswd_f)
+    pswd_type = {}
+    for password_type, pswds in pswd_data.items():
+        for pswd in pswds:
+            pswd_type[pswd] = password_type
+
+    return pswd_type
+
+
+# Clave de data_paths -> (campo de ReferenceData, cargador)
+DATABASES = {
+    'user': ('user_index', load_user_index),
+    'password': ('password_types', load_password_db),
+    'channel': ('channel_db', load_channel_db),
+    'file': ('files_data', load_file_db),
+}
+
+
+def _signature(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _checksum(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class ReferenceRegistry:
+    """
+    Cached, hot-reloadable reference data.
+
+    :param data_paths: Paths to the reference files, keyed like DATABASES.
+    :type data_paths: dict
+    :param check_interval: Minimum seconds between file checks, defaults to 1.0
+    :type check_interval: float, optional
+    """
+
+    def __init__(self, data_paths: dict, check_interval: float = 1.0) -> None:
+        self.data_paths = {name: Path(path) for name, path in data_paths.items()
+                           if name in DATABASES}
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._current = ReferenceData()
+        self._signatures = {}
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> ReferenceData:
+        """
+        Current snapshot, reloading the databases whose files changed.
+
+        :return: Reference data.
+        :rtype: ReferenceData
+        """
+        current = self._current
+        if current.version and time.monotonic() - self._checked < self.check_interval:
+            return current
+        with self._lock:
+            if self._current.version and time.monotonic() - self._checked < self.check_interval:
+                return self._current
+            self._refresh()
+            self._checked = time.monotonic()
+            return self._current
+
+    def _refresh(self) -> None:
+        current = self._current
+        updates, checksums, signatures = {}, dict(current.checksums), {}
+        for name, path in self.data_paths.items():
+            attribute, loader = DATABASES[name]
+            try:
+                signature = _signature(path)
+                if signature != self._signatures.get(name):
+                    checksum = _checksum(path)
+                    if checksum != current.checksums.get(name):
+                        with tracer.span(f"reference.load.{name}"):
+                            updates[attribute] = loader(path)
+                        checksums[name] = checksum
+                signatures[name] = signature
+            except (OSError, ValueError) as error:
+                # Sin version anterior no hay nada que servir
+                if name not in current.checksums:
+                    raise
+                # Fichero ausente o a medias durante un despliegue: se reintenta en la siguiente
+                logger.warning("No se pudo recargar %s, se mantiene la version anterior: %s",
+                               path, error)
+                tracer.count("reference.reload_errors")
+        self._signatures = signatures
+        if not updates and current.version:
+            return
+        version = hashlib.sha256("".join(checksums[name] for name in sorted(checksums))
+                                 .encode()).hexdigest()[:12]
+        fields = {attribute: getattr(current, attribute) for attribute, _ in DATABASES.values()}
+        fields.update(updates)
+        # Sustitucion atomica: una sola asignacion del snapshot completo
+        self._current = ReferenceData(checksums=checksums, version=version, **fields)
+        self.reloads += 1
+        tracer.count("reference.reloads")
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(data_paths: dict) -> ReferenceRegistry:
+    """
+    Process-wide registry for a set of reference files.
+
+    :param data_paths: Paths to the reference files, keyed like DATABASES.
+    :type data_paths: dict
+    :return: Shared registry.
+    :rtype: ReferenceRegistry
+    """
+    key = tuple(sorted((name, str(Path(path).resolve())) for name, path in data_paths.items()
+                       if name in DATABASES))
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = ReferenceRegistry(data_paths)
+        return _registries[key]
+
+
+def get_reference(data_paths: dict) -> ReferenceData:
+    """
+    Current reference data for a set of reference files.
+
+    :param data_paths: Paths to the reference files, keyed like DATABASES.
+    :type data_paths: dict
+    :return: Reference data.
+    :rtype: ReferenceData
+    """
+    return get_registry(data_paths).get()
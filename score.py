@@ -0,0 +1,199 @@
+"""
+Headless scoring of leaked credentials.
+
+Reads NDJSON or CSV (a file or stdin) in bounded-size chunks, enriches the
+rows that only carry username, password, channel and file, predicts their
+risk with the model artifact (or a pickled pipeline) and streams the results as NDJSON or Parquet.
+
+Usage:
+    python score.py dump.ndjson -o scored.parquet
+    cat dump.csv | python score.py - --input-format csv > scored.ndjson
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Iterable, Iterator, Optional, Union
+import pandas as pd
+from chunk_io import ChunkWriter, read_chunks
+from feature_extraction.cache import FeatureCache
+from feature_extraction.channel import TELEMETRIO_KEY_ENV, AsyncTelemetrio
+from feature_extraction.channel_store import ChannelStatsStore, load_channel_store
+from feature_extraction.plan import build_plan
+from feature_extraction.tracing import tracer
+from ledger import LEDGER_TTL, ScoringLedger, scoring_context
+from randomizer import enrich_df
+from scoring import load_model, model_columns, score_frame
+from settings import CACHE_DIR, DATA_DIR, MODEL_DIR, SAMPLES_DIR
+
+
+DATA_PATHS = {
+    'user': DATA_DIR / "user.json",
+    'password': DATA_DIR / "password.json",
+    'channel': DATA_DIR / "channel.json",
+    'file': DATA_DIR / "file.json"
+}
+
+
+def needs_enrichment(df: pd.DataFrame, pipeline) -> bool:
+    """
+    Check whether a chunk lacks any column the pipeline reads.
+
+    :param df: Chunk of credentials.
+    :type df: pd.DataFrame
+    :param pipeline: Fitted pipeline or compact artifact.
+    :type pipeline: Union[artifact.CompactModel, sklearn.pipeline.Pipeline]
+    :return: True if the chunk must be enriched before predicting.
+    :rtype: bool
+    """
+    return not set(model_columns(pipeline)).issubset(df.columns)
+
+
+def score_chunks(chunks: Iterable[pd.DataFrame],
+                 pipeline,
+                 channels_df: Union[pd.DataFrame, ChannelStatsStore],
+                 data_paths: dict = DATA_PATHS,
+                 ledger: Optional[ScoringLedger] = None,
+                 **enrich_kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Enrich (when needed) and score a stream of credential chunks.
+
+    With a ledger, chunks that need enrichment are answered from it where
+    possible and only yield the key columns plus ``risk`` and ``severity``.
+
+    :param chunks: Chunks of credentials.
+    :type chunks: Iterable[pd.DataFrame]
+    :param pipeline: Fitted pipeline or compact artifact.
+    :type pipeline: Union[artifact.CompactModel, sklearn.pipeline.Pipeline]
+    :param channels_df: Channel statistics store (or DataFrame).
+    :type channels_df: Union[pd.DataFrame, ChannelStatsStore]
+    :param data_paths: Dictionary with the paths to the data files, defaults to DATA_PATHS
+    :type data_paths: dict, optional
+    :param ledger: Ledger of already scored tuples, defaults to None
+    :type ledger: ScoringLedger, optional
+    :return: Iterator of scored chunks.
+    :rtype: Iterator[pd.DataFrame]
+    """
+    def enrich_and_score(chunk: pd.DataFrame) -> pd.DataFrame:
+        return score_frame(pipeline, enrich_df(chunk, channels_df, data_paths, **enrich_kwargs))
+
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if not needs_enrichment(chunk, pipeline):
+            yield score_frame(pipeline, chunk)
+        elif ledger is not None:
+            context = scoring_context(pipeline, data_paths, channels_df,
+                                      pwned_backend=enrich_kwargs.get('pwned_backend', "remote"),
+                                      pwned_index=enrich_kwargs.get('pwned_index'),
+                                      plan=enrich_kwargs.get('plan'))
+            yield ledger.score(chunk, context, enrich_and_score)
+        else:
+            yield enrich_and_score(chunk)
+
+
+async def refresh_channels(store: ChannelStatsStore, api_key: str) -> dict:
+    """
+    Refresh the stale channels of a store from Telemetr.io.
+
+    :param store: Channel statistics store.
+    :type store: ChannelStatsStore
+    :param api_key: Telemetr.io API key.
+    :type api_key: str
+    :return: ``{"refreshed": n, "failed": n}``
+    :rtype: dict
+    """
+    async with AsyncTelemetrio(api_key) as client:
+        return await store.refresh(client)
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Score leaked credentials in bounded-size chunks")
+    parser.add_argument("input", help="NDJSON or CSV file, '-' for stdin")
+    parser.add_argument("-o", "--output", default="-", help="Output file, '-' for stdout")
+    parser.add_argument("--input-format", choices=["ndjson", "csv"])
+    parser.add_argument("--output-format", choices=["ndjson", "parquet"])
+    parser.add_argument("--chunksize", type=int, default=10000)
+    parser.add_argument("--model", type=Path, default=MODEL_DIR,
+                        help="Model artifact directory or pickled pipeline")
+    parser.add_argument("--channels", type=Path, default=SAMPLES_DIR / "channels.json",
+                        help="Channel statistics used for enrichment")
+    parser.add_argument("--users", type=Path, default=DATA_PATHS['user'],
+                        help="User directory: JSON database or prebuilt user index")
+    parser.add_argument("--channel-store", type=Path,
+                        help="Persistent channel statistics store, seeded from --channels")
+    parser.add_argument("--refresh-channels", action="store_true",
+                        help=f"Refresh stale channel statistics from Telemetr.io first "
+                             f"(API key in ${TELEMETRIO_KEY_ENV})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for the password features")
+    parser.add_argument("--pwned-backend", default="remote",
+                        choices=["remote", "local", "local-then-remote"])
+    parser.add_argument("--pwned-index", help="Local Pwned Passwords index")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not use the persistent password feature cache")
+    parser.add_argument("--extras", nargs="*", default=[],
+                        help="Enriched columns to compute although the model does not use them "
+                             "(e.g. md5 leaked_password), or 'all'")
+    parser.add_argument("--ledger", type=Path,
+                        help="Scoring ledger: reuse the scores of tuples seen before "
+                             "(output keeps only the key columns, risk and severity)")
+    parser.add_argument("--ledger-ttl", type=float, default=LEDGER_TTL / 3600,
+                        help="Hours a ledger score is reused before scoring the tuple again")
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress")
+    parser.add_argument("--trace", choices=["json", "prometheus"],
+                        help="Report per-stage timings and counters on stderr at the end")
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracer.enable()
+
+    pipeline = load_model(args.model)
+    plan = build_plan(pipeline, args.extras)
+    if not args.quiet:
+        print(f"Etapas omitidas: {plan.skipped_stages or 'ninguna'}", file=sys.stderr)
+    channel_store = load_channel_store(args.channels, args.channel_store)
+    if args.refresh_channels:
+        if not os.environ.get(TELEMETRIO_KEY_ENV):
+            parser.error(f"--refresh-channels necesita la variable {TELEMETRIO_KEY_ENV}")
+        counts = asyncio.run(refresh_channels(channel_store, os.environ[TELEMETRIO_KEY_ENV]))
+        if not args.quiet:
+            print(f"Canales refrescados: {counts}", file=sys.stderr)
+    cache = None if args.no_cache else FeatureCache(CACHE_DIR / "features.sqlite")
+    ledger = ScoringLedger(args.ledger, ttl=args.ledger_ttl * 3600) if args.ledger else None
+
+    chunks = read_chunks(args.input, args.input_format, args.chunksize)
+    scored = score_chunks(chunks, pipeline, channel_store,
+                          data_paths=dict(DATA_PATHS, user=args.users),
+                          ledger=ledger,
+                          cache=cache,
+                          workers=args.workers,
+                          pwned_backend=args.pwned_backend,
+                          pwned_index=args.pwned_index,
+                          plan=plan)
+    start = time.perf_counter()
+    with ChunkWriter(args.output, args.output_format) as writer:
+        for results in scored:
+            writer.write(results)
+            if not args.quiet:
+                elapsed = time.perf_counter() - start
+                print(f"{writer.rows} rows, {writer.rows / elapsed:.0f} rows/s",
+                      file=sys.stderr)
+    if not args.quiet:
+        elapsed = time.perf_counter() - start
+        print(f"Done: {writer.rows} rows in {elapsed:.1f}s "
+              f"({writer.rows / max(elapsed, 1e-9):.0f} rows/s)", file=sys.stderr)
+    if ledger is not None and not args.quiet:
+        stats = ledger.stats
+        print(f"Ledger: {stats['ledger_rows']} of {stats['rows']} rows reused "
+              f"({stats['ledger_fraction']:.1%})", file=sys.stderr)
+    if args.trace == "json":
+        print(json.dumps(tracer.report()), file=sys.stderr)
+    elif args.trace == "prometheus":
+        print(tracer.to_prometheus(), end="", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from pathlib import Path
+import hashlib
+import io
+import pickle
+from typing import Union
+import weakref
+import pandas as pd
+from feature_extraction.tracing import tracer
+
+
+# Pipeline -> digest, para no volver a serializarlo en cada chunk
+_versions = weakref.WeakKeyDictionary()
+
+
+def cvss_score(x: Union[int, float]) -> str:
+    """
+    CVSS v3 severity score based on the risk value predicted by the model.
+
+    :param x: Risk value
+    :type x: Union[int, float]
+    :return: Severity
+    :rtype: str
+    """
+    if x == 0:
+        return 'None'
+    elif x < 40:
+        return 'Low'
+    elif x < 70:
+        return 'Medium'
+    elif x < 90:
+        return 'High'
+    else:
+        return 'Critical'
+
+
+class _PipelineUnpickler(pickle.Unpickler):
+    # pipeline.pkl se genero en un notebook, donde DropColumns vivia en __main__
+    def find_class(self, module, name):
+        if module in ("__main__", "scoring") and name == "DropColumns":
+            from pipeline_steps import DropColumns
+            return DropColumns
+        return super().find_class(module, name)
+
+
+def load_pipeline(path: Union[str, Path]):
+    """
+    Load a pickled scoring pipeline.
+
+    Pickles that reference ``__main__.DropColumns`` are resolved against
+    :mod:`pipeline_steps`, so the pipeline loads from any entry point.
+
+    :param path: Path to the pickled pipeline.
+    :type path: Union[str, Path]
+    :return: Fitted pipeline.
+    :rtype: sklearn.pipeline.Pipeline
+    """
+    data = Path(path).read_bytes()
+    pipeline = _PipelineUnpickler(io.BytesIO(data)).load()
+    # Version calculada una sola vez, a partir del fichero
+    _versions[pipeline] = hashlib.sha256(data).hexdigest()[:16]
+    return pipeline
+
+
+def load_model(path: Union[str, Path]):
+    """
+    Load a scoring model: a compact artifact directory (see :mod:`artifact`),
+    compiled for :mod:`inference`, or a pickled pipeline.
+
+    :param path: Artifact directory or pickle file.
+    :type path: Union[str, Path]
+    :return: Model with a ``predict`` method.
+    :rtype: Union[inference.FusedModel, sklearn.pipeline.Pipeline]
+    """
+    if Path(path).is_dir():
+        from inference import FusedModel
+        return FusedModel(path)
+    return load_pipeline(path)
+
+
+def model_columns(model) -> list:
+    """
+    Columns a scoring model reads from its input.
+
+    :param model: Pickled pipeline or compact artifact.
+    :type model: Union[inference.FusedModel, artifact.CompactModel, sklearn.pipeline.Pipeline]
+    :return: Column names.
+    :rtype: list
+    """
+    if hasattr(model, 'named_steps'):
+        return list(model.named_steps['preprocessor'].feature_names_in_)
+    return list(model.feature_names_in_)
+
+
+def model_version(model) -> str:
+    """
+    Identifier of a fitted model: the artifact ``model_id`` or a digest of the pickled pipeline.
+
+    The digest is computed once per pipeline (at load for :func:`load_pipeline`).
+
+    :param model: Pickled pipeline or compact artifact.
+    :type model: Union[inference.FusedModel, artifact.CompactModel, sklearn.pipeline.Pipeline]
+    :return: Model version.
+    :rtype: str
+    """
+    model_id = getattr(model, 'model_id', None)
+    if model_id:
+        return model_id
+    version = _versions.get(model)
+    if version is None:
+        version = _versions[model] = hashlib.sha256(pickle.dumps(model)).hexdigest()[:16]
+    return version
+
+
+def score_frame(pipeline, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Predict the risk of enriched credentials and bucket it into CVSS severities.
+
+    :param pipeline: Fitted pipeline.
+    :type pipeline: sklearn.pipeline.Pipeline
+    :param df: Enriched credentials.
+    :type df: pd.DataFrame
+    :return: Input columns plus ``risk`` and ``severity``.
+    :rtype: pd.DataFrame
+    """
+    rows = len(df)
+    if tracer.enabled:
+        # Preprocesado y prediccion por separado solo cuando se esta midiendo
+        with tracer.span("score.preprocess", rows=rows):
+            if hasattr(pipeline, 'named_steps'):
+                features = pipeline[:-1].transform(df)
+            else:
+                features = pipeline.transform(df)
+        with tracer.span("score.predict", rows=rows):
+            if hasattr(pipeline, 'named_steps'):
+                predictions = pipeline[-1].predict(features)
+            else:
+                predictions = pipeline.predict_features(features)
+    else:
+        with tracer.span("score.predict", rows=rows):
+            predictions = pipeline.predict(df)
+    predictions = predictions * 100
+    predictions = predictions.astype(int)
+    results = pd.concat([df.reset_index(drop=True),
+                         pd.Series(predictions, name="risk")], axis=1)
+    with tracer.span("score.cvss", rows=rows):
+        results['severity'] = results['risk'].apply(cvss_score)
+    return results
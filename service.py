@@ -0,0 +1,378 @@
+"""
+Asynchronous HTTP scoring service.
+
+Loads the model once and exposes:
+    POST /score        one credential (JSON object)
+    POST /score/batch  many credentials (JSON array)
+    GET  /metrics      latency percentiles and batch sizes
+    GET  /metrics/prometheus  per-stage timings and counters (with --trace)
+
+Concurrent single requests are coalesced into micro-batches: the first
+request of a batch waits at most ``max_wait_ms`` for others to join before
+the whole batch goes through ``pipeline.predict`` at once. Every row needs
+the username, password, channel and file as strings (400 otherwise), and a
+batch that fails is rescored row by row so one bad row only fails its own
+request.
+
+Usage: python service.py --port 8000 --max-batch 256 --max-wait-ms 5
+"""
+from collections import deque
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Callable, List, Optional, Union
+import numpy as np
+import pandas as pd
+import tornado.web
+from chunk_io import KEY_COLUMNS
+from feature_extraction.channel import TELEMETRIO_KEY_ENV, AsyncTelemetrio
+from feature_extraction.channel_store import (ChannelStatsRefresher, ChannelStatsStore,
+                                              load_channel_store)
+from feature_extraction.plan import build_plan
+from feature_extraction.tracing import tracer
+from ledger import LEDGER_TTL, ScoringLedger, scoring_context
+from randomizer import enrich_df
+from score import DATA_PATHS, needs_enrichment
+from scoring import load_model, score_frame
+from settings import MODEL_DIR, SAMPLES_DIR
+
+
+RESPONSE_COLUMNS = ['username', 'channel', 'file', 'risk', 'severity']
+
+
+def row_error(row) -> Optional[str]:
+    """
+    Validate one credential of a request.
+
+    :param row: Decoded JSON value.
+    :type row: Any
+    :return: Reason the row cannot be scored, or None if it is valid.
+    :rtype: Optional[str]
+    """
+    if not isinstance(row, dict):
+        return "Expected a JSON object"
+    missing = [column for column in KEY_COLUMNS if column not in row]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    invalid = [column for column in KEY_COLUMNS if not isinstance(row[column], str)]
+    if invalid:
+        return f"Fields must be strings: {', '.join(invalid)}"
+    return None
+
+
+class Metrics:
+    """
+    Rolling latency and batch size statistics.
+
+    :param window: Number of recent samples kept per series, defaults to 10000
+    :type window: int, optional
+    """
+
+    def __init__(self, window: int = 10000) -> None:
+        self.latencies = {}
+        self.batch_sizes = deque(maxlen=window)
+        self.requests = {}
+        self.window = window
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(seconds)
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+
+    def report(self) -> dict:
+        report = {"requests": dict(self.requests), "latency_ms": {}}
+        for endpoint, samples in self.latencies.items():
+            p50, p99 = np.percentile(np.fromiter(samples, float), [50, 99]) * 1000
+            report["latency_ms"][endpoint] = {"p50": p50, "p99": p99}
+        if self.batch_sizes:
+            sizes = np.fromiter(self.batch_sizes, int)
+            report["batches"] = {"count": len(sizes), "mean_size": sizes.mean(),
+                                 "max_size": int(sizes.max())}
+        return report
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent scoring requests into batches.
+
+    :param score: Blocking function scoring a list of rows into a list of results.
+    :type score: Callable[[List[dict]], List[dict]]
+    :param max_batch: Maximum rows per batch, defaults to 256
+    :type max_batch: int, optional
+    :param max_wait_ms: Maximum time the first request waits for a batch to fill, defaults to 5
+    :type max_wait_ms: float, optional
+    :param metrics: Metrics to record batch sizes in, defaults to None
+    :type metrics: Metrics, optional
+    """
+
+    def __init__(self,
+                 score: Callable[[List[dict]], List[dict]],
+                 max_batch: int = 256,
+                 max_wait_ms: float = 5,
+                 metrics: Optional[Metrics] = None) -> None:
+        self.score = score
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics
+        self._queue = None
+        self._task = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, row: dict) -> dict:
+        """
+        Score one row as part of the next batch.
+
+        :param row: Credential.
+        :type row: dict
+        :return: Scored credential.
+        :rtype: dict
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(pending) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            if self.metrics:
+                self.metrics.batch_sizes.append(len(pending))
+            rows = [row for row, _ in pending]
+            try:
+                results = await loop.run_in_executor(None, self.score, rows)
+            except Exception as e:
+                if len(pending) == 1:
+                    self._resolve(pending[0][1], error=e)
+                    continue
+                # Se repite fila a fila para que el fallo solo llegue a su peticion
+                for row, future in pending:
+                    try:
+                        result, = await loop.run_in_executor(None, self.score, [row])
+                    except Exception as failure:
+                        self._resolve(future, error=failure)
+                    else:
+                        self._resolve(future, result)
+                continue
+            for (_, future), result in zip(pending, results):
+                self._resolve(future, result)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result: Optional[dict] = None,
+                 error: Optional[BaseException] = None) -> None:
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def make_scorer(pipeline,
+                channels_df: Union[pd.DataFrame, ChannelStatsStore],
+                data_paths: dict = DATA_PATHS,
+                ledger: Optional[ScoringLedger] = None,
+                **enrich_kwargs) -> Callable[[List[dict]], List[dict]]:
+    """
+    Build the blocking scoring function used by the service.
+
+    :param pipeline: Fitted pipeline or compact artifact.
+    :type pipeline: Union[artifact.CompactModel, sklearn.pipeline.Pipeline]
+    :param channels_df: Channel statistics store (or DataFrame).
+    :type channels_df: Union[pd.DataFrame, ChannelStatsStore]
+    :param data_paths: Dictionary with the paths to the data files, defaults to DATA_PATHS
+    :type data_paths: dict, optional
+    :param ledger: Ledger of already scored tuples, defaults to None
+    :type ledger: ScoringLedger, optional
+    :return: Function scoring a list of rows into a list of results.
+    :rtype: Callable[[List[dict]], List[dict]]
+    """
+    def enrich_and_score(df: pd.DataFrame) -> pd.DataFrame:
+        return score_frame(pipeline, enrich_df(df, channels_df, data_paths, **enrich_kwargs))
+
+    def score(rows: List[dict]) -> List[dict]:
+        df = pd.DataFrame(rows)
+        if not needs_enrichment(df, pipeline):
+            results = score_frame(pipeline, df)
+        elif ledger is not None:
+            context = scoring_context(pipeline, data_paths, channels_df,
+                                      pwned_backend=enrich_kwargs.get('pwned_backend', "remote"),
+                                      pwned_index=enrich_kwargs.get('pwned_index'),
+                                      plan=enrich_kwargs.get('plan'))
+            results = ledger.score(df, context, enrich_and_score)
+        else:
+            results = enrich_and_score(df)
+        results = results[RESPONSE_COLUMNS].astype(object)
+        # NaN no es JSON valido
+        return results.where(results.notna(), None).to_dict(orient="records")
+    return score
+
+
+class _ScoringHandler(tornado.web.RequestHandler):
+
+    def initialize(self, batcher: MicroBatcher, metrics: Metrics) -> None:
+        self.batcher = batcher
+        self.metrics = metrics
+
+    def _load_body(self):
+        try:
+            return json.loads(self.request.body)
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="Invalid JSON")
+
+    def _send(self, payload) -> None:
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(payload, allow_nan=False))
+
+
+class ScoreHandler(_ScoringHandler):
+
+    async def post(self) -> None:
+        start = time.perf_counter()
+        row = self._load_body()
+        error = row_error(row)
+        if error:
+            raise tornado.web.HTTPError(400, reason=error)
+        self._send(await self.batcher.submit(row))
+        self.metrics.observe("/score", time.perf_counter() - start)
+
+
+class BatchScoreHandler(_ScoringHandler):
+
+    async def post(self) -> None:
+        start = time.perf_counter()
+        rows = self._load_body()
+        if not isinstance(rows, list):
+            raise tornado.web.HTTPError(400, reason="Expected a JSON array")
+        for position, row in enumerate(rows):
+            error = row_error(row)
+            if error:
+                raise tornado.web.HTTPError(400, reason=f"Row {position}: {error}")
+        results = []
+        if rows:
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(None, self.batcher.score, rows)
+            self.metrics.batch_sizes.append(len(rows))
+        self._send(results)
+        self.metrics.observe("/score/batch", time.perf_counter() - start)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+
+    def initialize(self, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    def get(self) -> None:
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(self.metrics.report()))
+
+
+class PrometheusHandler(tornado.web.RequestHandler):
+
+    def get(self) -> None:
+        self.set_header("Content-Type", "text/plain; version=0.0.4")
+        self.finish(tracer.to_prometheus())
+
+
+def make_app(score: Callable[[List[dict]], List[dict]],
+             max_batch: int = 256,
+             max_wait_ms: float = 5) -> tornado.web.Application:
+    """
+    Build the scoring application.
+
+    :param score: Blocking function scoring a list of rows, see :func:`make_scorer`.
+    :type score: Callable[[List[dict]], List[dict]]
+    :param max_batch: Maximum rows per micro-batch, defaults to 256
+    :type max_batch: int, optional
+    :param max_wait_ms: Micro-batch latency window, defaults to 5
+    :type max_wait_ms: float, optional
+    :return: Tornado application.
+    :rtype: tornado.web.Application
+    """
+    metrics = Metrics()
+    batcher = MicroBatcher(score, max_batch=max_batch, max_wait_ms=max_wait_ms, metrics=metrics)
+    handler_args = {"batcher": batcher, "metrics": metrics}
+    app = tornado.web.Application([
+        (r"/score", ScoreHandler, handler_args),
+        (r"/score/batch", BatchScoreHandler, handler_args),
+        (r"/metrics", MetricsHandler, {"metrics": metrics}),
+        (r"/metrics/prometheus", PrometheusHandler),
+    ])
+    app.batcher = batcher
+    app.metrics = metrics
+    return app
+
+
+async def serve(args: argparse.Namespace) -> None:
+    pipeline = load_model(args.model)
+    channel_store = load_channel_store(args.channels, args.channel_store)
+    api_key = os.environ.get(TELEMETRIO_KEY_ENV)
+    if api_key:
+        refresher = ChannelStatsRefresher(channel_store,
+                                          AsyncTelemetrio(api_key, rate=args.telemetrio_rate),
+                                          interval=args.channel_refresh)
+        refresher.start()
+    score = make_scorer(pipeline, channel_store,
+                        data_paths=dict(DATA_PATHS, user=args.users),
+                        ledger=ScoringLedger(args.ledger, ttl=args.ledger_ttl * 3600)
+                        if args.ledger else None,
+                        pwned_backend=args.pwned_backend,
+                        pwned_index=args.pwned_index,
+                        plan=build_plan(pipeline, args.extras))
+    app = make_app(score, args.max_batch, args.max_wait_ms)
+    app.listen(args.port, args.address)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Credential risk scoring service")
+    parser.add_argument("--address", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", type=Path, default=MODEL_DIR,
+                        help="Model artifact directory or pickled pipeline")
+    parser.add_argument("--channels", type=Path, default=SAMPLES_DIR / "channels.json")
+    parser.add_argument("--users", type=Path, default=DATA_PATHS['user'],
+                        help="User directory: JSON database or prebuilt user index")
+    parser.add_argument("--channel-store", type=Path,
+                        help="Persistent channel statistics store, seeded from --channels")
+    parser.add_argument("--channel-refresh", type=float, default=60,
+                        help=f"Seconds between refreshes of stale channels from Telemetr.io "
+                             f"(only with ${TELEMETRIO_KEY_ENV})")
+    parser.add_argument("--telemetrio-rate", type=float, default=5,
+                        help="Maximum Telemetr.io requests per second")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--pwned-backend", default="remote",
+                        choices=["remote", "local", "local-then-remote"])
+    parser.add_argument("--pwned-index", help="Local Pwned Passwords index")
+    parser.add_argument("--ledger", type=Path, help="Scoring ledger of already scored tuples")
+    parser.add_argument("--ledger-ttl", type=float, default=LEDGER_TTL / 3600,
+                        help="Hours a ledger score is reused before scoring the tuple again")
+    parser.add_argument("--extras", nargs="*", default=[],
+                        help="Enriched columns to compute although the model does not use them")
+    parser.add_argument("--trace", action="store_true",
+                        help="Record per-stage timings for /metrics/prometheus")
+    args = parser.parse_args()
+    if args.trace:
+        tracer.enable()
+    asyncio.run(serve(args))
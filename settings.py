@@ -3,3 +3,5 @@ from pathlib import Path
 BASE_DIR = Path(__file__).absolute().parent
 SAMPLES_DIR = BASE_DIR / "samples"
 DATA_DIR = BASE_DIR / "data"
+CACHE_DIR = BASE_DIR / ".cache"
+MODEL_DIR = BASE_DIR / "model"
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Los modulos del proyecto estan en la raiz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
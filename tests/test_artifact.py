@@ -0,0 +1,38 @@
+import warnings
+import numpy as np
+import pytest
+from artifact import CompactModel, export_artifact
+from dataset import load_labeled
+from inference import FusedModel
+from settings import DATA_DIR
+from training import approximate_kernel_ridge, build_pipeline
+
+
+@pytest.fixture(scope="module")
+def labeled():
+    X, y = load_labeled(DATA_DIR / "train.json")
+    return X.head(300), y.head(300)
+
+
+@pytest.mark.parametrize("kernel", ["rbf", "poly", "linear"])
+def test_nystroem_export_matches_pipeline(tmp_path, labeled, kernel):
+    X, y = labeled
+    pipeline = build_pipeline(approximate_kernel_ridge(40, kernel, alpha=0.1))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pipeline.fit(X, y)
+    export_artifact(pipeline, tmp_path)
+    expected = pipeline.predict(X)
+    np.testing.assert_allclose(CompactModel(tmp_path).predict(X), expected, atol=1e-9)
+    np.testing.assert_allclose(FusedModel(tmp_path).predict(X), expected, atol=1e-9)
+
+
+def test_random_features_are_rejected(tmp_path, labeled):
+    X, y = labeled
+    pipeline = build_pipeline(approximate_kernel_ridge(40, method="rff"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pipeline.fit(X, y)
+    with pytest.raises(ValueError, match="random Fourier"):
+        export_artifact(pipeline, tmp_path)
+    assert not (tmp_path / "manifest.json").exists()
@@ -0,0 +1,53 @@
+from decimal import Decimal
+import hashlib
+import sqlite3
+import pandas as pd
+from feature_extraction.cache import FeatureCache
+from feature_extraction.password import get_passwords
+
+
+def test_set_many_round_trip(tmp_path):
+    cache = FeatureCache(tmp_path / "features.sqlite", salt=b"salt")
+    features = {"password_strength": 1, "cracking_time": Decimal("1.5")}
+    assert cache.set_many([("a", features), ("b", features)]) == 2
+    assert cache.set_pwned_many([("a", 3), ("b", 0)]) == 2
+
+    reopened = FeatureCache(tmp_path / "features.sqlite", salt=b"salt")
+    assert reopened.get("a") == dict(features, md5=hashlib.md5(b"a").hexdigest(),
+                                     sha256=hashlib.sha256(b"a").hexdigest(),
+                                     sha512=hashlib.sha512(b"a").hexdigest(),
+                                     sha1=hashlib.sha1(b"a").hexdigest())
+    assert [reopened.get_pwned("a"), reopened.get_pwned("b")] == [3, 0]
+    assert reopened.stats["disk_hits"] == 1
+
+
+def test_unsalted_digests_are_not_stored(tmp_path):
+    path = tmp_path / "features.sqlite"
+    passwords = pd.Series(["123456", "hunter2", "contraseña"])
+    cache = FeatureCache(path, salt=b"salt")
+    computed = get_passwords(passwords, {}, cache=cache,
+                             stages={"hashes", "strength", "entropy"})
+    cache.close()
+
+    stored = [value for (value,) in sqlite3.connect(path).execute("SELECT value FROM features")]
+    assert len(stored) == 3
+    for password in passwords:
+        encoded = password.encode()
+        for algorithm in ("md5", "sha1", "sha256", "sha512"):
+            assert not any(hashlib.new(algorithm, encoded).hexdigest() in value
+                           for value in stored)
+
+    # Los hashes se recalculan al leer: el resultado no cambia
+    reopened = FeatureCache(path, salt=b"salt")
+    cached = get_passwords(passwords, {}, cache=reopened, stages={"hashes", "strength", "entropy"})
+    assert reopened.stats["disk_hits"] == 3
+    pd.testing.assert_frame_equal(cached, computed)
+
+
+def test_entries_with_digests_are_purged(tmp_path):
+    path = tmp_path / "features.sqlite"
+    FeatureCache(path, salt=b"salt").close()
+    with sqlite3.connect(path) as db:
+        db.execute("INSERT INTO features VALUES ('k', ?, 0)", ('{"md5": "e10adc39"}',))
+    FeatureCache(path, salt=b"salt").close()
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM features").fetchone() == (0,)
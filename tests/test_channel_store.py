@@ -0,0 +1,62 @@
+import asyncio
+from benchmarks.telemetrio_stub import TelemetrioStandIn
+from feature_extraction.channel import AsyncTelemetrio
+from feature_extraction.channel_store import DEFAULT_TTL, RETRY_BACKOFF, ChannelStatsRefresher, \
+    ChannelStatsStore
+
+CHANNELS = [f"channel{i}" for i in range(6)]
+
+
+def seeded_store(tmp_path=None):
+    path = tmp_path / "channels.sqlite" if tmp_path is not None else None
+    return ChannelStatsStore.from_records([{"CHANNEL_NAME": name, "Subscribers": 0}
+                                           for name in CHANNELS], path=path)
+
+
+def test_refresh_against_stand_in(tmp_path):
+    store = seeded_store(tmp_path)
+    with TelemetrioStandIn(error_rate=0.3, seed=1) as stand_in:
+        async def refresh():
+            async with AsyncTelemetrio("key", base_url=stand_in.url, retries=10,
+                                       backoff_factor=0) as client:
+                return await store.refresh(client)
+        counts = asyncio.run(refresh())
+    assert counts == {"refreshed": len(CHANNELS), "failed": 0}
+    assert store.stale() == []
+    assert store.get("channel0")["Subscribers"] == stand_in.stats("channel0")["participants_count"]
+
+    reopened = ChannelStatsStore(tmp_path / "channels.sqlite")
+    assert reopened.get("channel0") == store.get("channel0")
+
+
+def test_failed_channels_back_off():
+    store = seeded_store()
+    now = DEFAULT_TTL
+    store.mark_failed("channel0", attempted=now)
+    assert "channel0" not in store.stale(now=now + RETRY_BACKOFF - 1)
+    # Tras la espera vuelve a estar pendiente, despues de los no intentados
+    assert store.stale(now=now + RETRY_BACKOFF)[-1] == "channel0"
+    store.mark_failed("channel0", attempted=now)
+    assert "channel0" not in store.stale(now=now + RETRY_BACKOFF)
+    store.update("channel0", {"Subscribers": 1}, fetched=0)
+    assert store.stale(now=now)[0] == "channel0"
+
+
+def test_refresher_does_not_starve_channels():
+    store = seeded_store()
+    with TelemetrioStandIn(failing=CHANNELS[:2]) as stand_in:
+        async def run():
+            async with AsyncTelemetrio("key", base_url=stand_in.url, backoff_factor=0) as client:
+                refresher = ChannelStatsRefresher(store, client, interval=0.01, batch_size=2)
+                refresher.start()
+                for _ in range(200):
+                    await asyncio.sleep(0.01)
+                    if store.stale() == []:
+                        break
+                await refresher.stop()
+        asyncio.run(run())
+    # Los dos canales que fallan esperan su backoff y el resto se refresca
+    assert store.stale() == []
+    assert [store.get(name)["Subscribers"] for name in CHANNELS[:2]] == [0, 0]
+    assert all(store.get(name)["Subscribers"] > 0 for name in CHANNELS[2:])
+    assert stand_in.requests == len(CHANNELS)
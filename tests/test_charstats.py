@@ -0,0 +1,25 @@
+import random
+import numpy as np
+from feature_extraction.charstats import character_statistics, password_entropies
+from feature_extraction.password import shannon_entropy
+
+
+def test_entropy_is_bitwise_equal_to_shannon_entropy():
+    rng = random.Random(0)
+    alphabet = "aAbB0123!? ñé€漢🔑\x00\t"
+    passwords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+                 for _ in range(5000)]
+    passwords += ["", "\x00", "a\x00b\x00", "contraseña", "漢字漢字🔑",
+                  "a" * 10000, "ab" * 5000, "a" * 9999 + "b", "x" * 65 + "y" * 3 + "z"]
+    expected = [float(shannon_entropy(password)) for password in passwords]
+    # block_rows pequeño: varios bloques de longitudes distintas
+    for block_rows in (64, 65536):
+        assert password_entropies(passwords, block_rows).tolist() == expected
+
+
+def test_character_classes():
+    stats = character_statistics(["aB3$ñ", ""]).iloc[0]
+    assert stats[["password_length", "password_unique_chars", "password_lowercase",
+                  "password_uppercase", "password_digits", "password_symbols",
+                  "password_non_ascii"]].tolist() == [5, 5, 1, 1, 1, 1, 1]
+    assert np.isfinite(stats["password_entropy"])
@@ -0,0 +1,31 @@
+import pandas as pd
+from chunk_io import ChunkWriter, read_chunks
+
+
+def test_ndjson_has_no_blank_lines(tmp_path):
+    output = tmp_path / "out.ndjson"
+    with ChunkWriter(output, "ndjson") as writer:
+        writer.write(pd.DataFrame({"a": [1, 2]}))
+        writer.write(pd.DataFrame({"a": [3]}))
+    assert output.read_text(encoding="utf-8") == '{"a":1}\n{"a":2}\n{"a":3}\n'
+
+
+def test_null_key_columns_are_missing_in_both_formats(tmp_path):
+    ndjson = tmp_path / "in.ndjson"
+    ndjson.write_text('{"username":"a","password":null,"channel":"NA","file":"f"}\n'
+                      '{"username":"b","password":123456,"channel":"c","file":null}\n',
+                      encoding="utf-8")
+    csv = tmp_path / "in.csv"
+    csv.write_text("username,password,channel,file\na,,NA,f\nb,123456,c,\n", encoding="utf-8")
+    from_ndjson = pd.concat(read_chunks(ndjson))
+    from_csv = pd.concat(read_chunks(csv))
+    assert from_ndjson["password"].tolist()[1] == "123456"
+    assert pd.isna(from_ndjson["password"][0]) and pd.isna(from_ndjson["file"][1])
+    assert from_ndjson["channel"][0] == "NA"
+    pd.testing.assert_frame_equal(from_ndjson, from_csv)
+
+    # Lo escrito por ChunkWriter se vuelve a leer como faltante
+    output = tmp_path / "out.ndjson"
+    with ChunkWriter(output, "ndjson") as writer:
+        writer.write(from_csv)
+    pd.testing.assert_frame_equal(pd.concat(read_chunks(output)), from_csv)
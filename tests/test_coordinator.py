@@ -0,0 +1,72 @@
+import json
+import pandas as pd
+import pytest
+from coordinator import FileQueue, _write_json, run
+
+
+@pytest.fixture
+def dump(tmp_path):
+    rows = [{"username": f"user{i}@example.com", "password": f"pass{i}", "channel": "c",
+             "file": "f.txt"} for i in range(30)]
+    path = tmp_path / "dump.ndjson"
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    return path
+
+
+def test_reports_of_other_jobs_are_dropped(tmp_path):
+    queue = FileQueue(tmp_path / "work")
+    job = queue.create({})
+    _write_json(queue.path("done", "shard-00000"), {"shard": 0, "job": "old"})
+    _write_json(queue.path("done", "shard-00001"), {"shard": 1, "job": job["id"]})
+    assert list(queue.reports("done", job["id"])) == ["shard-00001"]
+    assert queue.names("done") == ["shard-00001"]
+
+
+def test_reused_work_dir(tmp_path, dump):
+    work_dir = tmp_path / "work"
+    first = run(dump, tmp_path / "first.ndjson", n_shards=3, workers=1, work_dir=work_dir,
+                cache_dir=None)
+    with pytest.raises(FileExistsError):
+        run(dump, tmp_path / "second.ndjson", n_shards=2, workers=1, work_dir=work_dir,
+            cache_dir=None)
+
+    # Un STOP del trabajo anterior no debe parar el nuevo
+    (work_dir / "STOP").touch()
+    second = run(dump, tmp_path / "second.ndjson", n_shards=2, workers=1, work_dir=work_dir,
+                 cache_dir=None, reset=True)
+    assert second["job"] != first["job"]
+    assert second["rows"] == 30
+    assert sorted(path.name for path in (work_dir / "results").iterdir()) == \
+        [f"shard-0000{shard}.{second['job']}.ndjson" for shard in range(2)]
+    first_scores = pd.read_json(tmp_path / "first.ndjson", lines=True)
+    pd.testing.assert_frame_equal(pd.read_json(tmp_path / "second.ndjson", lines=True),
+                                  first_scores)
+
+
+def test_missing_passwords_match_single_process(tmp_path):
+    from chunk_io import ChunkWriter, read_chunks
+    from feature_extraction.channel_store import load_channel_store
+    from feature_extraction.plan import build_plan
+    from score import DATA_PATHS, score_chunks
+    from scoring import load_model
+    from settings import MODEL_DIR, SAMPLES_DIR
+
+    dump = tmp_path / "dump.csv"
+    lines = ["username,password,channel,file"]
+    lines += [f"user{i}@example.com,{'' if i % 5 == 0 else f'pass{i}'},c,f.txt"
+              for i in range(20)]
+    dump.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    run(dump, tmp_path / "sharded.ndjson", n_shards=3, workers=1,
+        work_dir=tmp_path / "work", cache_dir=None)
+    model = load_model(MODEL_DIR)
+    with ChunkWriter(tmp_path / "single.ndjson") as writer:
+        for scored in score_chunks(read_chunks(dump), model,
+                                   load_channel_store(SAMPLES_DIR / "channels.json"),
+                                   data_paths=DATA_PATHS, plan=build_plan(model, [])):
+            writer.write(scored)
+
+    sharded = pd.read_json(tmp_path / "sharded.ndjson", lines=True, dtype=False)
+    single = pd.read_json(tmp_path / "single.ndjson", lines=True, dtype=False)
+    assert sharded["password"].isna().sum() == 4
+    pd.testing.assert_frame_equal(sharded, single)
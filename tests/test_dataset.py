@@ -0,0 +1,22 @@
+import json
+import pandas as pd
+from artifact import CompactModel
+from dataset import CATEGORICAL_FEATURES, compact_frame, expand_frame, model_categories
+from scoring import load_pipeline
+from settings import BASE_DIR, MODEL_DIR
+
+
+def test_categories_come_from_the_model():
+    manifest = json.loads((MODEL_DIR / "manifest.json").read_text(encoding="utf-8"))
+    expected = dict(zip(manifest["categorical_features"], manifest["categories"]))
+    assert model_categories() == expected
+    assert model_categories(CompactModel(MODEL_DIR)) == expected
+    assert model_categories(load_pipeline(BASE_DIR / "pipeline.pkl")) == expected
+
+
+def test_compact_frame_uses_given_categories():
+    df = pd.DataFrame({"chat_type": ["Group", "Forum", None]})
+    compact = compact_frame(df, {"chat_type": ["Group"]})
+    assert list(compact["chat_type"].cat.categories) == ["Group", "<unknown>", "Forum"]
+    assert expand_frame(compact)["chat_type"].tolist() == ["Group", "Forum", None]
+    assert set(model_categories()) == set(CATEGORICAL_FEATURES)
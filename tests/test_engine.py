@@ -0,0 +1,18 @@
+import random
+import pandas as pd
+from feature_extraction.engine import extract_passwords
+
+
+def test_workers_match_sequential():
+    rng = random.Random(0)
+    alphabet = "abcXYZ019!@ ñçé€漢字🔑\x00"
+    passwords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 16)))
+                 for _ in range(300)]
+    passwords += ["", "", "contraseña", "password2024", "密码"] + passwords[:50]
+    stages = {"hashes", "strength", "entropy"}
+    sequential = extract_passwords(passwords, {"password2024": "default password"},
+                                   workers=1, chunksize=32, stages=stages)
+    parallel = extract_passwords(passwords, {"password2024": "default password"},
+                                 workers=2, chunksize=32, stages=stages)
+    assert len(parallel) == len(passwords)
+    pd.testing.assert_frame_equal(parallel, sequential, check_exact=True)
@@ -0,0 +1,27 @@
+import numpy as np
+from feature_extraction.file import CountryMatcher, get_country_file, get_country_files, \
+    get_matcher
+
+FILES_DATA = {"Spain": ["spain", "es"], "Europe": ["eu"]}
+
+
+def test_missing_file_name_is_nan():
+    countries = get_country_files(["a.txt", "spain.txt", None, np.nan], FILES_DATA)
+    assert countries[:2].tolist() == ["Other", "Spain"]
+    assert countries[2:].isna().all()
+
+
+def test_matches_scalar_lookup():
+    files = ["EU.txt", "combo_es.txt", "list.txt", "EU.txt"]
+    assert get_country_files(files, FILES_DATA).tolist() == ["Europe", "Spain", "Other", "Europe"]
+
+
+def test_matcher_is_compiled_once_per_database():
+    files_data = dict(FILES_DATA)
+    matcher = get_matcher(files_data)
+    assert get_matcher(files_data) is matcher
+    assert get_matcher(matcher) is matcher
+    assert get_matcher(dict(FILES_DATA)) is not matcher
+    compiled = CountryMatcher(files_data)
+    assert [get_country_file(file, compiled) for file in ["EU.txt", "x"]] == ["Europe", "Other"]
+    assert get_country_file("combo_es.txt", files_data) == "Spain"
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+from feature_extraction.password import PASSWORD_COLUMNS, get_passwords
+
+OFFLINE = {"hashes", "strength", "entropy"}
+
+
+def test_missing_password_gets_no_features():
+    df = get_passwords(pd.Series(["zz", "Password2024!", None]), {}, stages=OFFLINE)
+    assert df.loc[2].isna().all()
+    assert df.loc[1, "password_update"] == "actual"
+    alone = get_passwords(pd.Series(["zz", "Password2024!"]), {}, stages=OFFLINE)
+    pd.testing.assert_frame_equal(df.loc[:1, PASSWORD_COLUMNS].astype(object),
+                                  alone.astype(object))
+
+
+def test_complete_column_keeps_dtypes():
+    df = get_passwords(pd.Series(["zz", "zz"]), {}, stages=OFFLINE)
+    assert df["password_strength"].dtype == np.int64
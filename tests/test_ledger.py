@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from chunk_io import KEY_COLUMNS
+from feature_extraction.plan import FeaturePlan
+from ledger import ScoringLedger, pwned_version, scoring_context
+
+
+def credentials(password):
+    row = dict.fromkeys(KEY_COLUMNS, "x")
+    row["password"] = password
+    return pd.DataFrame([row])
+
+
+def test_missing_value_does_not_collide_with_nan_string(tmp_path):
+    ledger = ScoringLedger(tmp_path / "ledger.sqlite", salt=b"salt")
+    missing = ledger.fingerprints(credentials(np.nan), "ctx")
+    literal = ledger.fingerprints(credentials("nan"), "ctx")
+    assert missing[0] != literal[0]
+
+
+def test_expired_scores_are_rescored(tmp_path):
+    calls = []
+
+    def score(df):
+        calls.append(len(df))
+        return df.assign(risk=10, severity="Low")
+
+    ledger = ScoringLedger(tmp_path / "ledger.sqlite", salt=b"salt")
+    ledger.score(credentials("hunter2"), "ctx", score)
+    ledger.score(credentials("hunter2"), "ctx", score)
+    assert calls == [1]
+
+    ledger.ttl = -1
+    ledger.score(credentials("hunter2"), "ctx", score)
+    assert calls == [1, 1]
+
+
+def test_context_tracks_pwned_backend(tmp_path):
+    index = tmp_path / "pwned.idx"
+    index.write_bytes(b"v1")
+    local = pwned_version("local", index)
+    assert pwned_version("remote") == "remote"
+    assert local.startswith("local-")
+    index.write_bytes(b"v2-longer")
+    assert pwned_version("local", index) != local
+
+
+def test_context_ignores_backend_when_hibp_is_skipped(monkeypatch):
+    monkeypatch.setattr("ledger.model_version", lambda model: "model")
+    monkeypatch.setattr("ledger.get_reference", lambda paths: type("R", (), {"version": "ref"}))
+    plan = FeaturePlan(required=("password_strength",), extras=(), stages=frozenset({"strength"}))
+    assert scoring_context(None, {}, plan=plan) == "model:ref:hibp-unused"
+    assert scoring_context(None, {}, pwned_backend="remote") == "model:ref:hibp-remote"
@@ -0,0 +1,70 @@
+import socket
+import numpy as np
+import pytest
+from benchmarks.hibp_stub import HibpStandIn
+from feature_extraction import password
+from feature_extraction.password import build_session, check_pwned, check_pwned_bulk, \
+    sha1_prefix_suffix
+
+
+@pytest.fixture
+def session():
+    # Sin reintentos para que los fallos lleguen enseguida
+    return build_session(pool_size=2, retries=0)
+
+
+def closed_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/range/"
+
+
+def test_bulk_counts_from_stand_in(session):
+    with HibpStandIn(["hunter2"], padding=10) as stand_in:
+        leaks = check_pwned_bulk(["hunter2", "not-leaked-x9", "hunter2"], session=session,
+                                 base_url=stand_in.url)
+    assert leaks.dtype == np.int64
+    assert leaks[0] == leaks[2] > 0
+    assert leaks[1] == 0
+
+
+def test_bulk_requests_each_prefix_once(session):
+    # Contraseñas distintas con el mismo prefijo SHA-1
+    by_prefix = {}
+    for i in range(5000):
+        by_prefix.setdefault(sha1_prefix_suffix(f"pw{i}")[0], []).append(f"pw{i}")
+    shared = next(group for group in by_prefix.values() if len(group) > 1)
+    passwords = shared + shared + [f"pw{i}" for i in range(40)] + ["hunter2"] * 3
+    with HibpStandIn(["hunter2", shared[0]], padding=10) as stand_in:
+        leaks = check_pwned_bulk(passwords, session=session, base_url=stand_in.url)
+        requests = stand_in.requests
+    assert requests == len({sha1_prefix_suffix(password)[0] for password in set(passwords)})
+    assert leaks[0] > 0 and leaks[1] == 0
+    assert leaks.tolist()[:len(shared)] == leaks.tolist()[len(shared):2 * len(shared)]
+
+
+def test_bulk_failed_range_is_nan(session):
+    failing = sha1_prefix_suffix("hunter2")[0]
+    with HibpStandIn(["hunter2", "letmein"], padding=10, failing=[failing]) as stand_in:
+        leaks = check_pwned_bulk(["hunter2", "letmein"], session=session, base_url=stand_in.url)
+    assert np.isnan(leaks[0])
+    assert leaks[1] > 0
+
+
+def test_bulk_connection_error_does_not_abort(session):
+    leaks = check_pwned_bulk(["hunter2", "letmein"], session=session, base_url=closed_url())
+    assert leaks.isna().all()
+
+
+def test_check_pwned_failure_is_none(monkeypatch):
+    monkeypatch.setattr(password, "HIBP_RANGE_URL", closed_url())
+    monkeypatch.setattr(password, "_session", build_session(retries=0))
+    assert check_pwned("hunter2") == [("hunter2", None)]
+
+
+def test_check_pwned_from_stand_in(monkeypatch):
+    with HibpStandIn(["hunter2"], padding=10) as stand_in:
+        monkeypatch.setattr(password, "HIBP_RANGE_URL", stand_in.url)
+        (_, count), = check_pwned("hunter2")
+    assert count > 0
@@ -0,0 +1,40 @@
+import hashlib
+import pytest
+from feature_extraction.pwned_index import PwnedIndex, build_index
+
+
+def range_line(password: str, count: int) -> str:
+    digest = hashlib.sha1(password.encode()).hexdigest().upper()
+    return digest[:5], f"{digest[5:]}:{count}"
+
+
+@pytest.fixture
+def index(tmp_path):
+    ranges = {}
+    for password, count in [("25", 42), ("hunter2", 7)]:
+        prefix, line = range_line(password, count)
+        ranges.setdefault(prefix, []).append(line)
+    sources = tmp_path / "ranges"
+    sources.mkdir()
+    for prefix, lines in ranges.items():
+        (sources / prefix).write_text("\n".join(sorted(lines)) + "\n")
+    build_index([sources], tmp_path / "pwned.idx")
+    return PwnedIndex(tmp_path / "pwned.idx")
+
+
+def test_digest_ending_in_nul(index):
+    # El SHA-1 de '25' termina en 0x00
+    assert hashlib.sha1(b"25").digest().endswith(b"\0")
+    assert index.lookup("25") == 42
+    assert index.lookup_many(["25"]).tolist() == [42]
+
+
+def test_lookup_matches_lookup_many(index):
+    passwords = ["25", "hunter2"]
+    assert [index.lookup(password) for password in passwords] == \
+        index.lookup_many(passwords).tolist() == [42, 7]
+
+
+def test_uncovered_range_is_none(index):
+    assert index.lookup("not-in-any-range") is None
+    assert index.lookup_many(["not-in-any-range"]).isna().all()
@@ -0,0 +1,39 @@
+import json
+import os
+from reference import ReferenceRegistry
+
+
+def write(path, data, mtime):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_missing_file_keeps_the_current_snapshot(tmp_path, caplog):
+    files, passwords = tmp_path / "file.json", tmp_path / "password.json"
+    write(files, {"Spain": ["es"]}, 10**18)
+    write(passwords, {"default password": ["admin"]}, 10**18)
+    registry = ReferenceRegistry({"file": files, "password": passwords}, check_interval=0)
+    first = registry.get()
+    assert first.files_data == {"Spain": ["es"]}
+
+    # Fichero ausente a mitad de un despliegue
+    files.unlink()
+    assert registry.get() is first
+    assert "se mantiene la version anterior" in caplog.text
+
+    write(files, {"Spain": ["es", "spain"]}, 2 * 10**18)
+    second = registry.get()
+    assert second.files_data == {"Spain": ["es", "spain"]}
+    assert second.password_types is first.password_types
+    assert second.version != first.version
+
+
+def test_half_written_file_is_retried(tmp_path):
+    files = tmp_path / "file.json"
+    write(files, {"Spain": ["es"]}, 10**18)
+    registry = ReferenceRegistry({"file": files}, check_interval=0)
+    first = registry.get()
+    files.write_text('{"Spain": [', encoding="utf-8")
+    assert registry.get() is first
+    write(files, {"Europe": ["eu"]}, 3 * 10**18)
+    assert registry.get().files_data == {"Europe": ["eu"]}
@@ -0,0 +1,61 @@
+import json
+import math
+import pandas as pd
+from tornado.testing import AsyncHTTPTestCase, gen_test
+from tornado.httpclient import AsyncHTTPClient
+from tornado import gen
+from service import make_app, make_scorer
+from scoring import load_model
+from settings import DATA_DIR, MODEL_DIR
+
+ROW = {"username": "a@b.c", "password": "x", "channel": "c", "file": "f.txt"}
+
+
+def fake_score(rows):
+    if any(row["password"] == "boom" for row in rows):
+        raise ValueError("boom")
+    return [{"username": row["username"], "risk": 10} for row in rows]
+
+
+class ServiceTest(AsyncHTTPTestCase):
+
+    def get_app(self):
+        return make_app(fake_score, max_batch=16, max_wait_ms=50)
+
+    def post(self, path, payload):
+        return self.fetch(path, method="POST", body=json.dumps(payload), raise_error=False)
+
+    def test_missing_key_is_400(self):
+        row = {key: value for key, value in ROW.items() if key != "channel"}
+        response = self.post("/score", row)
+        assert response.code == 400 and "channel" in response.reason
+
+    def test_non_string_key_is_400(self):
+        assert self.post("/score", dict(ROW, file=3)).code == 400
+
+    def test_batch_rejects_bad_row(self):
+        response = self.post("/score/batch", [ROW, {"username": "x"}])
+        assert response.code == 400 and response.reason.startswith("Row 1")
+
+    @gen_test
+    async def test_failure_is_isolated_per_request(self):
+        client = AsyncHTTPClient()
+        url = self.get_url("/score")
+        good, bad = await gen.multi([
+            client.fetch(url, method="POST", body=json.dumps(ROW), raise_error=False),
+            client.fetch(url, method="POST", body=json.dumps(dict(ROW, password="boom")),
+                         raise_error=False)])
+        assert good.code == 200 and json.loads(good.body)["risk"] == 10
+        assert bad.code == 500
+        assert self._app.metrics.batch_sizes[0] == 2
+
+
+def test_scorer_returns_json_safe_rows():
+    model = load_model(MODEL_DIR)
+    rows = pd.read_json(DATA_DIR / "test.json").head(3).to_dict(orient="records")
+    rows[0]["file"] = None
+    results = make_scorer(model, pd.DataFrame())(rows)
+    json.dumps(results, allow_nan=False)
+    assert results[0]["file"] is None
+    assert all(isinstance(result["risk"], int) and not math.isnan(result["risk"])
+               for result in results)
@@ -0,0 +1,76 @@
+import warnings
+import numpy as np
+import pytest
+from artifact import CompactModel
+from dataset import load_labeled
+from settings import DATA_DIR
+from training import SEARCH_SPACES, approximate_kernel_ridge, build_pipeline, save_model
+
+
+@pytest.fixture(scope="module")
+def labeled():
+    X, y = load_labeled(DATA_DIR / "train.json")
+    return X.head(200), y.head(200)
+
+
+def fitted(labeled, method):
+    X, y = labeled
+    pipeline = build_pipeline(approximate_kernel_ridge(30, alpha=0.1, method=method))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        pipeline.fit(X, y)
+    return pipeline
+
+
+def test_search_space_kernels_are_exportable():
+    from artifact import KERNELS
+    assert set(SEARCH_SPACES['kernel_ridge'][1]['kernel']) <= set(KERNELS)
+
+
+def test_save_model_replaces_both(tmp_path, labeled):
+    output, artifact_dir = tmp_path / "pipeline.pkl", tmp_path / "model"
+    artifact_dir.mkdir()
+    (artifact_dir / "stale.npy").write_bytes(b"old")
+    pipeline = fitted(labeled, "nystroem")
+    save_model(pipeline, labeled[0], output, artifact_dir)
+    assert output.exists()
+    assert not (artifact_dir / "stale.npy").exists()
+    model = CompactModel(artifact_dir)
+    np.testing.assert_allclose(model.predict(labeled[0]), pipeline.predict(labeled[0]), atol=1e-9)
+    assert artifact_dir.is_symlink()
+    assert sorted(path.name for path in tmp_path.iterdir()) == \
+        sorted([".model.legacy", f".model.{model.model_id}", "model", "pipeline.pkl"])
+
+
+def test_save_model_swaps_the_symlink(tmp_path, labeled):
+    output, artifact_dir = tmp_path / "pipeline.pkl", tmp_path / "model"
+    ids = []
+    for alpha in (0.1, 1.0, 10.0):
+        X, y = labeled
+        pipeline = build_pipeline(approximate_kernel_ridge(30, alpha=alpha, method="nystroem"))
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            pipeline.fit(X, y)
+        save_model(pipeline, X, output, artifact_dir)
+        ids.append(CompactModel(artifact_dir).model_id)
+    # model/ siempre existe; se conservan la version publicada y la anterior
+    assert len(set(ids)) == 3
+    assert artifact_dir.resolve().name == f".model.{ids[-1]}"
+    assert sorted(path.name for path in tmp_path.iterdir()) == \
+        sorted([f".model.{ids[1]}", f".model.{ids[2]}", "model", "pipeline.pkl"])
+
+    # Volver a guardar el mismo modelo no toca el directorio en uso
+    save_model(pipeline, X, output, artifact_dir)
+    assert artifact_dir.resolve().name == f".model.{ids[-1]}"
+
+
+def test_failed_export_keeps_previous_model(tmp_path, labeled):
+    output, artifact_dir = tmp_path / "pipeline.pkl", tmp_path / "model"
+    save_model(fitted(labeled, "nystroem"), labeled[0], output, artifact_dir)
+    pickled, manifest = output.read_bytes(), (artifact_dir / "manifest.json").read_bytes()
+    with pytest.raises(ValueError):
+        save_model(fitted(labeled, "rff"), labeled[0], output, artifact_dir)
+    assert output.read_bytes() == pickled
+    assert (artifact_dir / "manifest.json").read_bytes() == manifest
+    assert sorted(path.name for path in tmp_path.iterdir()) == \
+        [artifact_dir.resolve().name, "model", "pipeline.pkl"]
@@ -0,0 +1,622 @@
+"""
+Model training utilities.
+
+``train`` replaces the model selection and pipeline notebooks. It runs a grid
+search over KernelRidge and ElasticNet with the notebook grids, refits the
+best candidate inside the scoring pipeline and writes pipeline.pkl and the
+compact artifact. Both are only replaced once the artifact is exported and
+reproduces the pipeline's predictions. The preprocessing (DropColumns, the ColumnTransformer and
+SelectKBest) does not depend on the hyperparameters. It is fitted once per
+fold, not once per fold and candidate. The KernelRidge kernel matrices are
+computed once per fold and kernel parameters (kernel, gamma, degree, coef0)
+and shared by every alpha. Folds and kernel groups run in parallel with
+joblib.
+
+Usage:
+    python training.py train --n-jobs -1
+    python training.py fidelity --n-components 25 50 100
+"""
+from contextlib import contextmanager
+from pathlib import Path
+import argparse
+import json
+import math
+import os
+import pickle
+import shutil
+import time
+from typing import Dict, List, Literal, Optional
+from joblib import Parallel, delayed
+import numpy as np
+import pandas as pd
+from scipy.stats import spearmanr
+from sklearn.base import clone
+from sklearn.compose import ColumnTransformer
+from sklearn.feature_selection import SelectKBest, f_regression
+from sklearn.impute import SimpleImputer
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.kernel_ridge import KernelRidge
+from sklearn.linear_model import ElasticNet, Ridge
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.metrics.pairwise import KERNEL_PARAMS, pairwise_kernels
+from sklearn.model_selection import KFold, ParameterGrid, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import MinMaxScaler, OneHotEncoder
+from dataset import (CATEGORICAL_FEATURES, DROP_COLUMNS, NUMERICAL_FEATURES, load_labeled,
+                     read_dataset)
+from pipeline_steps import DropColumns
+from scoring import cvss_score
+from settings import BASE_DIR, DATA_DIR, MODEL_DIR
+
+
+# Rejillas de model_selection.ipynb, sin el kernel sigmoid: el artefacto no lo soporta
+SEARCH_SPACES = {
+    'kernel_ridge': (KernelRidge(), {
+        'alpha': [0.0001, 0.001, 0.01, 0.1, 1],
+        'kernel': ['linear', 'poly', 'rbf'],
+        'degree': [2, 3, 4, 5],
+    }),
+    'elastic_net': (ElasticNet(), {
+        'alpha': [0.0001, 0.001, 0.01, 0.1, 1],
+        'l1_ratio': [0.15, 0.25, 0.5, 0.75, 0.85],
+        'max_iter': [1000, 2000, 3000, 4000, 5000],
+    }),
+}
+
+
+def build_preprocessor() -> ColumnTransformer:
+    """
+    Column transformer of the scoring pipeline: imputation and min-max
+    scaling of the numerical features, imputation and one-hot encoding of
+    the categorical ones.
+
+    :return: Unfitted column transformer.
+    :rtype: ColumnTransformer
+    """
+    numerical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('scaler', MinMaxScaler())
+    ])
+    categorical_transformer = Pipeline(steps=[
+        ('imputer', SimpleImputer(strategy='most_frequent')),
+        ('onehot', OneHotEncoder(handle_unknown='ignore', drop='if_binary'))
+    ])
+    return ColumnTransformer(
+        transformers=[
+            ('numerical', numerical_transformer, NUMERICAL_FEATURES),
+            ('categorical', categorical_transformer, CATEGORICAL_FEATURES)
+        ],
+        remainder='passthrough'
+    )
+
+
+def build_pipeline(model, k: int = 20) -> Pipeline:
+    """
+    Scoring pipeline with the same steps as pipeline.pkl around ``model``.
+
+    :param model: Regressor of the last step.
+    :type model: sklearn.base.RegressorMixin
+    :param k: Number of features kept by SelectKBest, defaults to 20
+    :type k: int, optional
+    :return: Unfitted pipeline.
+    :rtype: Pipeline
+    """
+    return Pipeline(steps=[
+        ('drop_columns', DropColumns(columns=DROP_COLUMNS)),
+        ('preprocessor', build_preprocessor()),
+        ('feature_selection', SelectKBest(f_regression, k=k)),
+        ('model', model)
+    ])
+
+
+class _RBFSampler(RBFSampler):
+    # gamma=None como KernelRidge: 1 / n_features
+
+    def fit(self, X, y=None):
+        if self.gamma is None:
+            self.gamma = 1.0 / X.shape[1]
+        return super().fit(X, y)
+
+
+def approximate_kernel_ridge(n_components: int = 100,
+                             kernel: str = "rbf",
+                             gamma: Optional[float] = None,
+                             alpha: float = 1.0,
+                             method: Literal["nystroem", "rff"] = "nystroem",
+                             random_state: int = 0) -> Pipeline:
+    """
+    Approximation of KernelRidge with an explicit feature map and a linear ridge.
+
+    KernelRidge keeps the whole training matrix and its ``predict`` evaluates
+    the kernel against every training sample. Here the kernel is replaced by
+    ``n_components`` Nyström components (any kernel) or random Fourier
+    features (rbf only), so fitting is linear in the training size and
+    predicting only depends on ``n_components``. Nyström models can be
+    exported with ``artifact.export_artifact``; random Fourier features cannot.
+
+    :param n_components: Dimension of the feature map, defaults to 100
+    :type n_components: int, optional
+    :param kernel: Kernel to approximate, defaults to "rbf"
+    :type kernel: str, optional
+    :param gamma: Kernel coefficient, defaults to None (1 / n_features, as KernelRidge)
+    :type gamma: float, optional
+    :param alpha: Regularization strength, defaults to 1.0
+    :type alpha: float, optional
+    :param method: "nystroem" or "rff", defaults to "nystroem"
+    :type method: Literal["nystroem", "rff"], optional
+    :param random_state: Seed of the feature map, defaults to 0
+    :type random_state: int, optional
+    :return: Unfitted regressor.
+    :rtype: Pipeline
+    """
+    if method == "nystroem":
+        feature_map = Nystroem(kernel=kernel, gamma=gamma, n_components=n_components,
+                               random_state=random_state)
+    elif method == "rff":
+        if kernel != "rbf":
+            raise ValueError("Random Fourier features solo aproximan el kernel rbf")
+        feature_map = _RBFSampler(gamma=gamma, n_components=n_components,
+                                  random_state=random_state)
+    else:
+        raise ValueError(f"Metodo desconocido: {method}")
+    # KernelRidge no ajusta termino independiente
+    return Pipeline(steps=[('feature_map', feature_map),
+                           ('ridge', Ridge(alpha=alpha, fit_intercept=False))])
+
+
+def _severity(predictions: np.ndarray) -> np.ndarray:
+    return np.array([cvss_score(x) for x in (predictions * 100).astype(int)])
+
+
+def fidelity_report(exact: Pipeline, approx: Pipeline, X: pd.DataFrame) -> dict:
+    """
+    Compare the predictions of an approximate pipeline with the exact one.
+
+    :param exact: Fitted pipeline ending in KernelRidge.
+    :type exact: Pipeline
+    :param approx: Fitted approximate pipeline.
+    :type approx: Pipeline
+    :param X: Credentials to predict.
+    :type X: pd.DataFrame
+    :return: MAE and rank correlation between predictions, share of credentials
+        with the same CVSS severity and prediction time of both pipelines.
+    :rtype: dict
+    """
+    timings = {}
+    predictions = {}
+    for name, pipeline in (("exact", exact), ("approx", approx)):
+        start = time.perf_counter()
+        predictions[name] = pipeline.predict(X)
+        timings[name] = time.perf_counter() - start
+    exact_pred, approx_pred = predictions["exact"], predictions["approx"]
+    return {
+        "rows": len(X),
+        "mae": float(np.abs(exact_pred - approx_pred).mean()),
+        "rank_correlation": float(spearmanr(exact_pred, approx_pred).statistic)
+        if len(X) > 1 else 1.0,
+        "severity_agreement": float((_severity(exact_pred) == _severity(approx_pred)).mean()),
+        "exact_predict_s": timings["exact"],
+        "approx_predict_s": timings["approx"],
+    }
+
+
+def model_size(pipeline: Pipeline) -> int:
+    """
+    Bytes of the fitted arrays kept by the last step of a pipeline.
+
+    :param pipeline: Fitted pipeline.
+    :type pipeline: Pipeline
+    :return: Size in bytes.
+    :rtype: int
+    """
+    model = pipeline.steps[-1][1]
+    estimators = [step for _, step in model.steps] if isinstance(model, Pipeline) else [model]
+    return sum(value.nbytes for estimator in estimators
+               for value in vars(estimator).values() if isinstance(value, np.ndarray))
+
+
+def run_fidelity(train_path: Path, test_path: Path, n_components: list,
+                 kernel: str, gamma: Optional[float], alpha: float, method: str) -> list:
+    X_train, y_train = load_labeled(train_path)
+    X_test = read_dataset(test_path)
+    exact = build_pipeline(KernelRidge(alpha=alpha, kernel=kernel, gamma=gamma))
+    exact.fit(X_train, y_train)
+    reports = []
+    for components in n_components:
+        approx = build_pipeline(approximate_kernel_ridge(components, kernel, gamma, alpha, method))
+        approx.fit(X_train, y_train)
+        for name, X in (("test", X_test), ("train", X_train)):
+            report = fidelity_report(exact, approx, X)
+            report.update(dataset=name, n_components=components, method=method,
+                          exact_bytes=model_size(exact), approx_bytes=model_size(approx))
+            reports.append(report)
+    return reports
+
+
+@contextmanager
+def _phase(timings: dict, name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def candidates(models: List[str], gammas: Optional[List[Optional[float]]] = None) -> List[dict]:
+    """
+    Candidates of the grid search.
+
+    :param models: Keys of SEARCH_SPACES.
+    :type models: List[str]
+    :param gammas: KernelRidge gammas to search, defaults to None (only the default gamma)
+    :type gammas: List[Optional[float]], optional
+    :raises ValueError: If a model is unknown.
+    :return: ``{"model": name, "params": dict, "estimator": unfitted estimator}`` per candidate.
+    :rtype: List[dict]
+    """
+    result = []
+    for name in models:
+        if name not in SEARCH_SPACES:
+            raise ValueError(f"Modelo desconocido: {name}")
+        estimator, grid = SEARCH_SPACES[name]
+        if gammas and isinstance(estimator, KernelRidge):
+            grid = dict(grid, gamma=list(gammas))
+        for params in ParameterGrid(grid):
+            result.append({"model": name, "params": params,
+                           "estimator": clone(estimator).set_params(**params)})
+    return result
+
+
+def kernel_key(estimator) -> Optional[tuple]:
+    """
+    Parameters the kernel matrix of a KernelRidge depends on.
+
+    Candidates with the same key share the kernel matrices, e.g. every alpha,
+    and every degree of a non polynomial kernel.
+
+    :param estimator: Unfitted estimator.
+    :type estimator: sklearn.base.RegressorMixin
+    :return: ``(kernel, ((param, value), ...))``, or None if the estimator is not a
+        KernelRidge with a named kernel.
+    :rtype: Optional[tuple]
+    """
+    if not isinstance(estimator, KernelRidge) or estimator.kernel not in KERNEL_PARAMS:
+        return None
+    params = {"gamma": estimator.gamma, "degree": estimator.degree, "coef0": estimator.coef0}
+    return estimator.kernel, tuple((name, params[name])
+                                   for name in sorted(KERNEL_PARAMS[estimator.kernel]))
+
+
+def _fit_fold(X: pd.DataFrame, y: pd.Series, train_index: np.ndarray,
+              test_index: np.ndarray, k: int) -> dict:
+    # Todo menos el modelo: no depende de los hiperparametros
+    preprocessing = Pipeline(build_pipeline(None, k).steps[:-1])
+    start = time.perf_counter()
+    X_train = preprocessing.fit_transform(X.iloc[train_index], y.iloc[train_index])
+    X_test = preprocessing.transform(X.iloc[test_index])
+    return {"X_train": X_train, "y_train": y.iloc[train_index].to_numpy(),
+            "X_test": X_test, "y_test": y.iloc[test_index].to_numpy(),
+            "seconds": time.perf_counter() - start}
+
+
+def _scores(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
+    mse = mean_squared_error(y_true, y_pred)
+    return {"r2": r2_score(y_true, y_pred), "mae": mean_absolute_error(y_true, y_pred),
+            "mse": mse, "rmse": math.sqrt(mse)}
+
+
+def _evaluate_group(fold: dict, group: List[int], estimators: list, key: Optional[tuple]) -> dict:
+    timings = {}
+    X_train, X_test = fold["X_train"], fold["X_test"]
+    if key is not None:
+        kernel, params = key
+        # Mismas llamadas que KernelRidge.fit/predict con kernel=<nombre>
+        with _phase(timings, "kernels"):
+            X_train = pairwise_kernels(fold["X_train"], metric=kernel, filter_params=True,
+                                       **dict(params))
+            X_test = pairwise_kernels(fold["X_test"], fold["X_train"], metric=kernel,
+                                      filter_params=True, **dict(params))
+    scores = {}
+    for index, estimator in zip(group, estimators):
+        if key is not None:
+            estimator = clone(estimator).set_params(kernel="precomputed")
+        with _phase(timings, "fit"):
+            estimator.fit(X_train, fold["y_train"])
+        with _phase(timings, "score"):
+            scores[index] = _scores(fold["y_test"], estimator.predict(X_test))
+    return {"scores": scores, "timings": timings}
+
+
+def search(X: pd.DataFrame,
+           y: pd.Series,
+           candidate_list: List[dict],
+           n_splits: int = 5,
+           k: int = 20,
+           n_jobs: int = -1,
+           random_state: int = 42) -> dict:
+    """
+    Cross-validated grid search with cached preprocessing and kernel matrices.
+
+    Scores are the same as ``GridSearchCV`` on ``build_pipeline(estimator, k)``
+    with ``KFold(n_splits, shuffle=True, random_state)``.
+
+    :param X: Credentials.
+    :type X: pd.DataFrame
+    :param y: Risk, between 0 and 1.
+    :type y: pd.Series
+    :param candidate_list: Candidates, see :func:`candidates`.
+    :type candidate_list: List[dict]
+    :param n_splits: Number of folds, defaults to 5
+    :type n_splits: int, optional
+    :param k: Number of features kept by SelectKBest, defaults to 20
+    :type k: int, optional
+    :param n_jobs: joblib workers, defaults to -1 (every core)
+    :type n_jobs: int, optional
+    :param random_state: Seed of the folds, defaults to 42
+    :type random_state: int, optional
+    :return: ``results`` (one entry per candidate with the mean and std of R2, MAE, MSE
+        and RMSE over the folds, sorted by mean R2), ``best`` (index of the best candidate),
+        ``fits``, ``kernel_matrices`` and ``timings``.
+    :rtype: dict
+    """
+    timings = {}
+    cv = KFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+    with Parallel(n_jobs=n_jobs) as parallel:
+        with _phase(timings, "preprocess_wall"):
+            folds = parallel(delayed(_fit_fold)(X, y, train_index, test_index, k)
+                             for train_index, test_index in cv.split(X))
+        timings["preprocess"] = sum(fold["seconds"] for fold in folds)
+
+        groups: Dict[tuple, List[int]] = {}
+        for index, candidate in enumerate(candidate_list):
+            key = kernel_key(candidate["estimator"])
+            groups.setdefault(("kernel", key) if key is not None else ("candidate", index),
+                              []).append(index)
+        tasks = [(fold_index, group_key, indices) for fold_index in range(len(folds))
+                 for group_key, indices in groups.items()]
+        with _phase(timings, "search_wall"):
+            outputs = parallel(
+                delayed(_evaluate_group)(folds[fold_index], indices,
+                                         [candidate_list[index]["estimator"] for index in indices],
+                                         group_key[1] if group_key[0] == "kernel" else None)
+                for fold_index, group_key, indices in tasks)
+
+    fold_scores = [[] for _ in candidate_list]
+    for output in outputs:
+        for index, scores in output["scores"].items():
+            fold_scores[index].append(scores)
+        for name, seconds in output["timings"].items():
+            timings[name] = timings.get(name, 0.0) + seconds
+
+    results = []
+    for index, candidate in enumerate(candidate_list):
+        scores = pd.DataFrame(fold_scores[index])
+        result = {"candidate": index, "model": candidate["model"], "params": candidate["params"]}
+        for metric in scores.columns:
+            result[f"mean_{metric}"] = float(scores[metric].mean())
+            result[f"std_{metric}"] = float(scores[metric].std(ddof=0))
+        results.append(result)
+    # Como GridSearchCV: en caso de empate gana el primer candidato
+    results.sort(key=lambda result: (-result["mean_r2"], result["candidate"]))
+    return {"results": results,
+            "best": results[0]["candidate"],
+            "fits": len(candidate_list) * len(folds),
+            "kernel_matrices": sum(group_key[0] == "kernel" for _, group_key, _ in tasks),
+            "timings": timings}
+
+
+def save_model(pipeline, X_check: pd.DataFrame,
+               output: Optional[Path] = None,
+               artifact_dir: Optional[Path] = None) -> None:
+    """
+    Write the pickled pipeline and the compact artifact, or neither.
+
+    The artifact is exported to a staging directory and checked against the
+    pipeline's predictions on ``X_check`` before anything is replaced. Then
+    the pickle is swapped in with ``os.replace``. The artifact is renamed to a
+    versioned sibling (``.model.<model_id>``) and ``artifact_dir`` becomes a
+    symlink to it, replaced atomically too. Readers of ``artifact_dir``
+    therefore always see a complete artifact, old or new. The previous version
+    is kept for processes that still have it open and older ones are removed.
+    If ``artifact_dir`` is still a plain directory, it is moved aside once
+    before the first symlink is created. Reloads should not happen during
+    that first swap.
+
+    :param pipeline: Fitted pipeline.
+    :type pipeline: sklearn.pipeline.Pipeline
+    :param X_check: Credentials the artifact predictions are checked on.
+    :type X_check: pd.DataFrame
+    :param output: Pickled pipeline to write, defaults to None (skip)
+    :type output: Path, optional
+    :param artifact_dir: Compact artifact directory to write, defaults to None (skip)
+    :type artifact_dir: Path, optional
+    :raises ValueError: If the pipeline cannot be exported or the artifact predicts differently.
+    """
+    if artifact_dir is not None:
+        from artifact import CompactModel, export_artifact
+        artifact_dir = Path(artifact_dir)
+        staging = artifact_dir.with_name(f".{artifact_dir.name}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            export_artifact(pipeline, staging)
+            exported = CompactModel(staging)
+            if not np.allclose(exported.predict(X_check), pipeline.predict(X_check),
+                               rtol=1e-6, atol=1e-6):
+                raise ValueError("El artefacto no reproduce las predicciones del pipeline")
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+    if output is not None:
+        output = Path(output)
+        tmp = output.with_name(f".{output.name}.tmp")
+        with open(tmp, "wb") as pipeline_file:
+            pickle.dump(pipeline, pipeline_file)
+        os.replace(tmp, output)
+    if artifact_dir is not None:
+        _swap_artifact(artifact_dir, staging, exported.model_id)
+
+
+def _swap_artifact(artifact_dir: Path, staging: Path, model_id: str) -> None:
+    """
+    Point ``artifact_dir`` at the validated artifact in ``staging``.
+
+    :param artifact_dir: Symlink (or legacy directory) the readers load.
+    :type artifact_dir: Path
+    :param staging: Validated artifact directory.
+    :type staging: Path
+    :param model_id: Identifier of the staged artifact.
+    :type model_id: str
+    """
+    prefix = f".{artifact_dir.name}."
+    version = artifact_dir.with_name(f"{prefix}{model_id}")
+    previous = None
+    if artifact_dir.is_symlink():
+        previous = artifact_dir.resolve()
+    elif artifact_dir.exists():
+        # Un directorio no vacio no se puede reemplazar por un enlace: se aparta
+        # una sola vez y queda como version anterior
+        previous = artifact_dir.with_name(f"{prefix}legacy")
+        shutil.rmtree(previous, ignore_errors=True)
+        os.replace(artifact_dir, previous)
+
+    if previous is not None and previous == version.resolve():
+        # El mismo modelo ya esta publicado: no se toca el directorio en uso
+        shutil.rmtree(staging, ignore_errors=True)
+        return
+    shutil.rmtree(version, ignore_errors=True)
+    os.replace(staging, version)
+    link = artifact_dir.with_name(f"{prefix}link.tmp")
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    os.symlink(version.name, link, target_is_directory=True)
+    os.replace(link, artifact_dir)
+
+    # Se conserva la version anterior para los procesos que aun la usan
+    keep = {version.resolve(), previous.resolve() if previous is not None else None}
+    for path in artifact_dir.parent.glob(f"{prefix}*"):
+        if path.is_dir() and not path.is_symlink() and path.resolve() not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def train(train_path: Path,
+          output: Optional[Path] = BASE_DIR / "pipeline.pkl",
+          artifact_dir: Optional[Path] = MODEL_DIR,
+          models: Optional[List[str]] = None,
+          gammas: Optional[List[Optional[float]]] = None,
+          n_splits: int = 5,
+          k: int = 20,
+          test_size: float = 0.2,
+          n_jobs: int = -1,
+          random_state: int = 42) -> dict:
+    """
+    Select, refit and save the scoring pipeline.
+
+    The labeled data is split like the notebooks: candidates are scored by
+    cross-validation on the training part, the best one (mean R2) is refitted
+    in the scoring pipeline on the whole training part and evaluated on the
+    held-out part.
+
+    :param train_path: Labeled dataset, see :func:`dataset.load_labeled`.
+    :type train_path: Path
+    :param output: Pickled pipeline to write, defaults to pipeline.pkl (None to skip)
+    :type output: Path, optional
+    :param artifact_dir: Compact artifact directory to write, defaults to MODEL_DIR
+        (None to skip)
+    :type artifact_dir: Path, optional
+    :param models: Keys of SEARCH_SPACES, defaults to every model
+    :type models: List[str], optional
+    :param gammas: KernelRidge gammas to search, defaults to None (only the default gamma)
+    :type gammas: List[Optional[float]], optional
+    :param n_splits: Number of folds, defaults to 5
+    :type n_splits: int, optional
+    :param k: Number of features kept by SelectKBest, defaults to 20
+    :type k: int, optional
+    :param test_size: Held-out fraction, defaults to 0.2
+    :type test_size: float, optional
+    :param n_jobs: joblib workers, defaults to -1 (every core)
+    :type n_jobs: int, optional
+    :param random_state: Seed of the split and the folds, defaults to 42
+    :type random_state: int, optional
+    :return: Best candidate, its cross-validation and held-out scores, the top
+        candidates, the paths written and the seconds spent per phase.
+    :rtype: dict
+    """
+    timings = {}
+    with _phase(timings, "load"):
+        X, y = load_labeled(train_path)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size,
+                                                            random_state=random_state)
+    candidate_list = candidates(models or list(SEARCH_SPACES), gammas)
+    with _phase(timings, "search"):
+        found = search(X_train, y_train, candidate_list, n_splits, k, n_jobs, random_state)
+    best = candidate_list[found["best"]]
+
+    with _phase(timings, "refit"):
+        pipeline = build_pipeline(clone(best["estimator"]), k)
+        pipeline.fit(X_train, y_train)
+    with _phase(timings, "evaluate"):
+        predictions = pipeline.predict(X_test)
+        holdout = _scores(y_test.to_numpy(), predictions)
+        holdout["severity_agreement"] = float(
+            (_severity(y_test.to_numpy()) == _severity(predictions)).mean())
+    with _phase(timings, "save"):
+        save_model(pipeline, X_test, output, artifact_dir)
+
+    return {
+        "model": best["model"],
+        "params": best["params"],
+        "cv": found["results"][0],
+        "holdout": holdout,
+        "top": found["results"][:5],
+        "rows": {"train": len(X_train), "test": len(X_test)},
+        "candidates": len(candidate_list),
+        "fits": found["fits"],
+        "kernel_matrices": found["kernel_matrices"],
+        "output": None if output is None else str(output),
+        "artifact": None if artifact_dir is None else str(artifact_dir),
+        "timings": {**timings, **{f"search.{name}": seconds
+                                  for name, seconds in found["timings"].items()}},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model training utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser(
+        "train", help="Grid search, refit and save pipeline.pkl and the model artifact")
+    train_parser.add_argument("--train", type=Path, default=DATA_DIR / "train.json")
+    train_parser.add_argument("--output", type=Path, default=BASE_DIR / "pipeline.pkl",
+                              help="Pickled pipeline to write")
+    train_parser.add_argument("--artifact", type=Path, default=MODEL_DIR,
+                              help="Model artifact directory to write")
+    train_parser.add_argument("--models", nargs="+", choices=list(SEARCH_SPACES),
+                              default=list(SEARCH_SPACES))
+    train_parser.add_argument("--gamma", type=float, nargs="+",
+                              help="KernelRidge gammas to search (default: 1 / n_features)")
+    train_parser.add_argument("--n-splits", type=int, default=5)
+    train_parser.add_argument("--k", type=int, default=20)
+    train_parser.add_argument("--n-jobs", type=int, default=-1)
+    train_parser.add_argument("--seed", type=int, default=42)
+    train_parser.add_argument("--report", type=Path, help="Write the JSON report to a file")
+    fidelity_parser = subparsers.add_parser(
+        "fidelity", help="Compare approximate kernel ridge models with the exact one")
+    fidelity_parser.add_argument("--train", type=Path, default=DATA_DIR / "train.json")
+    fidelity_parser.add_argument("--test", type=Path, default=DATA_DIR / "test.json")
+    fidelity_parser.add_argument("--n-components", type=int, nargs="+", default=[25, 50, 100])
+    fidelity_parser.add_argument("--kernel", default="rbf")
+    fidelity_parser.add_argument("--gamma", type=float)
+    fidelity_parser.add_argument("--alpha", type=float, default=0.1)
+    fidelity_parser.add_argument("--method", choices=["nystroem", "rff"], default="nystroem")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        report = train(args.train, args.output, args.artifact, args.models, args.gamma,
+                       args.n_splits, args.k, n_jobs=args.n_jobs, random_state=args.seed)
+        text = json.dumps(report, indent=2)
+        if args.report is not None:
+            args.report.write_text(text, encoding="utf-8")
+        print(text)
+    elif args.command == "fidelity":
+        for report in run_fidelity(args.train, args.test, args.n_components, args.kernel,
+                                   args.gamma, args.alpha, args.method):
+            print(json.dumps(report))